@@ -29,8 +29,19 @@ class DiffAnnotations:
         base: base Tree or Commit object for this diff (revA in a 'revA...revB' diff)
         target: target Tree or Commit object for this diff (revB in a 'revA...revB' diff)
         """
+        return self._store(self._object_id(base, target), annotation_type, data)
+
+    def store_for_tree(self, *, tree, annotation_type, data):
+        """
+        Stores an annotation about a single tree to the repo's sqlite database,
+        and returns the annotation itself.
+
+        tree: the Tree object that this annotation describes.
+        """
+        return self._store(str(tree.id), annotation_type, data)
+
+    def _store(self, object_id, annotation_type, data):
         assert isinstance(data, dict)
-        object_id = self._object_id(base, target)
         data = json.dumps(data)
         with annotations_session(self.repo) as session:
             if session.is_readonly:
@@ -69,38 +80,64 @@ class DiffAnnotations:
         base: base Tree or Commit object for this diff (revA in a 'revA...revB' diff)
         target: target Tree or Commit object for this diff (revB in a 'revA...revB' diff)
         """
+        object_id = self._object_id(base, target)
+        return self._get_many([object_id], annotation_type).get(object_id)
+
+    def get_for_tree(self, *, tree, annotation_type):
+        """
+        Returns an annotation about a single tree from the sqlite database.
+        Returns None if it isn't found.
+        """
+        object_id = str(tree.id)
+        return self._get_many([object_id], annotation_type).get(object_id)
+
+    def get_many_for_trees(self, *, trees, annotation_type):
+        """
+        Returns annotations about each of the given trees from the sqlite database,
+        as a dict keyed by tree ID (as a hex string). Trees that aren't found are not present in the dict.
+        """
+        return self._get_many([str(t.id) for t in trees], annotation_type)
+
+    # SQLite's default limit on the number of host parameters in a single query is 999.
+    _GET_MANY_BATCH_SIZE = 900
+
+    def _get_many(self, object_ids, annotation_type):
+        result = {}
         with annotations_session(self.repo) as session:
-            object_id = self._object_id(base, target)
-            try:
-                annotations = list(
-                    session.query(KartAnnotation).filter(
-                        KartAnnotation.annotation_type == annotation_type,
-                        KartAnnotation.object_id == object_id,
+            for i in range(0, len(object_ids), self._GET_MANY_BATCH_SIZE):
+                batch = object_ids[i : i + self._GET_MANY_BATCH_SIZE]
+                try:
+                    annotations = list(
+                        session.query(KartAnnotation).filter(
+                            KartAnnotation.annotation_type == annotation_type,
+                            KartAnnotation.object_id.in_(batch),
+                        )
                     )
-                )
-            except OperationalError as e:
-                # this can happen if the db exists but is readonly and doesn't
-                # contain the table yet...
-                if "no such table: kart_annotations" in str(e):
-                    # can't add the table to a readonly db
-                    L.warning("no such table: kart_annotations")
-                    return None
-                else:
-                    raise
-
-            for annotation in annotations:
-                data = annotation.json
+                except OperationalError as e:
+                    # this can happen if the db exists but is readonly and doesn't
+                    # contain the table yet...
+                    if "no such table: kart_annotations" in str(e):
+                        # can't add the table to a readonly db
+                        L.warning("no such table: kart_annotations")
+                        return result
+                    else:
+                        raise
+
+                for annotation in annotations:
+                    result[annotation.object_id] = annotation.json
+
+        for object_id in object_ids:
+            if object_id in result:
                 L.debug(
                     "retrieved: %s for %s: %s",
                     annotation_type,
                     object_id,
-                    data,
+                    result[object_id],
                 )
-                return data
             else:
                 L.debug(
                     "missing: %s for %s",
                     annotation_type,
                     object_id,
                 )
-                return None
+        return result
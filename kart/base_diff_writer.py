@@ -35,6 +35,11 @@ class BaseDiffWriter:
     # as we know the delta does or does not match the spatial filter.
     record_spatial_filter_stats = False
 
+    # This can be set to True by diff-writers that output each delta as soon as it is generated - then, commit<>commit
+    # diffs are generated as StreamingDeltaDiffs, so that large diffs needn't be held in memory all at once.
+    # The item deltas of each dataset can then only be iterated over once, using filtered_dataset_deltas.
+    stream_item_deltas = False
+
     @classmethod
     def get_diff_writer_class(cls, output_format):
         if output_format == "quiet":
@@ -278,6 +283,7 @@ class BaseDiffWriter:
             workdir_diff_cache=self.workdir_diff_cache,
             repo_key_filter=self.repo_key_filter,
             convert_to_dataset_format=self.do_convert_to_dataset_format,
+            streaming=self.stream_item_deltas,
         )
 
     def get_dataset_diff(self, ds_path):
@@ -300,6 +306,7 @@ class BaseDiffWriter:
             workdir_diff_cache=self.workdir_diff_cache,
             ds_filter=self.repo_key_filter[ds_path],
             convert_to_dataset_format=self.do_convert_to_dataset_format,
+            streaming=self.stream_item_deltas,
         )
 
     def filtered_dataset_deltas(self, ds_path, ds_diff):
@@ -1,16 +1,23 @@
 import pygit2
 
-from kart.diff_structs import DatasetDiff, DeltaDiff, Delta
+from kart.diff_structs import DatasetDiff, DeltaDiff, Delta, StreamingDeltaDiff
 from kart.key_filters import DatasetKeyFilter, MetaKeyFilter, UserStringKeyFilter
 
 
 class DatasetDiffMixin:
     """Adds diffing of meta-items to a dataset, by delegating to dataset.meta_items()"""
 
-    def diff(self, other, ds_filter=DatasetKeyFilter.MATCH_ALL, reverse=False):
+    def diff(
+        self,
+        other,
+        ds_filter=DatasetKeyFilter.MATCH_ALL,
+        reverse=False,
+        streaming=False,
+    ):
         """
         Generates a Diff from self -> other.
         If reverse is true, generates a diff from other -> self.
+        If streaming is true, the item deltas (eg feature deltas) are generated as a StreamingDeltaDiff.
         """
         ds_diff = DatasetDiff()
         meta_filter = ds_filter.get("meta", ds_filter.child_type())
@@ -112,6 +119,58 @@ class DatasetDiffMixin:
         raw_diff = self.get_raw_diff_for_subtree(other, subtree_name, reverse=reverse)
         # NOTE - we could potentially call diff.find_similar() to detect renames here,
 
+        yield from self.transform_raw_deltas(
+            raw_diff.deltas,
+            key_filter,
+            **self._subtree_delta_transforms(
+                other,
+                subtree_name,
+                key_decoder_method=key_decoder_method,
+                value_decoder_method=value_decoder_method,
+                reverse=reverse,
+            ),
+        )
+
+    def diff_subtree_streaming(
+        self,
+        other,
+        subtree_name,
+        key_filter=UserStringKeyFilter.MATCH_ALL,
+        *,
+        key_decoder_method,
+        value_decoder_method,
+        reverse=False,
+    ):
+        """
+        Same as diff_subtree, except that instead of yielding the deltas, returns them as a StreamingDeltaDiff -
+        which can be sorted by key and output one delta at a time, without holding all the deltas in memory at once.
+        """
+        subtree_name = subtree_name.rstrip("/")
+        raw_diff = self.get_raw_diff_for_subtree(other, subtree_name, reverse=reverse)
+        transforms = self._subtree_delta_transforms(
+            other,
+            subtree_name,
+            key_decoder_method=key_decoder_method,
+            value_decoder_method=value_decoder_method,
+            reverse=reverse,
+        )
+        old_value_transform = transforms.pop("old_value_transform")
+        new_value_transform = transforms.pop("new_value_transform")
+
+        # Without value transforms, the value of each delta is just its path.
+        def path_deltas():
+            return self.transform_raw_deltas(raw_diff.deltas, key_filter, **transforms)
+
+        return StreamingDeltaDiff(
+            path_deltas,
+            old_value_transform=old_value_transform,
+            new_value_transform=new_value_transform,
+        )
+
+    def _subtree_delta_transforms(
+        self, other, subtree_name, *, key_decoder_method, value_decoder_method, reverse
+    ):
+        """Returns the transforms that diff_subtree passes to transform_raw_deltas."""
         if reverse:
             old, new = other, self
         else:
@@ -130,9 +189,7 @@ class DatasetDiffMixin:
 
         path_decoder = lambda path: f"{subtree_name}/{path}"
 
-        yield from self.transform_raw_deltas(
-            raw_diff.deltas,
-            key_filter,
+        return dict(
             old_path_transform=path_decoder,
             old_key_transform=get_decoder(old, key_decoder_method),
             old_value_transform=get_decoder(old, value_decoder_method),
@@ -0,0 +1,145 @@
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from kart.serialise_util import hexhash
+
+L = logging.getLogger("kart.diff_cache")
+
+
+class DiffOutputCache:
+    """
+    An on-disk cache of diff output, so that the same diff - eg `kart show -o json-lines` of a popular commit - can be
+    output again by copying it from disk, without regenerating it.
+    Entries are stored as files in the repo's diff-cache directory, next to annotations.db, and are keyed by a hash of
+    everything that affects the output (see key). Once the total size of the entries exceeds the limit set by the
+    kart.diffcache.size config variable, the least recently used entries are evicted.
+    The cache is disabled unless kart.diffcache.size is set.
+    """
+
+    DIRNAME = "diff-cache"
+
+    def __init__(self, repo):
+        from kart.repo import KartConfigKeys
+
+        self.repo = repo
+        self.max_size = repo.get_config_int(KartConfigKeys.KART_DIFFCACHE_SIZE, 0)
+        self.path = repo.gitdir_path / self.DIRNAME
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @classmethod
+    def key(cls, **params):
+        """Returns a cache key for the diff output that is fully determined by the given JSON-serialisable params."""
+        from kart.cli import get_version
+
+        # Different versions of Kart can output the same diff differently.
+        params["kartVersion"] = get_version()
+        return hexhash(json.dumps(params, sort_keys=True))
+
+    def _entry_path(self, key):
+        return self.path / key
+
+    def read(self, key, output_fp):
+        """
+        If there is an entry for the given key, copies it to output_fp and returns whether or not the diff had
+        changes (True or False). Otherwise, returns None.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            entry_file = entry_path.open("rb")
+        except FileNotFoundError:
+            L.debug("diff cache miss: %s", key)
+            return None
+
+        with entry_file:
+            # Mark this entry as recently used - see _evict.
+            try:
+                os.utime(entry_path)
+            except OSError:
+                pass
+            has_changes = entry_file.read(1) == b"1"
+            L.debug("diff cache hit: %s", key)
+            shutil.copyfileobj(
+                io.TextIOWrapper(entry_file, encoding="utf-8"), output_fp
+            )
+        return has_changes
+
+    def writer(self, key, output_fp):
+        """
+        Returns a DiffOutputCacheWriter - a file-like object which can be written to instead of output_fp,
+        which writes to output_fp, and also stores the output in the cache once it is committed.
+        Returns None if the cache directory can't be written to.
+        """
+        try:
+            self.path.mkdir(exist_ok=True)
+            entry_file = tempfile.NamedTemporaryFile(
+                dir=self.path, prefix=".tmp-", delete=False
+            )
+        except OSError as e:
+            L.info("Can't write to diff cache: %s", e)
+            return None
+        return DiffOutputCacheWriter(self, key, output_fp, entry_file)
+
+    def _evict(self):
+        """Deletes the least recently used entries until the total size of the cache is within the limit."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process.
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for mtime, size, path in entries)
+        entries.sort()
+        for mtime, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            L.debug("diff cache evict: %s", path)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+class DiffOutputCacheWriter:
+    """
+    Writes diff output to the given output file, and also to a new entry in the DiffOutputCache.
+    The entry is only added to the cache once commit() is called - call discard() instead if the output is incomplete.
+    """
+
+    def __init__(self, cache, key, output_fp, entry_file):
+        self.cache = cache
+        self.key = key
+        self.output_fp = output_fp
+        self.entry_file = entry_file
+        # Placeholder - the first byte records whether the diff had changes, which is only known at the end.
+        self.entry_file.write(b"?")
+
+    def write(self, s):
+        self.output_fp.write(s)
+        self.entry_file.write(s.encode("utf-8"))
+
+    def flush(self):
+        self.output_fp.flush()
+
+    def commit(self, has_changes):
+        self.entry_file.seek(0)
+        self.entry_file.write(b"1" if has_changes else b"0")
+        self.entry_file.close()
+        os.replace(self.entry_file.name, self.cache._entry_path(self.key))
+        self.cache._evict()
+
+    def discard(self):
+        self.entry_file.close()
+        os.unlink(self.entry_file.name)
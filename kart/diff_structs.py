@@ -1,10 +1,14 @@
 from collections import UserDict
 from dataclasses import dataclass
+from numbers import Number
 from typing import Any
 
 from .exceptions import InvalidOperation
 
 
+_INF = float("inf")
+
+
 class Conflict(Exception):
     pass
 
@@ -207,7 +211,7 @@ class RichDict(UserDict):
         super().__init__(*args, **kwargs)
 
     def ensure_child_type(self, key, value):
-        if type(value) != self.child_type:
+        if not isinstance(value, self.child_type):
             raise TypeError(
                 f"{type(self).__name__} accepts children of type {self.child_type.__name__} "
                 f"but received {type(value).__name__}"
@@ -451,28 +455,83 @@ class DeltaDiff(Diff):
             result.add_delta(delta)
         return result
 
-    def sorted_items(self):
-        from numbers import Number
-
-        inf = float("inf")
-
-        def key(item):
-            k, v = item
-            if k is None:
-                return (-inf, "")
-            elif isinstance(k, Number):
-                return (k, "")
-            elif isinstance(k, str):
-                return (inf, k)
-            else:
-                return (inf, str(k))
+    @staticmethod
+    def sort_key(key):
+        """The sort key for a delta with the given key - deltas are sorted by key, numbers first, then strings."""
+        if key is None:
+            return (-_INF, "")
+        elif isinstance(key, Number):
+            return (key, "")
+        elif isinstance(key, str):
+            return (_INF, key)
+        else:
+            return (_INF, str(key))
 
-        return sorted(self.items(), key=key)
+    def sorted_items(self):
+        return sorted(self.items(), key=lambda item: self.sort_key(item[0]))
 
     def recursive_len(self, max_depth=None):
         return len(self)
 
 
+class StreamingDeltaDiff(DeltaDiff):
+    """
+    A DeltaDiff that doesn't hold its deltas in memory, but generates them on demand - suitable for diffs that
+    are too large to be held in memory, when each delta can be output as soon as it is generated.
+    The deltas are first generated unsorted and with paths in place of values, which is cheap - this is enough to
+    test if the diff is empty, or to count its deltas, or to sort them by key (using an external merge-sort for very
+    large diffs). Then the value of each delta is loaded only as that delta is yielded by sorted_items().
+
+    The deltas are never stored in the dict itself, so a StreamingDeltaDiff can't be read using keys(), items(), etc -
+    only using sorted_items(). It can be tested for truthiness and counted using len().
+    """
+
+    # At most this many deltas are sorted in memory at once - see kart.utils.sorted_externally
+    SORT_RUN_SIZE = 100_000
+
+    def __init__(self, path_deltas, *, old_value_transform, new_value_transform):
+        """
+        path_deltas - a callable that returns a new iterator of deltas, in any order, each time it is called.
+            Instead of a value, each half-delta should contain a path (or similar) from which the value can be loaded.
+        old_value_transform, new_value_transform - convert the path of an old or new half-delta to the actual value,
+            presumably first by loading the file contents at that path.
+        """
+        super().__init__()
+        self._path_deltas = path_deltas
+        self._old_value_transform = old_value_transform
+        self._new_value_transform = new_value_transform
+        self._is_empty = None
+
+    def __bool__(self):
+        if self._is_empty is None:
+            self._is_empty = next(iter(self._path_deltas()), None) is None
+        return not self._is_empty
+
+    def __len__(self):
+        return sum(1 for d in self._path_deltas())
+
+    def sorted_items(self):
+        from kart.utils import sorted_externally
+
+        records = (
+            (
+                self.sort_key(d.key),
+                (d.old.key, d.old.value) if d.old is not None else None,
+                (d.new.key, d.new.value) if d.new is not None else None,
+            )
+            for d in self._path_deltas()
+        )
+        for _, old, new in sorted_externally(
+            records, key=lambda r: r[0], run_size=self.SORT_RUN_SIZE
+        ):
+            if old is not None:
+                old = old[0], self._old_value_transform(old[1])
+            if new is not None:
+                new = new[0], self._new_value_transform(new[1])
+            delta = Delta(old, new)
+            yield delta.key, delta
+
+
 class DatasetDiff(Diff):
     """A DatasetDiff contains up to two DeltaDiffs, at keys "meta" or "feature"."""
 
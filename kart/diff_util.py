@@ -41,6 +41,7 @@ def get_repo_diff(
     workdir_diff_cache=None,
     repo_key_filter=RepoKeyFilter.MATCH_ALL,
     convert_to_dataset_format=False,
+    streaming=False,
 ):
     """
     Generates a RepoDiff containing an entry for every dataset in the repo
@@ -52,6 +53,7 @@ def get_repo_diff(
     workdir_diff_cache - not required, but can be provided if a WorkdirDiffCache is already in use
         to save repeated work.
     repo_key_filter - controls which datasets (and PK values) match and are included in the diff.
+    streaming - see get_dataset_diff.
     """
 
     all_ds_paths = get_all_ds_paths(base_rs, target_rs, repo_key_filter)
@@ -69,6 +71,7 @@ def get_repo_diff(
             workdir_diff_cache=workdir_diff_cache,
             ds_filter=repo_key_filter[ds_path],
             convert_to_dataset_format=convert_to_dataset_format,
+            streaming=streaming,
         )
     # No need to recurse since self.get_dataset_diff already prunes the dataset diffs.
     repo_diff.prune(recurse=False)
@@ -84,6 +87,7 @@ def get_dataset_diff(
     workdir_diff_cache=None,
     ds_filter=DatasetKeyFilter.MATCH_ALL,
     convert_to_dataset_format=False,
+    streaming=False,
 ):
     """
     Generates the DatasetDiff for the dataset at path dataset_path.
@@ -94,6 +98,9 @@ def get_dataset_diff(
     workdir_diff_cache - reusing the same WorkdirDiffCache for every dataset that is being diffed at one time
         is more efficient as it can save FileSystemWorkingCopy.raw_diff_from_index being called multiple times
     ds_filter - controls which PK values match and are included in the diff.
+    streaming - if True, the item deltas (eg feature deltas) are generated as a StreamingDeltaDiff, which never holds
+        them all in memory at once - as long as the diff doesn't include the working copy. Working copy diffs must be
+        concatenated with the base<>target diff, which requires all of the deltas.
     """
     base_target_diff = None
     target_wc_diff = None
@@ -113,7 +120,12 @@ def get_dataset_diff(
             from_ds, to_ds = target_ds, base_ds
             reverse = True
 
-        base_target_diff = from_ds.diff(to_ds, ds_filter=ds_filter, reverse=reverse)
+        base_target_diff = from_ds.diff(
+            to_ds,
+            ds_filter=ds_filter,
+            reverse=reverse,
+            streaming=streaming and not include_wc_diff,
+        )
         L.debug("base<>target diff (%s): %s", ds_path, repr(base_target_diff))
 
     if include_wc_diff:
@@ -1,4 +1,7 @@
 import logging
+import multiprocessing
+import queue
+import signal
 import subprocess
 import time
 import uuid
@@ -15,6 +18,7 @@ from kart.tabular.version import (
     dataset_class_for_version,
     extra_blobs_for_version,
 )
+from .schema import Schema
 from .tabular.import_source import TableImportSource
 from .tabular.pk_generation import PkGeneratingTableImportSource
 from .timestamps import minutes_to_tz_offset
@@ -28,11 +32,14 @@ class FastImportSettings:
     If not set, reasonable defaults are used.
     """
 
-    def __init__(self, *, max_pack_size=None, max_delta_depth=None):
+    def __init__(self, *, max_pack_size=None, max_delta_depth=None, num_workers=None):
         # Maximum size of pack files
         self.max_pack_size = max_pack_size or "2G"
         # Maximum depth of delta-compression chains
         self.max_delta_depth = max_delta_depth or 0
+        # Number of worker processes used to encode features - see ParallelFeatureWriter.
+        # Not an arg to git-fast-import - 1 means all features are encoded by this process.
+        self.num_workers = max(num_workers or 1, 1)
 
     def as_args(self):
         args = []
@@ -276,6 +283,7 @@ def fast_import_tables(
     if verbosity >= 1:
         click.echo("Starting git-fast-import...")
 
+    parallel_writer = None
     try:
         import_ref = None
         if header is None:
@@ -288,6 +296,11 @@ def fast_import_tables(
             orig_branch = repo.head_branch
             header = generate_header(repo, sources, message, import_ref, from_commit)
 
+        if settings.num_workers > 1:
+            parallel_writer = ParallelFeatureWriter(
+                repo, settings.num_workers, cmd_args=[*settings.as_args(), "--quiet"]
+            )
+
         with git_fast_import(repo, *cmd_args) as proc:
             proc.stdin.write(header.encode("utf8"))
 
@@ -306,8 +319,12 @@ def fast_import_tables(
                     replace_ids,
                     limit,
                     verbosity,
+                    parallel_writer=parallel_writer,
                 )
 
+            if parallel_writer is not None:
+                parallel_writer.finish(proc.stdin, verbosity=verbosity)
+
         if import_ref is not None:
             # we created a temp branch for the import above.
             # now we need to reset the head branch to the temp branch tip.
@@ -330,6 +347,8 @@ def fast_import_tables(
         # remove the import branches
         if import_ref is not None and import_ref in repo.references:
             repo.references.delete(import_ref)
+        if parallel_writer is not None:
+            parallel_writer.cleanup()
 
 
 def _import_single_source(
@@ -341,6 +360,8 @@ def _import_single_source(
     replace_ids,
     limit,
     verbosity,
+    *,
+    parallel_writer=None,
 ):
     """
     repo - the Kart repo to import into.
@@ -354,6 +375,8 @@ def _import_single_source(
         0: no progress information is printed to stdout.
         1: basic status information
         2: full output of `git-fast-import --stats ...`
+    parallel_writer - optional ParallelFeatureWriter. If set, features are encoded and written by its worker processes
+        (where possible - replacing only some IDs or comparing features against existing features is always done here).
     """
     replacing_dataset = None
     if replace_existing == ReplaceExisting.GIVEN:
@@ -414,12 +437,14 @@ def _import_single_source(
         feature_blobs_already_written = getattr(
             source, "feature_blobs_already_written", False
         )
+        use_parallel_writer = False
         if feature_blobs_already_written:
             # This is an optimisation for upgrading repos in-place from V2 -> V3,
             # which are so similar we don't even need to rewrite the blobs.
             feature_blob_iter = source.feature_iter_with_reused_blobs(
                 dataset, id_iterator
             )
+            write_item = lambda item: copy_existing_blob_to_stream(proc.stdin, *item)
 
         elif should_compare_imported_features_against_old_features(
             repo,
@@ -433,16 +458,23 @@ def _import_single_source(
                 source,
                 replacing_dataset=replacing_dataset,
             )
+            write_item = lambda item: write_blob_to_stream(proc.stdin, *item)
+
+        elif parallel_writer is not None and replace_ids is None:
+            use_parallel_writer = True
+            # The features themselves are sent to the worker processes to be encoded.
+            parallel_writer.start_dataset(dataset)
+            feature_blob_iter = src_iterator
+            write_item = parallel_writer.write_feature
+
         else:
             feature_blob_iter = dataset.import_iter_feature_blobs(
                 repo, src_iterator, source
             )
+            write_item = lambda item: write_blob_to_stream(proc.stdin, *item)
 
-        for i, (feature_path, blob_data) in enumerate(feature_blob_iter):
-            if feature_blobs_already_written:
-                copy_existing_blob_to_stream(proc.stdin, feature_path, blob_data)
-            else:
-                write_blob_to_stream(proc.stdin, feature_path, blob_data)
+        for i, item in enumerate(feature_blob_iter):
+            write_item(item)
 
             if i and progress_every and i % progress_every == 0:
                 click.echo(f"  {i:,d} features... @{time.monotonic()-t1:.1f}s")
@@ -450,6 +482,9 @@ def _import_single_source(
             if limit is not None and i == (limit - 1):
                 click.secho(f"  Stopping at {limit:,d} features", fg="yellow")
                 break
+
+        if use_parallel_writer:
+            parallel_writer.flush()
         t2 = time.monotonic()
         if verbosity >= 1:
             click.echo(f"Added {num_rows:,d} Features to index in {t2-t1:.1f}s")
@@ -466,6 +501,202 @@ def _import_single_source(
         click.echo(f"Closed in {(t3-t2):.0f}s")
 
 
+class ParallelFeatureWriter:
+    """
+    Encodes imported features into feature blobs using a pool of worker processes.
+    Each worker writes the blobs it encodes to its own git-fast-import process, which commits them to a temporary ref.
+    Once every source has been imported, the feature trees of these commits are merged into the main fast-import
+    stream - see finish(). Only the feature trees are written by the workers - all other parts of each dataset,
+    such as meta-items, are still written to the main stream.
+    """
+
+    # Number of features sent to a worker at once.
+    CHUNK_SIZE = 1000
+    # Maximum number of chunks waiting to be encoded by each worker.
+    MAX_QUEUED_CHUNKS = 8
+
+    def __init__(self, repo, num_workers, *, cmd_args=()):
+        self.repo = repo
+        self.num_workers = num_workers
+        self.cmd_args = list(cmd_args)
+
+        self.import_refs = []
+        self.queues = []
+        self.procs = []
+
+        self.feature_paths = []
+        self.current_ds_path = None
+        self.current_chunk = []
+        self.next_worker = 0
+
+    def _start_workers(self):
+        context = multiprocessing.get_context()
+        committer = self.repo.committer_signature()
+        for n in range(self.num_workers):
+            import_ref = f"refs/kart-import/{uuid.uuid4()}"
+            header = (
+                f"commit {import_ref}\n"
+                f"committer {committer.name} <{committer.email}> {committer.time} {minutes_to_tz_offset(committer.offset)}\n"
+                f"data 0\n"
+            )
+            q = context.Queue(maxsize=self.MAX_QUEUED_CHUNKS)
+            proc = context.Process(
+                target=_parallel_import_worker,
+                args=(self.repo.path, header, self.cmd_args, q),
+                name=f"kart-import-worker-{n}",
+                daemon=True,
+            )
+            proc.start()
+            self.import_refs.append(import_ref)
+            self.queues.append(q)
+            self.procs.append(proc)
+
+    def _put(self, worker_index, message):
+        q, proc = self.queues[worker_index], self.procs[worker_index]
+        while True:
+            try:
+                q.put(message, timeout=1)
+                return
+            except queue.Full:
+                if not proc.is_alive():
+                    raise SubprocessError(
+                        f"Import worker process failed: exit code {proc.exitcode}",
+                        exit_code=proc.exitcode,
+                    )
+
+    def start_dataset(self, dataset):
+        """Prepares the workers to encode features for the given (new) dataset."""
+        if not self.procs:
+            self._start_workers()
+        self.flush()
+        for i in range(self.num_workers):
+            self._put(
+                i,
+                ("dataset", dataset.path, (dataset.__class__, dataset.schema.dumps())),
+            )
+        self.current_ds_path = dataset.path
+        self.feature_paths.append(dataset.ensure_full_path(dataset.FEATURE_PATH))
+
+    def write_feature(self, feature):
+        """Queues a feature to be encoded and written by one of the workers."""
+        self.current_chunk.append(feature)
+        if len(self.current_chunk) >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Sends any features that have been queued to the next worker in turn."""
+        if not self.current_chunk:
+            return
+        self._put(
+            self.next_worker, ("features", self.current_ds_path, self.current_chunk)
+        )
+        self.next_worker = (self.next_worker + 1) % self.num_workers
+        self.current_chunk = []
+
+    def finish(self, stream, verbosity=1):
+        """
+        Waits for all the workers to finish, then writes the feature trees they created to the given fast-import stream.
+        """
+        if not self.procs:
+            return
+        self.flush()
+        for i in range(self.num_workers):
+            self._put(i, None)
+
+        t0 = time.monotonic()
+        for proc in self.procs:
+            proc.join()
+        for proc in self.procs:
+            if proc.exitcode != 0:
+                raise SubprocessError(
+                    f"Import worker process failed: exit code {proc.exitcode}",
+                    exit_code=proc.exitcode,
+                )
+
+        worker_trees = [
+            self.repo.revparse_single(import_ref).peel(pygit2.Tree)
+            for import_ref in self.import_refs
+        ]
+        for feature_path in self.feature_paths:
+            feature_path = feature_path.rstrip("/")
+            feature_trees = []
+            for tree in worker_trees:
+                try:
+                    feature_trees.append(tree / feature_path)
+                except KeyError:
+                    continue
+            write_merged_trees_to_stream(stream, feature_trees, feature_path)
+
+        if verbosity >= 1:
+            click.echo(
+                f"Merged features from {self.num_workers} workers in {time.monotonic()-t0:.1f}s"
+            )
+
+    def cleanup(self):
+        """Stops any workers that are still running, and removes the temporary refs they created."""
+        for proc in self.procs:
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        for import_ref in self.import_refs:
+            if import_ref in self.repo.references:
+                self.repo.references.delete(import_ref)
+
+
+def _parallel_import_worker(repo_path, header, cmd_args, message_queue):
+    """
+    Entry point for each worker process started by ParallelFeatureWriter.
+    Encodes the features it receives and commits them using its own git-fast-import process.
+    """
+    from kart.repo import KartRepo
+
+    # Don't inherit Kart's handlers for cleaning up the process group - if this worker is stopped, just stop.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    repo = KartRepo(repo_path, validate=False)
+    datasets = {}
+    with git_fast_import(repo, *cmd_args) as proc:
+        proc.stdin.write(header.encode("utf8"))
+        for message_type, ds_path, payload in iter(message_queue.get, None):
+            if message_type == "dataset":
+                dataset_class, schema_data = payload
+                datasets[ds_path] = dataset_class.new_dataset_for_writing(
+                    ds_path, Schema.loads(schema_data), repo
+                )
+                continue
+
+            dataset = datasets[ds_path]
+            for feature_path, blob_data in dataset.import_iter_feature_blobs(
+                repo, payload, dataset
+            ):
+                write_blob_to_stream(proc.stdin, feature_path, blob_data)
+
+
+def write_merged_trees_to_stream(stream, trees, path):
+    """
+    Writes the union of the given trees to the given path in a fast-import stream.
+    Subtrees which are only found in one of the trees are written as-is, without being read, so that the cost of
+    merging is proportional to the number of trees that overlap rather than the number of blobs they contain.
+    If the same blob path is found in more than one tree, the last tree wins.
+    """
+    if not trees:
+        return
+    if len(trees) == 1:
+        stream.write(f"M 040000 {trees[0].id} {path}\n".encode("utf8"))
+        return
+
+    subtrees = {}
+    for tree in trees:
+        for obj in tree:
+            if obj.type_str == "tree":
+                subtrees.setdefault(obj.name, []).append(obj)
+            else:
+                copy_existing_blob_to_stream(stream, f"{path}/{obj.name}", obj.id)
+    for name, trees_with_name in subtrees.items():
+        write_merged_trees_to_stream(stream, trees_with_name, f"{path}/{name}")
+
+
 def write_blob_to_stream(stream, blob_path, blob_data):
     stream.write(f"M 644 inline {blob_path}\ndata {len(blob_data)}\n".encode("utf8"))
     stream.write(blob_data)
@@ -98,7 +98,8 @@ def fsck(ctx, reset_datasets, fsck_args):
                 f"SELECT COUNT(*) FROM {table_wc.table_identifier(dataset)};"
             )
             click.echo(f"{wc_count} features in {table}")
-            ds_count = dataset.feature_count
+            # Count the features directly rather than trusting any cached count.
+            ds_count = sum(1 for blob in dataset.feature_blobs())
             if wc_count != ds_count:
                 has_err = True
                 click.secho(
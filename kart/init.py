@@ -71,6 +71,13 @@ from .working_copy import PartType
     type=click.INT,
     help="--depth option to git-fast-import (advanced users only)",
 )
+@click.option(
+    "--jobs",
+    "num_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use to encode features during the import.",
+)
 @click.option(
     "--num-processes",
     help="Deprecated (no longer used)",
@@ -94,6 +101,7 @@ def init(
     wc_location,
     max_delta_depth,
     num_processes,
+    num_workers,
     spatial_filter_spec,
 ):
     """
@@ -146,7 +154,9 @@ def init(
         fast_import_tables(
             repo,
             sources,
-            settings=FastImportSettings(max_delta_depth=max_delta_depth),
+            settings=FastImportSettings(
+                max_delta_depth=max_delta_depth, num_workers=num_workers
+            ),
             from_commit=None,
             message=message,
         )
@@ -214,6 +214,8 @@ class JsonLinesDiffWriter(BaseDiffWriter):
       {"type": "feature", "dataset": dataset-path, "change": {"-/+": old/new-value}}
     """
 
+    stream_item_deltas = True
+
     @classmethod
     def _check_output_path(cls, repo, output_path):
         if isinstance(output_path, Path) and output_path.is_dir():
@@ -229,6 +231,62 @@ class JsonLinesDiffWriter(BaseDiffWriter):
         self._diff_estimate_accuracy = diff_estimate_accuracy
         self._output_lock = threading.RLock()
 
+    def write_diff(self):
+        cache_key = self._diff_output_cache_key()
+        if cache_key is None:
+            super().write_diff()
+            return
+
+        diff_cache = self.repo.diff_output_cache
+        has_changes = diff_cache.read(cache_key, self.fp)
+        if has_changes is not None:
+            self.has_changes = has_changes
+            return
+
+        cache_writer = diff_cache.writer(cache_key, self.fp)
+        if cache_writer is None:
+            super().write_diff()
+            return
+
+        output_fp, self.fp = self.fp, cache_writer
+        try:
+            super().write_diff()
+        except BaseException:
+            cache_writer.discard()
+            raise
+        else:
+            cache_writer.commit(self.has_changes)
+        finally:
+            self.fp = output_fp
+
+    def _diff_output_cache_key(self):
+        """
+        Returns the key for this diff's output in the repo's DiffOutputCache - or None if the output shouldn't be
+        cached, either because the cache is disabled, or because the output depends on more than the commits diffed.
+        """
+        diff_cache = self.repo.diff_output_cache
+        if (
+            not diff_cache.enabled
+            or self.include_wc_diff
+            or self._diff_estimate_accuracy is not None
+        ):
+            return None
+
+        def tree_id(rs):
+            return str(rs.tree.id) if rs.tree is not None else None
+
+        return diff_cache.key(
+            outputFormat="JSONL+hexwkb",
+            jsonStyle=self.json_style,
+            base=tree_id(self.base_rs),
+            target=tree_id(self.target_rs),
+            commit=str(self.commit.id) if self.commit is not None else None,
+            filters=sorted(self.user_key_filters),
+            spatialFilter=self.spatial_filter.hexhash,
+            targetCrs=self.target_crs.ExportToWkt() if self.target_crs else None,
+            convertToDatasetFormat=self.do_convert_to_dataset_format,
+        )
+
     def dump(self, obj):
         with self._output_lock:
             json.dump(obj, self.fp, separators=self.separators)
@@ -373,6 +431,8 @@ class GeojsonDiffWriter(BaseDiffWriter):
         Meta deltas aren't output at all.
     """
 
+    stream_item_deltas = True
+
     @classmethod
     def _check_output_path(cls, repo, output_path):
         if isinstance(output_path, Path):
@@ -1,5 +1,4 @@
 import os
-import itertools
 import pygit2
 import subprocess
 import sys
@@ -8,7 +7,15 @@ import click
 
 from kart.cli_util import KartGroup, add_help_subcommand, tool_environment
 from kart.exceptions import SubprocessError
-from kart.lfs_util import get_hash_from_pointer_file, get_local_path_from_lfs_hash
+from kart.lfs_commands.batch_download import (
+    LfsBatchDownloader,
+    get_lfs_http_endpoint,
+)
+from kart.lfs_util import (
+    get_hash_from_pointer_file,
+    get_local_path_from_lfs_hash,
+    pointer_file_bytes_to_dict,
+)
 from kart.object_builder import ObjectBuilder
 from kart.rev_list_objects import rev_list_tile_pointer_files
 from kart.repo import KartRepoState
@@ -54,13 +61,16 @@ def pre_push(ctx, remote_name, remote_url, dry_run):
     start_commits, stop_commits = get_start_and_stop_commits(sys.stdin)
 
     lfs_oids = set()
-    for (commit_id, path_match_result, pointer_blob) in rev_list_tile_pointer_files(
-        repo, start_commits, stop_commits
-    ):
+    for (
+        commit_id,
+        path_match_result,
+        pointer_oid,
+        pointer_data,
+    ) in rev_list_tile_pointer_files(repo, start_commits, stop_commits):
         # Because of the way a Kart repo is laid out, we know that:
         # All LFS pointer files are blobs inside **/.point-cloud-dataset.v?/tile/**
         # All blobs inside **/.point-cloud-dataset.v?/tile/** are LFS pointer files.
-        lfs_oids.add(get_hash_from_pointer_file(pointer_blob))
+        lfs_oids.add(get_hash_from_pointer_file(pointer_data))
 
     if dry_run:
         click.echo(
@@ -121,11 +131,12 @@ def fetch(ctx, remote, commits, dry_run):
 
 
 def fetch_lfs_blobs_for_commits(
-    repo, commits, *, remote_name=None, dry_run=False, quiet=False
+    repo, commits, *, remote_name=None, dry_run=False, quiet=False, spatial_filter=None
 ):
     """
     Given a list of commits (or commit OIDS), fetch all the tiles from those commits that
-    are not already present in the local cache.
+    are not already present in the local cache, and that match the given spatial filter.
+    The spatial filter defaults to the repo's spatial filter - pass SpatialFilter.MATCH_ALL to fetch every tile.
     """
     if not commits:
         return
@@ -135,13 +146,18 @@ def fetch_lfs_blobs_for_commits(
     if not remote_name:
         return
 
+    if spatial_filter is None:
+        spatial_filter = repo.spatial_filter
+
     pointer_file_oids = set()
     for commit in commits:
         for dataset in repo.datasets(commit, filter_dataset_type="point-cloud"):
-            pointer_file_oids.update(blob.hex for blob in dataset.tile_pointer_blobs())
+            pointer_file_oids.update(
+                blob.hex for blob in dataset.tile_pointer_blobs(spatial_filter)
+            )
 
     fetch_lfs_blobs_for_pointer_files(
-        repo, pointer_file_oids, dry_run=dry_run, quiet=quiet
+        repo, pointer_file_oids, remote_name=remote_name, dry_run=dry_run, quiet=quiet
     )
 
 
@@ -151,6 +167,9 @@ def fetch_lfs_blobs_for_pointer_files(
     """
     Given a list of pointer files (or OIDs of pointer files themselves - not the OIDs they point to)
     fetch all the tiles that those pointer files point to that are not already present in the local cache.
+    Spatial filtering is up to the caller - see PointCloudV1.tile_pointer_blobs.
+    If the remote's LFS server can be reached over HTTP(S), the tiles are fetched using LfsBatchDownloader -
+    otherwise, using git-lfs fetch.
     """
     if not pointer_files:
         return
@@ -160,12 +179,8 @@ def fetch_lfs_blobs_for_pointer_files(
     if not remote_name:
         return
 
-    next_blob_name = (str(i) for i in itertools.count(start=0, step=1))
-
-    # TODO - directly instruct Git-LFS to fetch blobs instead of creating a tree to point Git-LFS to,
-    # as and when Git-LFS supports this.
-    object_builder = ObjectBuilder(repo, None)
-    dry_run_output = []
+    # LFS oid -> (pointer blob, LFS object size)
+    blobs_to_fetch = {}
 
     for pointer_file in pointer_files:
         if isinstance(pointer_file, str):
@@ -179,30 +194,51 @@ def fetch_lfs_blobs_for_pointer_files(
         if lfs_path.is_file():
             continue  # Already fetched.
 
-        # TODO - don't fetch tiles that are outside the spatial filter.
-
-        object_builder.insert(next(next_blob_name), pointer_blob)
-        if dry_run:
-            dry_run_output.append(f"{lfs_oid} ({pointer_blob.hex})")
+        size = pointer_file_bytes_to_dict(pointer_blob)["size"]
+        blobs_to_fetch[lfs_oid] = (pointer_blob, size)
 
     if dry_run:
         click.echo(
-            f"Running fetch with --dry-run: fetching {len(dry_run_output)} LFS blobs"
+            f"Running fetch with --dry-run: fetching {len(blobs_to_fetch)} LFS blobs"
         )
-        if dry_run_output:
+        if blobs_to_fetch:
             click.echo(
                 "LFS blob OID:                                                    (Pointer file OID):"
             )
-            for line in sorted(dry_run_output):
-                click.echo(line)
+            for lfs_oid, (pointer_blob, size) in sorted(blobs_to_fetch.items()):
+                click.echo(f"{lfs_oid} ({pointer_blob.hex})")
         return
 
-    tree = object_builder.flush()
-    if not tree:
+    if not blobs_to_fetch:
         return
 
+    endpoint = get_lfs_http_endpoint(repo, remote_name)
+    if endpoint:
+        downloader = LfsBatchDownloader(repo, endpoint, quiet=quiet)
+        downloader.download(
+            [
+                (lfs_oid, size)
+                for lfs_oid, (pointer_blob, size) in blobs_to_fetch.items()
+            ]
+        )
+    else:
+        _fetch_lfs_blobs_using_git_lfs(
+            repo,
+            [pointer_blob for pointer_blob, size in blobs_to_fetch.values()],
+            remote_name=remote_name,
+            quiet=quiet,
+        )
+
+
+def _fetch_lfs_blobs_using_git_lfs(repo, pointer_blobs, *, remote_name, quiet=False):
+    # TODO - directly instruct Git-LFS to fetch blobs instead of creating a tree to point Git-LFS to,
+    # as and when Git-LFS supports this.
+    object_builder = ObjectBuilder(repo, None)
+    for i, pointer_blob in enumerate(pointer_blobs):
+        object_builder.insert(str(i), pointer_blob)
+    tree = object_builder.flush()
+
     try:
-        # TODO - capture progress reporting and do our own.
         extra_kwargs = {"stdout": subprocess.DEVNULL} if quiet else {}
         subprocess.check_call(
             ["git-lfs", "fetch", remote_name, tree.hex],
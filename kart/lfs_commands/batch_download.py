@@ -0,0 +1,452 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
+import http.client
+import json
+import logging
+import os
+import ssl
+import subprocess
+import threading
+import time
+import urllib.request
+from urllib.parse import unquote, urljoin, urlsplit, urlunsplit
+import uuid
+
+import click
+
+from kart.cli_util import GIT_CONFIG_DEFAULT_OVERRIDES, tool_environment
+from kart.exceptions import InvalidOperation, NotFound, CONNECTION_ERROR
+from kart.lfs_util import get_local_path_from_lfs_hash
+from kart.utils import chunk
+
+L = logging.getLogger(__name__)
+
+# Documentation on the LFS batch API is available here:
+# https://github.com/git-lfs/git-lfs/blob/main/docs/api/batch.md
+
+LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+
+# Git-LFS asks for at most this many objects per batch request.
+BATCH_SIZE = 100
+
+# The same default as Git-LFS uses for lfs.concurrenttransfers.
+DEFAULT_CONCURRENT_TRANSFERS = 8
+
+TIMEOUT = 60
+MAX_REDIRECTS = 5
+_BUF_SIZE = 1 * 1024 * 1024  # 1MB
+
+# HTTP config that LfsBatchDownloader doesn't support - if any of these are set, Git-LFS is used instead.
+UNSUPPORTED_HTTP_CONFIG = (
+    "http.extraheader",
+    "http.sslcert",
+    "http.sslkey",
+    "http.cookiefile",
+)
+
+
+def get_lfs_http_endpoint(repo, remote_name):
+    """
+    Returns the URL of the LFS server for the given remote, found in the same way that Git-LFS finds it, as long as we
+    can talk to it directly using HTTP(S). Otherwise (eg, SSH remotes, or if a proxy is configured) returns None, in
+    which case Git-LFS should be used instead. This is also the case if any HTTP config is set that we don't support,
+    such as http.extraHeader or any http.<url>.* config.
+    """
+    url = repo.get_config_str(f"remote.{remote_name}.lfsurl") or repo.get_config_str(
+        "lfs.url"
+    )
+    if not url:
+        try:
+            url = repo.remotes[remote_name].url
+        except KeyError:
+            return None
+        url = url.rstrip("/")
+        url = f"{url}/info/lfs" if url.endswith(".git") else f"{url}.git/info/lfs"
+
+    url_parts = urlsplit(url)
+    if url_parts.scheme not in ("http", "https"):
+        return None
+    if repo.get_config_str("http.proxy") or (
+        urllib.request.getproxies().get(url_parts.scheme)
+        and not urllib.request.proxy_bypass(url_parts.hostname)
+    ):
+        return None
+    if _has_unsupported_http_config(repo):
+        return None
+    return url
+
+
+def _has_unsupported_http_config(repo):
+    for entry in repo.config:
+        name = entry.name.lower()
+        if not name.startswith("http."):
+            continue
+        # Per-URL config has the form http.<url>.<key> - the URL contains at least one dot, unlike any plain key.
+        if name in UNSUPPORTED_HTTP_CONFIG or name.count(".") >= 2:
+            return True
+    return False
+
+
+def get_ssl_context(repo):
+    """
+    Returns an SSL context that verifies servers the same way git does, according to http.sslCAInfo, http.sslCAPath
+    and http.sslVerify (or the GIT_SSL_CAINFO, GIT_SSL_CAPATH and GIT_SSL_NO_VERIFY environment variables). As when
+    Kart runs git, the CA bundle defaults to certifi's on Linux - see GIT_CONFIG_DEFAULT_OVERRIDES.
+    """
+    cafile = (
+        os.environ.get("GIT_SSL_CAINFO")
+        or repo.get_config_str("http.sslCAInfo")
+        or GIT_CONFIG_DEFAULT_OVERRIDES.get("http.sslCAInfo")
+    )
+    capath = os.environ.get("GIT_SSL_CAPATH") or repo.get_config_str("http.sslCAPath")
+    context = ssl.create_default_context(cafile=cafile, capath=capath)
+    if os.environ.get("GIT_SSL_NO_VERIFY") or not repo.get_config_bool(
+        "http.sslVerify", True
+    ):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class LfsBatchDownloader:
+    """
+    Downloads LFS objects into the local LFS cache from an LFS server, using the LFS batch API.
+    Objects are downloaded concurrently by several threads, each of which keeps its own HTTP connection(s) alive
+    between downloads. The SHA256 of each object is verified as it is streamed to disk, and only once it is verified
+    is the object moved into the local LFS cache.
+    """
+
+    def __init__(self, repo, endpoint, *, num_workers=None, quiet=False):
+        self.repo = repo
+        self.num_workers = num_workers or repo.get_config_int(
+            "lfs.concurrenttransfers", DEFAULT_CONCURRENT_TRANSFERS
+        )
+        self.quiet = quiet
+
+        # Credentials can be supplied in the URL, otherwise we ask git-credential if the server requires them.
+        url_parts = urlsplit(endpoint)
+        self.endpoint = urlunsplit(
+            url_parts._replace(netloc=url_parts.netloc.rpartition("@")[2])
+        ).rstrip("/")
+        self.credentials = None
+        if url_parts.username:
+            self.credentials = {
+                "username": unquote(url_parts.username),
+                "password": unquote(url_parts.password or ""),
+            }
+
+        self.lfs_tmp_path = repo.gitdir_path / "lfs" / "objects" / "tmp"
+        self.ssl_context = get_ssl_context(repo)
+        self._thread_local = threading.local()
+
+    def download(self, objects):
+        """
+        Downloads the given objects - a list of (oid, size) tuples - into the local LFS cache.
+        The download links for each batch of objects are only requested once the previous batch is nearly done,
+        so that they don't expire before they are used. If the server can't provide some of the objects, all the
+        others are still downloaded before an error is raised.
+        """
+        if not objects:
+            return
+
+        self.lfs_tmp_path.mkdir(parents=True, exist_ok=True)
+        progress = _DownloadProgress(len(objects), quiet=self.quiet)
+        batches = chunk(objects, BATCH_SIZE)
+        pending = set()
+        object_errors = []
+        executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        try:
+            while True:
+                while len(pending) < BATCH_SIZE:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    pending.update(
+                        executor.submit(self._download_object, obj)
+                        for obj in self._request_batch(batch, object_errors)
+                    )
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    progress.update(future.result())
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+        progress.finish()
+        if object_errors:
+            _raise_object_errors(object_errors)
+
+    def _request_batch(self, batch, object_errors):
+        """
+        Asks the LFS server where to download the given batch of objects from, and returns its response objects.
+        Response objects that have an error instead (eg, the server doesn't have that object) are appended to
+        object_errors instead of being returned.
+        """
+        body = json.dumps(
+            {
+                "operation": "download",
+                "transfers": ["basic"],
+                "objects": [{"oid": oid, "size": size} for oid, size in batch],
+                "hash_algo": "sha256",
+            }
+        )
+        headers = {"Accept": LFS_MEDIA_TYPE, "Content-Type": LFS_MEDIA_TYPE}
+        url = f"{self.endpoint}/objects/batch"
+
+        status, data = self._request_with_credentials("POST", url, body, headers)
+        if status != 200:
+            raise InvalidOperation(
+                f"LFS batch request to {url} failed: HTTP {status}\n{_error_message(data)}",
+                exit_code=CONNECTION_ERROR,
+            )
+
+        result = []
+        for obj in json.loads(data)["objects"]:
+            if obj.get("error"):
+                object_errors.append(obj)
+            else:
+                result.append(obj)
+        return result
+
+    def _request_with_credentials(self, method, url, body, headers):
+        """
+        Makes a request, and if the server responds 401 Unauthorized, asks git-credential for a username and password
+        and tries again. Returns the status and the response body.
+        """
+        filled_credentials = False
+        while True:
+            request_headers = dict(headers)
+            if self.credentials:
+                request_headers["Authorization"] = _basic_auth(self.credentials)
+            response = self._request(method, url, body, request_headers)
+            data = _read_response(response, url)
+            if response.status != 401 or filled_credentials:
+                break
+            try:
+                self.credentials = self._git_credential("fill", url)
+            except subprocess.CalledProcessError:
+                raise InvalidOperation(
+                    f"LFS server at {self.endpoint} requires authentication",
+                    exit_code=CONNECTION_ERROR,
+                )
+            filled_credentials = True
+
+        if filled_credentials:
+            # Let git-credential know whether these credentials worked, so it can store or forget them.
+            action = "reject" if response.status == 401 else "approve"
+            self._git_credential(action, url, self.credentials)
+        return response.status, data
+
+    def _git_credential(self, action, url, credentials=None):
+        url_parts = urlsplit(url)
+        lines = [
+            f"protocol={url_parts.scheme}",
+            f"host={url_parts.netloc}",
+            f"path={url_parts.path.lstrip('/')}",
+        ]
+        if credentials:
+            lines += [f"{key}={value}" for key, value in credentials.items()]
+        output = subprocess.run(
+            ["git", "credential", action],
+            input="\n".join(lines) + "\n\n",
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            env=tool_environment(),
+            cwd=self.repo.path,
+            check=(action == "fill"),
+        ).stdout
+        result = dict(
+            line.split("=", maxsplit=1) for line in output.splitlines() if "=" in line
+        )
+        return {k: v for k, v in result.items() if k in ("username", "password")}
+
+    def _download_object(self, obj):
+        """Downloads the given object from a batch response into the local LFS cache, and returns its size."""
+        oid, size = obj["oid"], obj["size"]
+        action = obj.get("actions", {}).get("download")
+        if action is None:
+            raise NotFound(f"LFS server didn't return a download link for {oid}")
+
+        url = action["href"]
+        response = self._get_following_redirects(url, action.get("header"))
+        if response.status != 200:
+            data = _read_response(response, url)
+            raise InvalidOperation(
+                f"Error fetching LFS object {oid}: HTTP {response.status}\n{_error_message(data)}",
+                exit_code=CONNECTION_ERROR,
+            )
+
+        tmp_object_path = self.lfs_tmp_path / str(uuid.uuid4())
+        try:
+            sha256 = hashlib.sha256()
+            length = 0
+            with open(tmp_object_path, "wb") as dest:
+                while True:
+                    data = _read_response(response, url, _BUF_SIZE)
+                    if not data:
+                        break
+                    sha256.update(data)
+                    dest.write(data)
+                    length += len(data)
+
+            if length != size or sha256.hexdigest() != oid:
+                raise InvalidOperation(
+                    f"Error fetching LFS object {oid}: downloaded content doesn't match (size {length}, sha256:{sha256.hexdigest()})",
+                    exit_code=CONNECTION_ERROR,
+                )
+            object_path = get_local_path_from_lfs_hash(self.repo, oid)
+            object_path.parents[0].mkdir(parents=True, exist_ok=True)
+            tmp_object_path.replace(object_path)
+        finally:
+            if tmp_object_path.exists():
+                tmp_object_path.unlink()
+        return length
+
+    def _get_following_redirects(self, url, headers):
+        headers = dict(headers or {})
+        for i in range(MAX_REDIRECTS + 1):
+            response = self._request("GET", url, None, headers)
+            if response.status not in (301, 302, 303, 307, 308):
+                return response
+            _read_response(response, url)
+            new_url = urljoin(url, response.getheader("Location"))
+            if urlsplit(new_url).netloc != urlsplit(url).netloc:
+                # Don't send the headers (which might include authorization) to a different host.
+                headers = {}
+            url = new_url
+        raise InvalidOperation(
+            f"Too many redirects fetching {url}", exit_code=CONNECTION_ERROR
+        )
+
+    def _request(self, method, url, body, headers):
+        """
+        Makes a request using the current thread's connection to the URL's host, which is kept open for reuse.
+        The response must be read completely before the next request. Network errors are raised as InvalidOperation.
+        """
+        url_parts = urlsplit(url)
+        key = (url_parts.scheme, url_parts.netloc)
+        path = urlunsplit(("", "", url_parts.path or "/", url_parts.query, ""))
+        connections = self._thread_local.__dict__.setdefault("connections", {})
+
+        for attempt in range(2):
+            connection = connections.get(key)
+            if connection is None:
+                connection = connections[key] = self._connect(url_parts)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                return connection.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                del connections[key]
+                # The server may have closed an idle connection - reconnect and try again, once.
+                retry = isinstance(e, (ConnectionError, http.client.HTTPException))
+                if attempt or not retry:
+                    raise _connection_error(url, e) from e
+
+    def _connect(self, url_parts):
+        if url_parts.scheme == "https":
+            return http.client.HTTPSConnection(
+                url_parts.hostname,
+                url_parts.port,
+                timeout=TIMEOUT,
+                context=self.ssl_context,
+            )
+        return http.client.HTTPConnection(
+            url_parts.hostname, url_parts.port, timeout=TIMEOUT
+        )
+
+
+class _DownloadProgress:
+    """Shows the number of objects downloaded so far, along with the overall throughput."""
+
+    INTERVAL = 0.2
+
+    def __init__(self, total, *, quiet=False):
+        self.total = total
+        self.quiet = quiet
+        self.count = 0
+        self.size = 0
+        self.start_time = time.monotonic()
+        self.last_output_time = None
+
+    def update(self, size):
+        self.count += 1
+        self.size += size
+        now = time.monotonic()
+        if (
+            self.last_output_time is None
+            or now - self.last_output_time >= self.INTERVAL
+        ):
+            self.last_output_time = now
+            self._output(nl=False)
+
+    def finish(self):
+        self._output(nl=True)
+
+    def _output(self, nl):
+        if self.quiet:
+            return
+        elapsed = max(time.monotonic() - self.start_time, 0.001)
+        click.echo(
+            f"Fetching LFS tiles: {self.count}/{self.total}, "
+            f"{_format_size(self.size)} | {_format_size(self.size / elapsed)}/s   \r",
+            nl=nl,
+        )
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    return f"{size:.1f} {unit}"
+
+
+# Maximum number of per-object errors listed when some objects couldn't be fetched.
+MAX_ERRORS_SHOWN = 10
+
+
+def _raise_object_errors(object_errors):
+    messages = [
+        f"Error fetching LFS object {obj['oid']}: {obj['error'].get('message')}"
+        for obj in object_errors[:MAX_ERRORS_SHOWN]
+    ]
+    if len(object_errors) > MAX_ERRORS_SHOWN:
+        messages.append(f"... and {len(object_errors) - MAX_ERRORS_SHOWN} more")
+    message = "\n".join(messages)
+    if all(obj["error"].get("code") == 404 for obj in object_errors):
+        raise NotFound(message)
+    raise InvalidOperation(message, exit_code=CONNECTION_ERROR)
+
+
+def _read_response(response, url, amt=None):
+    try:
+        return response.read(amt)
+    except (OSError, http.client.HTTPException) as e:
+        raise _connection_error(url, e) from e
+
+
+def _connection_error(url, error):
+    # Leave out the query string, which can contain a signature that grants access.
+    url_parts = urlsplit(url)
+    url = urlunsplit((url_parts.scheme, url_parts.netloc, url_parts.path, "", ""))
+    return InvalidOperation(
+        f"Error connecting to {url}: {error}", exit_code=CONNECTION_ERROR
+    )
+
+
+def _basic_auth(credentials):
+    user_pass = f"{credentials.get('username', '')}:{credentials.get('password', '')}"
+    return "Basic " + base64.b64encode(user_pass.encode("utf-8")).decode("ascii")
+
+
+def _error_message(data):
+    try:
+        return json.loads(data)["message"]
+    except (ValueError, KeyError, TypeError):
+        return data.decode("utf-8", errors="replace")[:1000]
@@ -1,10 +1,13 @@
 import base64
 import hashlib
 import logging
+import mmap
+import os
 from pathlib import Path
 import re
 import shutil
 import stat
+import sys
 import uuid
 
 import pygit2
@@ -15,7 +18,8 @@ L = logging.getLogger(__name__)
 
 POINTER_PATTERN = re.compile(rb"^oid sha256:([0-9a-fA-F]{64})$", re.MULTILINE)
 
-_BUF_SIZE = 1 * 1024 * 1024  # 1MB
+# From linux/fs.h - makes one file a copy-on-write clone of another, on filesystems that support it.
+_FICLONE = 0x40049409
 
 _STANDARD_LFS_KEYS = set(("version", "oid", "size"))
 _EMPTY_SHA256 = "sha256:" + ("0" * 64)
@@ -42,42 +46,74 @@ def get_hash_and_size_of_file(path):
 
     size = path.stat().st_size
     sha256 = hashlib.sha256()
-    with open(str(path), "rb") as src:
-        while True:
-            data = src.read(_BUF_SIZE)
-            if not data:
-                break
-            sha256.update(data)
+    if size:
+        # Hashing the whole file in one call lets hashlib release the GIL for the entire file.
+        with open(str(path), "rb") as src:
+            with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                sha256.update(data)
     return sha256.hexdigest(), size
 
 
-def get_hash_and_size_of_file_while_copying(src_path, dest_path, allow_overwrite=False):
+def link_or_copy_file(src_path, dest_path, *, hardlink=False):
     """
-    Given a path to a file, calculates and returns its SHA256 hash and length in bytes,
-    while copying it to the given destination.
+    Makes the file at dest_path a copy of the file at src_path, replacing any file that is already at dest_path.
+    Where possible, no data is actually copied:
+    - if hardlink is True, dest_path is hard-linked to src_path. This means both paths refer to the same file,
+      so this should only be used if the file won't be modified in place.
+    - otherwise, if the filesystem supports it (eg Btrfs, XFS), dest_path is made a copy-on-write clone of src_path.
+    Otherwise, the data is copied.
     """
-    if not isinstance(src_path, Path):
-        src_path = Path(src_path)
-    assert src_path.is_file()
-
-    if not isinstance(dest_path, Path):
-        dest_path = Path(dest_path)
-
-    if allow_overwrite:
-        assert not dest_path.is_dir()
+    src_path, dest_path = str(src_path), str(dest_path)
+    # Never write into the existing file - it could be a hard link to another file, which we mustn't change.
+    try:
+        os.unlink(dest_path)
+    except FileNotFoundError:
+        pass
+
+    if hardlink:
+        try:
+            os.link(src_path, dest_path)
+            return
+        except OSError as e:
+            L.debug("Can't hard-link %s to %s: %s", dest_path, src_path, e)
+
+    if _clone_file(src_path, dest_path):
+        shutil.copymode(src_path, dest_path)
     else:
-        assert not dest_path.exists()
+        shutil.copy(src_path, dest_path)
 
-    size = src_path.stat().st_size
-    sha256 = hashlib.sha256()
-    with open(str(src_path), "rb") as src, open(str(dest_path), "wb") as dest:
-        while True:
-            data = src.read(_BUF_SIZE)
-            if not data:
-                break
-            sha256.update(data)
-            dest.write(data)
-    return sha256.hexdigest(), size
+
+def _clone_file(src_path, dest_path):
+    """
+    Tries to make dest_path a clone of src_path without copying the data through userspace.
+    Returns True if successful.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), _FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+
+        if not hasattr(os, "copy_file_range"):
+            # Python 3.8+ only.
+            return False
+        # The kernel does the copy - some filesystems (eg NFS, or XFS on newer kernels) do it without copying any data.
+        remaining = os.fstat(src.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+                if not copied:
+                    return False
+                remaining -= copied
+        except OSError:
+            return False
+        return True
 
 
 def dict_to_pointer_file_bytes(pointer_dict, only_standard_keys=True):
@@ -160,6 +196,21 @@ def get_hash_from_pointer_file(pointer_file_bytes):
     return None
 
 
+def lfs_hardlinks_enabled(repo):
+    """
+    Returns True if files should be hard-linked out of the local LFS cache (eg, into the working copy) rather than
+    copied, where possible. See KartConfigKeys.KART_LFS_HARDLINKS.
+    """
+    from kart.repo import KartConfigKeys
+
+    return repo.get_config_bool(KartConfigKeys.KART_LFS_HARDLINKS, False)
+
+
+def copy_file_from_local_lfs_cache(repo, lfs_path, dest_path):
+    """Copies a file from the local LFS cache to dest_path (eg, into the working copy) using link_or_copy_file."""
+    link_or_copy_file(lfs_path, dest_path, hardlink=lfs_hardlinks_enabled(repo))
+
+
 def get_local_path_from_lfs_hash(repo, lfs_hash):
     """Given a sha256 LFS hash, finds where the object would be stored in the local LFS cache."""
     if lfs_hash.startswith("sha256:"):
@@ -177,6 +228,9 @@ def copy_file_to_local_lfs_cache(
     Optionally takes a conversion function which can convert the file while copying it - this saves us doing an extra
     copy after the convert operation, if we just write the converted version to where we would copy it.
     Optionally takes the oid and size of the source, if this is known, to avoid recomputing it.
+    Nothing is copied if the LFS cache already contains the file - otherwise, it is copied using link_or_copy_file.
+    The file is never hard-linked into the LFS cache, even if kart.lfs.hardlinks is set - the source file could be
+    modified in place later (eg, an import source that is reprocessed), which would corrupt the LFS cache.
     """
 
     lfs_tmp_path = repo.gitdir_path / "lfs" / "objects" / "tmp"
@@ -184,22 +238,20 @@ def copy_file_to_local_lfs_cache(
 
     tmp_object_path = lfs_tmp_path / str(uuid.uuid4())
     if conversion_func is None:
-        if oid_and_size:
-            oid, size = oid_and_size
-            shutil.copy(source_path, tmp_object_path)
-        else:
-            # We can find the hash while copying in this case.
-            # TODO - check if this is actually any faster.
-            oid, size = get_hash_and_size_of_file_while_copying(
-                source_path, tmp_object_path
-            )
+        oid, size = oid_and_size or get_hash_and_size_of_file(source_path)
+        if oid.startswith("sha256:"):
+            oid = oid[7:]  # len("sha256:")
+        actual_object_path = get_local_path_from_lfs_hash(repo, oid)
+        if not actual_object_path.is_file():
+            link_or_copy_file(source_path, tmp_object_path)
     else:
         conversion_func(source_path, tmp_object_path)
         oid, size = get_hash_and_size_of_file(tmp_object_path)
+        actual_object_path = get_local_path_from_lfs_hash(repo, oid)
 
-    actual_object_path = get_local_path_from_lfs_hash(repo, oid)
-    actual_object_path.parents[0].mkdir(parents=True, exist_ok=True)
-    tmp_object_path.rename(actual_object_path)
+    if tmp_object_path.exists():
+        actual_object_path.parents[0].mkdir(parents=True, exist_ok=True)
+        tmp_object_path.replace(actual_object_path)
 
     return {
         "version": "https://git-lfs.github.com/spec/v1",
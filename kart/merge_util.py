@@ -15,6 +15,7 @@ from .tabular.feature_output import feature_as_geojson, feature_as_json, feature
 from .utils import ungenerator
 from kart.lfs_commands import fetch_lfs_blobs_for_commits
 from kart.point_cloud.tilename_util import set_tile_extension
+from kart.spatial_filter import SpatialFilter
 
 
 MERGE_HEAD = KartRepoFiles.MERGE_HEAD
@@ -889,7 +890,10 @@ class WorkingCopyMerger:
             return
 
         commit_ids = set(v.commit_id for v in self.merge_context.versions if v)
-        fetch_lfs_blobs_for_commits(self.repo, commit_ids)
+        # Every version of a conflicting tile is written to the working copy, even if it is outside the spatial filter.
+        fetch_lfs_blobs_for_commits(
+            self.repo, commit_ids, spatial_filter=SpatialFilter.MATCH_ALL
+        )
 
     def resolve_conflict(self, conflict):
         """
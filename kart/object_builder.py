@@ -11,6 +11,10 @@ class ObjectBuilder:
     whereas a pygit2.TreeBuilder only lets you modify one tree at a time.
     Also a bit like a pygit2.Index, but much more performant since it uses dicts instead of sorted vectors.
     Conflicts are not detected.
+
+    Blobs are written as soon as they are inserted, and only their IDs are buffered - so buffering millions of
+    feature changes doesn't mean holding millions of blobs in memory. (When used with a packfile_object_builder,
+    the blobs are written to the MemPack, which would otherwise hold a second copy of them by the time of the flush).
     """
 
     def __init__(self, repo, initial_root_tree):
@@ -66,6 +70,8 @@ class ObjectBuilder:
         """Writes the given data - a tree, a blob, a bytes, or None - at the given relative path."""
         path = self._resolve_path(path)
         self._ensure_writeable(writeable)
+        if isinstance(writeable, (bytes, bytearray)):
+            writeable = self.repo.create_blob(bytes(writeable))
 
         cur_dict = self.root_dict
         for name in path[:-1]:
@@ -88,8 +94,10 @@ class ObjectBuilder:
         A new version of the root tree is returned - this tree should be committed by the client if these changes are
         to persist. Alternatively, more changes can be made and flushed before committing.
         """
-        self.root_tree = copy_and_modify_tree(self.repo, self.root_tree, self.root_dict)
-        self.root_dict = {}
+        root_dict, self.root_dict = self.root_dict, {}
+        self.root_tree = copy_and_modify_tree(
+            self.repo, self.root_tree, root_dict, consume=True
+        )
         return self.root_tree
 
     def commit(self, ref_name, author, committer, message, parent_oids):
@@ -107,12 +115,15 @@ class ObjectBuilder:
             raise ValueError(f"Expected a writeable type but found {type(writeable)}")
 
 
-def copy_and_modify_tree(repo, tree, changes):
+def copy_and_modify_tree(repo, tree, changes, *, consume=False):
     """
     Given a tree, and a nested dictionary of changes to be made to that tree, returns a modified copy of that tree.
     Each dicts keys are path components, and the leaf values must be the desired new value at that path -
-    either pygit2.Tree, a pygi2.Blob, a bytes, or None (None means delete the data at the specified path).
+    either pygit2.Tree, a pygi2.Blob, a pygit2.Oid of a blob, a bytes, or None (None means delete the data at the
+    specified path).
     Conflicts are not detected.
+    If consume is True, the changes are removed from the dictionaries as they are written, so that each subtree's
+    changes can be garbage collected as soon as that subtree is written, rather than once the whole tree is written.
     """
     if tree is None:
         tree = _empty_tree(repo)
@@ -120,18 +131,21 @@ def copy_and_modify_tree(repo, tree, changes):
         return tree
 
     tree_builder = repo.TreeBuilder(tree)
-    for name, new_value in changes.items():
+    for name in list(changes):
+        new_value = changes.pop(name) if consume else changes[name]
         if isinstance(new_value, dict):
             try:
                 subtree = tree / name
             except KeyError:
                 subtree = None
-            subtree = copy_and_modify_tree(repo, subtree, new_value)
+            subtree = copy_and_modify_tree(repo, subtree, new_value, consume=consume)
             tree_builder.insert(name, subtree.oid, pygit2.GIT_FILEMODE_TREE)
         elif isinstance(new_value, pygit2.Tree):
             tree_builder.insert(name, new_value.oid, pygit2.GIT_FILEMODE_TREE)
         elif isinstance(new_value, pygit2.Blob):
             tree_builder.insert(name, new_value.oid, pygit2.GIT_FILEMODE_BLOB)
+        elif isinstance(new_value, pygit2.Oid):
+            tree_builder.insert(name, new_value, pygit2.GIT_FILEMODE_BLOB)
         elif isinstance(new_value, bytes):
             blob_oid = repo.create_blob(new_value)
             tree_builder.insert(name, blob_oid, pygit2.GIT_FILEMODE_BLOB)
@@ -44,6 +44,7 @@ from kart.tabular.version import (
     SUPPORTED_VERSIONS,
     extra_blobs_for_version,
 )
+from kart.utils import map_in_threads
 from kart.working_copy import PartType
 
 
@@ -117,6 +118,13 @@ L = logging.getLogger(__name__)
         "such a commit. This option bypasses the safety"
     ),
 )
+@click.option(
+    "--jobs",
+    "num_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of tiles to inspect, hash and convert concurrently during the import.",
+)
 @click.argument("sources", metavar="SOURCES", nargs=-1, required=False)
 def point_cloud_import(
     ctx,
@@ -129,6 +137,7 @@ def point_cloud_import(
     delete,
     amend,
     allow_empty,
+    num_workers,
     sources,
 ):
     """
@@ -176,11 +185,16 @@ def point_cloud_import(
     source_to_metadata = {}
     source_to_hash_and_size = {}
 
+    def inspect_source(source):
+        return extract_pc_tile_metadata(source), get_hash_and_size_of_file(source)
+
     if sources:
-        for source in sources:
+        for source, (metadata, hash_and_size) in map_in_threads(
+            inspect_source, sources, num_workers
+        ):
             click.echo(f"Checking {source}...          \r", nl=False)
-            source_to_metadata[source] = extract_pc_tile_metadata(source)
-            source_to_hash_and_size[source] = get_hash_and_size_of_file(source)
+            source_to_metadata[source] = metadata
+            source_to_hash_and_size[source] = hash_and_size
         click.echo()
 
     if not convert_to_copc:
@@ -304,9 +318,8 @@ def point_cloud_import(
         for i, blob_path in write_blobs_to_stream(proc.stdin, extra_blobs):
             pass
 
+        source_to_blob_path = {}
         for source in sources:
-            click.echo(f"Importing {source}...")
-            source_metadata = source_to_metadata[source]
             tilename = PointCloudV1.tilename_from_path(source)
             rel_blob_path = PointCloudV1.tilename_to_blob_path(tilename, relative=True)
             blob_path = f"{ds_inner_path}/{rel_blob_path}"
@@ -324,6 +337,7 @@ def point_cloud_import(
                     ):
                         # This tile has already been imported before. Reuse it rather than re-importing it.
                         # (Especially don't use PDAL to reconvert it - that creates pointless diffs due to recompression).
+                        click.echo(f"Importing {source}...")
                         write_blob_to_stream(
                             proc.stdin,
                             blob_path,
@@ -332,24 +346,37 @@ def point_cloud_import(
                         del source_to_metadata[source]
                         continue
 
-            tile_is_copc = source_metadata["format"]["optimization"] == "copc"
+            source_to_blob_path[source] = blob_path
+
+        def copy_source_to_lfs_cache(source):
+            tile_is_copc = (
+                source_to_metadata[source]["format"]["optimization"] == "copc"
+            )
             conversion_func = None
 
             if convert_to_copc and not tile_is_copc:
                 conversion_func = convert_tile_to_copc_and_reextract_metadata
 
-            pointer_dict = copy_file_to_local_lfs_cache(
+            return copy_file_to_local_lfs_cache(
                 repo,
                 source,
                 conversion_func,
                 oid_and_size=source_to_hash_and_size[source],
             )
+
+        # Tiles are copied (and converted) concurrently, and written to fast-import in whatever order they finish.
+        for source, pointer_dict in map_in_threads(
+            copy_source_to_lfs_cache, source_to_blob_path, num_workers, ordered=False
+        ):
+            click.echo(f"Importing {source}...")
             pointer_dict = format_tile_for_pointer_file(
                 source_to_metadata[source]["tile"], pointer_dict
             )
 
             write_blob_to_stream(
-                proc.stdin, blob_path, dict_to_pointer_file_bytes(pointer_dict)
+                proc.stdin,
+                source_to_blob_path[source],
+                dict_to_pointer_file_bytes(pointer_dict),
             )
 
         rewrite_metadata = (
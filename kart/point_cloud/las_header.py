@@ -0,0 +1,135 @@
+import mmap
+import struct
+
+from kart.point_cloud.schema_util import PDRF_TO_RECORD_LENGTH
+
+# Reads the metadata Kart needs directly from the header and VLRs of a LAS / LAZ / COPC tile, so that we don't need
+# to start a PDAL subprocess for every tile just to read a few hundred bytes.
+
+# Documentation on the LAS header and VLRs is available here:
+# https://www.asprs.org/wp-content/uploads/2019/07/LAS_1_4_r15.pdf
+# And on the COPC info VLR here:
+# https://copc.io/
+
+LAS_SIGNATURE = b"LASF"
+
+# The public header block, up to and including the extent. Fields we don't need are skipped.
+# signature, global encoding, major version, minor version, header size, offset to point data, number of VLRs,
+# PDRF, point data record length, legacy point count, max x, min x, max y, min y, max z, min z.
+HEADER = struct.Struct("<4s2xH16xBB64x4xHIIBHI20x48x6d")
+# The fields added to the end of the header in LAS 1.4 (after the waveform data offset):
+# offset to first EVLR, number of EVLRs, point count.
+HEADER_1_4 = struct.Struct("<8xQIQ")
+
+# user ID, record ID, record length after header.
+VLR_HEADER = struct.Struct("<2x16sHH32x")
+EVLR_HEADER = struct.Struct("<2x16sHQ32x")
+
+GLOBAL_ENCODING_WKT = 0x10
+
+# LAZ files have the high bits of the PDRF set.
+PDRF_COMPRESSED = 0x80
+PDRF_MASK = 0x3F
+
+WKT_VLR = (b"LASF_Projection", 2112)
+COPC_INFO_VLR = (b"copc", 1)
+
+
+def read_las_header_info(pc_tile_path):
+    """
+    Reads the header and VLRs of the LAS / LAZ / COPC tile at the given path, and returns the subset of the metadata
+    that PDAL's readers.las stage outputs that Kart uses, in the same format - ie, with keys such as "dataformat_id",
+    "point_length", "count", "minx", and "srs": {"compoundwkt": ...}.
+
+    Returns None if the tile can't be read this way, in which case the caller should fall back to using PDAL. This is
+    the case if the tile is not a valid LAS file, or if reading it the same way PDAL does would involve more than reading
+    the header - eg, if the CRS is stored as GeoTIFF keys, or if there are extra bytes in the point data records.
+    """
+    try:
+        with open(pc_tile_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return _read_las_header_info(buf)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _read_las_header_info(buf):
+    (
+        signature,
+        global_encoding,
+        major_version,
+        minor_version,
+        header_size,
+        point_data_offset,
+        vlr_count,
+        pdrf,
+        point_length,
+        count,
+        maxx,
+        minx,
+        maxy,
+        miny,
+        maxz,
+        minz,
+    ) = HEADER.unpack_from(buf, 0)
+    if signature != LAS_SIGNATURE:
+        return None
+
+    evlr_offset, evlr_count = 0, 0
+    if (major_version, minor_version) >= (1, 4):
+        evlr_offset, evlr_count, count = HEADER_1_4.unpack_from(buf, HEADER.size)
+
+    vlrs = dict(_iter_vlrs(buf, header_size, vlr_count, VLR_HEADER))
+    if evlr_count:
+        vlrs.update(_iter_vlrs(buf, evlr_offset, evlr_count, EVLR_HEADER))
+
+    compressed = bool(pdrf & PDRF_COMPRESSED)
+    pdrf &= PDRF_MASK
+    if PDRF_TO_RECORD_LENGTH.get(pdrf) != point_length:
+        # Either a PDRF with waveform data, or there are extra bytes - PDAL handles these.
+        return None
+
+    if not global_encoding & GLOBAL_ENCODING_WKT or WKT_VLR not in vlrs:
+        # The CRS is stored as GeoTIFF keys (or not at all) - PDAL handles these.
+        return None
+    start, end = vlrs[WKT_VLR]
+    wkt = bytes(buf[start:end]).partition(b"\0")[0].decode("utf-8")
+    if not wkt:
+        return None
+
+    # PDAL outputs doubles with 15 significant digits - do the same, so that the extents are the same either way.
+    maxx, maxy, maxz, minx, miny, minz = (
+        _round_like_pdal(v) for v in (maxx, maxy, maxz, minx, miny, minz)
+    )
+    return {
+        "compressed": compressed,
+        "copc": COPC_INFO_VLR in vlrs,
+        "count": count,
+        "dataformat_id": pdrf,
+        "major_version": major_version,
+        "minor_version": minor_version,
+        "maxx": maxx,
+        "maxy": maxy,
+        "maxz": maxz,
+        "minx": minx,
+        "miny": miny,
+        "minz": minz,
+        "point_length": point_length,
+        "srs": {"compoundwkt": wkt},
+    }
+
+
+def _iter_vlrs(buf, offset, vlr_count, vlr_header):
+    """Yields ((user_id, record_id), (start, end)) for each VLR, where start and end are the offsets of its data."""
+    for i in range(vlr_count):
+        user_id, record_id, length = vlr_header.unpack_from(buf, offset)
+        start = offset + vlr_header.size
+        end = start + length
+        if end > len(buf):
+            raise ValueError("VLR extends past end of file")
+        yield (user_id.rstrip(b"\0"), record_id), (start, end)
+        offset = end
+
+
+def _round_like_pdal(value):
+    return float(f"{value:.15g}")
@@ -18,6 +18,7 @@ from kart.exceptions import (
 )
 from kart.output_util import format_json_for_output, format_wkt_for_output
 from kart.point_cloud import pdal_execute_pipeline
+from kart.point_cloud.las_header import read_las_header_info
 from kart.point_cloud.schema_util import (
     get_schema_from_pdrf,
     get_record_length_from_pdrf,
@@ -182,7 +183,7 @@ def extract_pc_tile_metadata(
     extract_schema=True,
 ):
     """
-    Use pdal to get any and all point-cloud metadata we can make use of in Kart.
+    Get any and all point-cloud metadata we can make use of in Kart.
     This includes metadata that must be dataset-homogenous and would be stored in the dataset's /meta/ folder,
     along with other metadata that is tile-specific and would be stored in the tile's pointer file.
 
@@ -198,26 +199,18 @@ def extract_pc_tile_metadata(
     same dataset to be homogenous enough that the meta items format.json, schema.json and crs.wkt
     describe *all* of the tiles in that dataset. The "tile" field is where we keep all information
     that can be different for every tile in the dataset, which is why it must be stored in pointer files.
-    """
-    pipeline = [
-        {
-            "type": "readers.las",
-            "filename": str(pc_tile_path),
-            "count": 0,  # Don't read any individual points.
-        }
-    ]
-    if extract_schema:
-        pipeline.append({"type": "filters.info"})
 
-    try:
-        metadata = pdal_execute_pipeline(pipeline)
-    except CalledProcessError:
-        raise InvalidOperation(
-            f"Error reading {pc_tile_path}", exit_code=INVALID_FILE_FORMAT
+    Where possible, this is read directly from the tile's header - otherwise, PDAL is used.
+    """
+    info = read_las_header_info(pc_tile_path)
+    if info is not None:
+        info["srs"]["wkt"] = _get_horizontal_wkt(info["srs"]["compoundwkt"])
+        schema = get_schema_from_pdrf(info["dataformat_id"]) if extract_schema else None
+    else:
+        info, schema = _extract_pc_tile_info_using_pdal(
+            pc_tile_path, extract_schema=extract_schema
         )
 
-    info = metadata["readers.las"]
-
     native_extent = get_native_extent(info)
     compound_crs = info["srs"].get("compoundwkt")
     horizontal_crs = info["srs"].get("wkt")
@@ -248,13 +241,51 @@ def extract_pc_tile_metadata(
         "crs": normalise_wkt(compound_crs or horizontal_crs),
     }
     if extract_schema:
-        result["schema"] = pdal_schema_to_kart_schema(
-            metadata["filters.info"]["schema"]
-        )
+        result["schema"] = schema
 
     return result
 
 
+def _extract_pc_tile_info_using_pdal(pc_tile_path, *, extract_schema=True):
+    """
+    Use pdal to get the metadata that the readers.las stage outputs about the given tile,
+    along with the tile's schema if extract_schema is True (otherwise None).
+    """
+    pipeline = [
+        {
+            "type": "readers.las",
+            "filename": str(pc_tile_path),
+            "count": 0,  # Don't read any individual points.
+        }
+    ]
+    if extract_schema:
+        pipeline.append({"type": "filters.info"})
+
+    try:
+        metadata = pdal_execute_pipeline(pipeline)
+    except CalledProcessError:
+        raise InvalidOperation(
+            f"Error reading {pc_tile_path}", exit_code=INVALID_FILE_FORMAT
+        )
+
+    schema = None
+    if extract_schema:
+        schema = pdal_schema_to_kart_schema(metadata["filters.info"]["schema"])
+    return metadata["readers.las"], schema
+
+
+def _get_horizontal_wkt(wkt):
+    """
+    Given the WKT of a CRS which may be a compound CRS, returns the WKT of only the horizontal part,
+    which is what PDAL outputs as srs.wkt.
+    """
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(wkt)
+    if srs.IsCompound():
+        srs.StripVertical()
+    return srs.ExportToWkt()
+
+
 def get_format_summary(format_info):
     """
     Given format info as stored in format.json, return a short string summary such as: laz-1.4/copc-1.0
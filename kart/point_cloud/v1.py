@@ -1,5 +1,4 @@
 import functools
-import shutil
 import os
 
 from kart.base_dataset import BaseDataset, MetaItemDefinition, MetaItemFileType
@@ -191,30 +190,56 @@ class PointCloudV1(BaseDataset):
         else:
             return wc_path
 
-    def get_tile_summary_from_workdir_path(self, path, *, tile_metadata=None):
+    def get_tile_summary_from_workdir_path(
+        self, path, *, tile_metadata=None, hash_and_size=None
+    ):
         """Generates a tile summary for a path to a tile in the working copy."""
         path = self._workdir_path(path)
-        return self.get_tile_summary_from_filesystem_path(path)
+        return self.get_tile_summary_from_filesystem_path(
+            path, tile_metadata=tile_metadata, hash_and_size=hash_and_size
+        )
 
-    def get_tile_summary_from_filesystem_path(self, path, *, tile_metadata=None):
+    def get_tile_summary_from_filesystem_path(
+        self, path, *, tile_metadata=None, hash_and_size=None
+    ):
         """
         Generates a tile summary from a pathlib.Path for a file somewhere on the filesystem.
-        If the tile_metadata is already known, this may be supplied too to avoid extra work.
+        If the tile_metadata or the (hash, size) of the file are already known, these may be supplied too
+        to avoid extra work.
         """
         if not tile_metadata:
             tile_metadata = extract_pc_tile_metadata(path)
         tile_info = format_tile_for_pointer_file(tile_metadata["tile"])
-        oid, size = get_hash_and_size_of_file(path)
+        oid, size = hash_and_size or get_hash_and_size_of_file(path)
         return {"name": path.name, **tile_info, "oid": f"sha256:{oid}", "size": size}
 
-    def diff(self, other, ds_filter=DatasetKeyFilter.MATCH_ALL, reverse=False):
+    def diff(
+        self,
+        other,
+        ds_filter=DatasetKeyFilter.MATCH_ALL,
+        reverse=False,
+        streaming=False,
+    ):
         """
         Generates a Diff from self -> other.
         If reverse is true, generates a diff from other -> self.
+        If streaming is true, the tile deltas are generated as a StreamingDeltaDiff.
         """
         ds_diff = super().diff(other, ds_filter=ds_filter, reverse=reverse)
         tile_filter = ds_filter.get("tile", ds_filter.child_type())
-        ds_diff["tile"] = DeltaDiff(self.diff_tile(other, tile_filter, reverse=reverse))
+        if streaming:
+            ds_diff["tile"] = self.diff_subtree_streaming(
+                other,
+                "tile",
+                key_filter=tile_filter,
+                key_decoder_method="tilename_from_path",
+                value_decoder_method="get_tile_summary_promise_from_blob_path",
+                reverse=reverse,
+            )
+        else:
+            ds_diff["tile"] = DeltaDiff(
+                self.diff_tile(other, tile_filter, reverse=reverse)
+            )
         return ds_diff
 
     def diff_tile(self, other, tile_filter=FeatureKeyFilter.MATCH_ALL, reverse=False):
@@ -259,8 +284,7 @@ class PointCloudV1(BaseDataset):
 
         wc_tiles_path_pattern = get_tile_path_pattern(parent_path=self.path)
 
-        tile_diff = DeltaDiff()
-
+        dirty_tiles = []
         for tile_path in workdir_diff_cache.dirty_paths_for_dataset(self):
             if not wc_tiles_path_pattern.fullmatch(tile_path):
                 continue
@@ -269,19 +293,31 @@ class PointCloudV1(BaseDataset):
             if tilename not in tile_filter:
                 continue
 
+            wc_path = self._workdir_path(tile_path)
+            dirty_tiles.append((tilename, wc_path if wc_path.is_file() else None))
+
+        # Inspecting the new tiles is slow, so it is done all at once - see FileSystemWorkingCopy.get_tile_infos.
+        tile_infos = {}
+        if not skip_pdal:
+            tile_infos = workdir_diff_cache.get_tile_infos(
+                [wc_path for tilename, wc_path in dirty_tiles if wc_path]
+            )
+
+        tile_diff = DeltaDiff()
+
+        for tilename, wc_path in dirty_tiles:
             old_tile_summary = self.get_tile_summary_promise(tilename, missing_ok=True)
             old_half_delta = (tilename, old_tile_summary) if old_tile_summary else None
 
-            wc_path = self._workdir_path(tile_path)
-            if not wc_path.is_file():
+            if not wc_path:
                 new_half_delta = None
             elif skip_pdal:
                 new_half_delta = tilename, {"name": wc_path.name}
             else:
-                tile_metadata = extract_pc_tile_metadata(wc_path)
+                tile_metadata, oid, size = tile_infos[wc_path]
                 tilename_to_metadata[wc_path.name] = tile_metadata
                 new_tile_summary = self.get_tile_summary_from_workdir_path(
-                    wc_path, tile_metadata=tile_metadata
+                    wc_path, tile_metadata=tile_metadata, hash_and_size=(oid, size)
                 )
 
                 if dataset_format_to_apply and not self.is_tile_compatible(
@@ -449,10 +485,14 @@ class PointCloudV1(BaseDataset):
                         # Committing in a new tile, preserving its format
                         source_name = delta.new_value.get("name")
                         path_in_wc = self._workdir_path(f"{self.path}/{source_name}")
-                        oid = delta.new_value["oid"]
-                        path_in_lfs_cache = get_local_path_from_lfs_hash(self.repo, oid)
-                        path_in_lfs_cache.parents[0].mkdir(parents=True, exist_ok=True)
-                        shutil.copy(path_in_wc, path_in_lfs_cache)
+                        copy_file_to_local_lfs_cache(
+                            self.repo,
+                            path_in_wc,
+                            oid_and_size=(
+                                delta.new_value["oid"],
+                                delta.new_value.get("size"),
+                            ),
+                        )
                         pointer_dict = format_tile_for_pointer_file(delta.new_value)
 
                     tilename = delta.new_value["name"]
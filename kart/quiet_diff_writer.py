@@ -2,6 +2,9 @@ from .base_diff_writer import BaseDiffWriter
 
 
 class QuietDiffWriter(BaseDiffWriter):
+    # Only needs to find out if there are any changes - for commit<>commit diffs, this stops at the first delta.
+    stream_item_deltas = True
+
     def write_diff(self):
         # Nothing to write, but we still need to set self.has_changes
         self.has_changes = any(
@@ -9,7 +12,5 @@ class QuietDiffWriter(BaseDiffWriter):
         )
 
     def has_ds_changes_for_path(self, ds_path):
-        # TODO: optimise - no need to generate the entire diff for a dataset.
-        # (This is not quite as bad as it looks, since parts of the diff object are lazily generated.)
         ds_diff = self.get_dataset_diff(ds_path)
         return bool(ds_diff)
@@ -98,6 +98,29 @@ class KartConfigKeys:
     KART_SPATIALFILTER_REFERENCE = "kart.spatialfilter.reference"
     KART_SPATIALFILTER_OBJECTID = "kart.spatialfilter.objectid"
 
+    # Number of worker processes used to read features when writing datasets to the working copy.
+    KART_CHECKOUT_JOBS = "kart.checkout.jobs"
+
+    # Number of worker processes used to check and encode features when writing a large diff to a table dataset -
+    # eg, when committing working copy changes, or applying a patch.
+    KART_APPLY_JOBS = "kart.apply.jobs"
+
+    # Number of point cloud tiles in the working copy that are inspected at once when diffing it.
+    # Defaults to the number of CPUs.
+    KART_DIFF_JOBS = "kart.diff.jobs"
+
+    # Renamed features (ie, features that have had their primary key changed) are only detected in the working copy if
+    # there are at most this many inserts and deletes in a dataset. There is no limit if this is not set.
+    KART_DIFF_RENAMELIMIT = "kart.diff.renamelimit"
+
+    # Maximum total size of cached diff output - see DiffOutputCache. The cache is disabled if this is not set.
+    KART_DIFFCACHE_SIZE = "kart.diffcache.size"
+
+    # If true, files are hard-linked out of the LFS cache (eg, into the working copy) instead of copied, where possible.
+    # Saves disk space and I/O, but only safe if tiles in the working copy are never modified in place. Files are never
+    # hard-linked into the LFS cache, since the files they are imported from could be modified in place.
+    KART_LFS_HARDLINKS = "kart.lfs.hardlinks"
+
     # This variable was also renamed, but when tidy-style repos were added - not during rebranding.
     CORE_BARE = "core.bare"  # Newer repos use the standard "core.bare" variable.
     SNO_WORKINGCOPY_BARE = (
@@ -417,6 +440,13 @@ class KartRepo(pygit2.Repository):
 
         return DiffAnnotations(self)
 
+    @property
+    @lru_cache(maxsize=1)
+    def diff_output_cache(self):
+        from .diff_cache import DiffOutputCache
+
+        return DiffOutputCache(self)
+
     def write_config(
         self,
         wc_location=None,
@@ -582,6 +612,12 @@ class KartRepo(pygit2.Repository):
     def get_config_str(self, key, default=None):
         return self.config[key] if key in self.config else default
 
+    def get_config_int(self, key, default=None):
+        return self.config.get_int(key) if key in self.config else default
+
+    def get_config_bool(self, key, default=None):
+        return self.config.get_bool(key) if key in self.config else default
+
     @property
     def is_partial_clone(self):
         from . import promisor_utils
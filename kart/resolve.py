@@ -1,7 +1,6 @@
 import copy
 import json
 import os
-import shutil
 from pathlib import Path
 
 import click
@@ -11,7 +10,11 @@ from kart.completion_shared import conflict_completer
 
 from .cli_util import MutexOption, KartCommand
 from .exceptions import NO_CONFLICT, InvalidOperation, NotFound, NotYetImplemented
-from .lfs_util import pointer_file_bytes_to_dict, get_local_path_from_lfs_hash
+from .lfs_util import (
+    copy_file_from_local_lfs_cache,
+    get_local_path_from_lfs_hash,
+    pointer_file_bytes_to_dict,
+)
 from .geometry import geojson_to_gpkg_geom
 from .merge_util import MergeContext, MergedIndex, RichConflict, WorkingCopyMerger
 from .point_cloud.tilename_util import set_tile_extension
@@ -85,7 +88,7 @@ def _load_file_resolve_for_feature(rich_conflict, file_path):
 
 
 def _load_file_resolve_for_tile(rich_conflict, file_path):
-    from kart.lfs_util import get_local_path_from_lfs_hash, dict_to_pointer_file_bytes
+    from kart.lfs_util import copy_file_to_local_lfs_cache, dict_to_pointer_file_bytes
     from kart.point_cloud.metadata_util import format_tile_for_pointer_file
 
     tilename = rich_conflict.decoded_path[2]
@@ -99,9 +102,9 @@ def _load_file_resolve_for_tile(rich_conflict, file_path):
             f"The tile at {rel_tile_path} does not match the dataset's format"
         )
 
-    path_in_lfs_cache = get_local_path_from_lfs_hash(repo, tile_summary["oid"])
-    path_in_lfs_cache.parents[0].mkdir(parents=True, exist_ok=True)
-    shutil.copy(file_path, path_in_lfs_cache)
+    copy_file_to_local_lfs_cache(
+        repo, file_path, oid_and_size=(tile_summary["oid"], tile_summary["size"])
+    )
     pointer_dict = format_tile_for_pointer_file(tile_summary)
     pointer_data = dict_to_pointer_file_bytes(pointer_dict)
     blob_path = dataset.tilename_to_blob_path(tilename)
@@ -254,7 +257,7 @@ def update_workingcopy_with_resolve(
             workdir_path = workdir.path / dataset.path / filename
             if workdir_path.is_file():
                 workdir_path.unlink()
-            shutil.copy(lfs_path, workdir_path)
+            copy_file_from_local_lfs_cache(repo, lfs_path, workdir_path)
 
 
 @click.command(cls=KartCommand)
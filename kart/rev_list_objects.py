@@ -1,10 +1,10 @@
 # Utility for scanning through all the objects in the commit graph, or in a particular part of the commit graph.
 # For example, reachable from commits A, B, C, but not from D, E, F (which have already been taken care of).
 
+import queue
 import re
 import subprocess
-
-import pygit2
+import threading
 
 from kart.cli_util import tool_environment
 from kart.exceptions import SubprocessError
@@ -46,7 +46,7 @@ def rev_list_object_oids(repo, start_commits, stop_commits):
             encoding="utf8",
             env=tool_environment(),
         )
-        yield from _parse_revlist_output(repo, p.stdout)
+        yield from _parse_revlist_output(p.stdout)
     except subprocess.CalledProcessError as e:
         raise SubprocessError(
             f"There was a problem with git rev-list: {e}", called_process_error=e
@@ -55,30 +55,34 @@ def rev_list_object_oids(repo, start_commits, stop_commits):
 
 def rev_list_blobs(repo, start_commits, stop_commits):
     """
-    Yield all the blobs referenced between the start and stop commits as tuples (commit_id, path, blob).
+    Yield all the blobs referenced between the start and stop commits as tuples (commit_id, path, blob_id, blob_data).
     Each blob will only be yielded once, so not necessarily at all paths and commits where it can be found.
     """
-    for (commit_id, path, oid) in rev_list_object_oids(
-        repo, start_commits, stop_commits
-    ):
-        obj = repo[oid]
-        if obj.type == pygit2.GIT_OBJ_BLOB:
-            yield commit_id, path, obj
+    object_oids = rev_list_object_oids(repo, start_commits, stop_commits)
+    requests = ((oid, (commit_id, path)) for (commit_id, path, oid) in object_oids)
+    for (commit_id, path), oid, obj_type, data in cat_file_batch(repo, requests):
+        if obj_type == "blob":
+            yield commit_id, path, oid, data
 
 
 def rev_list_matching_blobs(repo, start_commits, stop_commits, path_pattern):
     """
     Yield all the blobs with a path matching the given pattern referenced between the start and stop commits as tuples
-    (commit_id, match_result, blob). To get the entire path, use match_result.group(0).
+    (commit_id, match_result, blob_id, blob_data). To get the entire path, use match_result.group(0).
     """
-    for (commit_id, path, oid) in rev_list_object_oids(
-        repo, start_commits, stop_commits
-    ):
-        m = path_pattern.fullmatch(path)
-        if m:
-            obj = repo[oid]
-            if obj.type == pygit2.GIT_OBJ_BLOB:
-                yield commit_id, m, obj
+
+    def matching_oids():
+        for (commit_id, path, oid) in rev_list_object_oids(
+            repo, start_commits, stop_commits
+        ):
+            m = path_pattern.fullmatch(path)
+            if m:
+                yield oid, (commit_id, m)
+
+    # Trees can match the pattern too - only yield the blobs.
+    for (commit_id, m), oid, obj_type, data in cat_file_batch(repo, matching_oids()):
+        if obj_type == "blob":
+            yield commit_id, m, oid, data
 
 
 FEATURE_BLOBS_PATTERN = re.compile(r"(.+)/\.(?:sno|table)-dataset[^/]*/feature/.+")
@@ -87,7 +91,7 @@ FEATURE_BLOBS_PATTERN = re.compile(r"(.+)/\.(?:sno|table)-dataset[^/]*/feature/.
 def rev_list_feature_blobs(repo, start_commits, stop_commits):
     """
     Yield all the blobs with a path identifying them as features (or rows) of a "table-dataset".
-    Yields tuples in the form: (commit_id, match_result, blob).
+    Yields tuples in the form: (commit_id, match_result, blob_id, blob_data).
     To get the entire path, use match_result.group(0) - this can be decoded if necessary.
     To get the dataset-path, use match_result.group(1)
     """
@@ -102,7 +106,7 @@ TILE_POINTER_FILES_PATTERN = re.compile(r"(.+)/\.point-cloud-dataset[^/]*/tile/.
 def rev_list_tile_pointer_files(repo, start_commits, stop_commits):
     """
     Yield all the blobs with a path identifying them as LFS pointers to the tiles of a point-cloud dataset.
-    Yields tuples in the form: (commit_id, match_result, blob).
+    Yields tuples in the form: (commit_id, match_result, blob_id, blob_data).
     To get the entire path, use match_result.group(0) - this can be decoded if necessary.
     To get the dataset-path, use match_result.group(1)
     """
@@ -111,15 +115,98 @@ def rev_list_tile_pointer_files(repo, start_commits, stop_commits):
     )
 
 
-def _parse_revlist_output(repo, line_iter):
+def _parse_revlist_output(line_iter):
+    # With --in-commit-order, each commit is output before the objects first reached from it. Every object except a
+    # commit is output with a space and then its path (which is empty for root trees), so commits are recognisable
+    # as the lines with no space in them - there's no need to look up the type of each object.
     commit_id = None
     for line in line_iter:
-        parts = line.split(" ", maxsplit=1)
-        if len(parts) == 1:
-            oid = parts[0].strip()
-            if repo[oid].type == pygit2.GIT_OBJ_COMMIT:
-                commit_id = oid
+        oid, sep, path = line.rstrip("\n").partition(" ")
+        if not sep:
+            commit_id = oid
             continue
 
-        oid, path = parts
-        yield commit_id, path.strip(), oid.strip()
+        yield commit_id, path, oid
+
+
+# Maximum number of objects requested from git cat-file that haven't yet been read back.
+CAT_FILE_READ_AHEAD = 1000
+
+
+def cat_file_batch(repo, requests):
+    """
+    Loads many objects using a single `git cat-file --batch` process, which is much faster than loading them one by
+    one when there are many of them.
+    Given an iterable of (object_id, context) tuples, yields (context, object_id, object_type, object_data) tuples
+    in the same order. Any object that git reports as missing is skipped - but note that in a partial clone, git
+    fetches any promised object that it is asked for. Objects listed by rev_list_object_oids are never promised,
+    since missing objects are left out of its output. The requests are sent to git by a separate thread, and at most
+    CAT_FILE_READ_AHEAD objects are requested ahead of the one that is currently being yielded.
+    """
+    p = subprocess.Popen(
+        ["git", "-C", repo.path, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=tool_environment(),
+    )
+    pending = queue.Queue(maxsize=CAT_FILE_READ_AHEAD)
+    stop = threading.Event()
+    request_error = None
+
+    def send_requests():
+        nonlocal request_error
+        try:
+            for oid, context in requests:
+                if stop.is_set():
+                    return
+                try:
+                    pending.put_nowait((oid, context))
+                except queue.Full:
+                    # The objects requested so far must actually be sent before we wait for them to be read.
+                    p.stdin.flush()
+                    pending.put((oid, context))
+                p.stdin.write(f"{oid}\n".encode("ascii"))
+        except BaseException as e:
+            if not stop.is_set():
+                request_error = e
+        finally:
+            try:
+                p.stdin.close()
+            except OSError:
+                pass
+            pending.put(None)
+
+    sender = threading.Thread(target=send_requests, daemon=True)
+    sender.start()
+    try:
+        for oid, context in iter(pending.get, None):
+            header = p.stdout.readline().split()
+            if not header:
+                break
+            if header[1] == b"missing":
+                continue
+            obj_type, size = header[1].decode("ascii"), int(header[2])
+            data = p.stdout.read(size)
+            p.stdout.read(1)  # Trailing newline.
+            yield context, oid, obj_type, data
+
+        if request_error is not None:
+            raise request_error
+        returncode = p.wait()
+        if returncode != 0:
+            raise SubprocessError(
+                f"There was a problem with git cat-file: exit code {returncode}",
+                exit_code=returncode,
+            )
+    finally:
+        stop.set()
+        if p.poll() is None:
+            p.kill()
+        # Unblock the sender thread if it's waiting for space in the queue.
+        while sender.is_alive():
+            try:
+                pending.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        p.stdout.close()
+        p.wait()
@@ -125,6 +125,13 @@ def resolve(ctx, reference, do_envelope, output_format):
     default=False,
     help="Don't do any indexing, instead just output what would be indexed.",
 )
+@click.option(
+    "--jobs",
+    "num_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use to calculate feature envelopes.",
+)
 @click.option(
     "--debug",
     hidden=True,
@@ -135,7 +142,7 @@ def resolve(ctx, reference, do_envelope, output_format):
     nargs=-1,
 )
 @click.pass_context
-def index(ctx, clear_existing, dry_run, debug, commits):
+def index(ctx, clear_existing, dry_run, num_workers, debug, commits):
     """
     Maintains the index needed to perform a spatially-filtered clone using this repo as the server.
     Indexes all features added by the supplied commits and their ancestors.
@@ -165,6 +172,7 @@ def index(ctx, clear_existing, dry_run, debug, commits):
         verbosity=ctx.obj.verbosity + 1,
         clear_existing=clear_existing,
         dry_run=dry_run,
+        num_workers=num_workers,
     )
 
 
@@ -296,17 +304,7 @@ class ResolvedSpatialFilterSpec(SpatialFilterSpec):
         return hexhash(self.crs_spec.strip(), self.geometry.to_wkb())
 
     def envelope_wgs84(self):
-        from osgeo import osr
-
-        try:
-            transform = osr.CoordinateTransformation(self.crs, make_crs("EPSG:4326"))
-            geom_ogr = self.geometry.to_ogr()
-            geom_ogr.Transform(transform)
-            w, e, s, n = geom_ogr.GetEnvelope()
-            return w, s, e, n
-
-        except RuntimeError as e:
-            raise CrsError(f"Can't reproject spatial filter into EPSG:4326:\n{e}")
+        return get_envelope_wgs84(self.crs, self.geometry.to_ogr())
 
     def partial_clone_filter_spec(self, specify_in_full=True):
         if self.match_all:
@@ -645,11 +643,26 @@ class OriginalSpatialFilter(SpatialFilter):
             crs = make_crs(crs_spec, context=ctx)
             super().__init__(crs, geometry.to_ogr())
             self.hexhash = hexhash(crs_spec.strip(), geometry.to_wkb())
+        self._envelope_wgs84 = None
 
     @property
     def is_original(self):
         return True
 
+    def envelope_wgs84(self):
+        """
+        Returns the envelope of this spatial filter as a tuple (lng_w, lat_s, lng_e, lat_n), using WGS 84 -
+        for comparison with the envelopes in the feature envelope index, so it is calculated in the same way as they
+        are, with a buffer for curvature. Returns None if this filter matches everything.
+        """
+        if self.match_all:
+            return None
+        if self._envelope_wgs84 is None:
+            self._envelope_wgs84 = get_envelope_wgs84(
+                self.crs, self.filter_ogr, buffer_for_curvature=True
+            )
+        return self._envelope_wgs84
+
     def transform_for_dataset(self, dataset):
         """
         Transform this spatial filter so that it matches the CRS of the given dataset.
@@ -797,6 +810,38 @@ OriginalSpatialFilter._MATCH_ALL = OriginalSpatialFilter(None, None, match_all=T
 SpatialFilter.MATCH_ALL = OriginalSpatialFilter._MATCH_ALL
 
 
+def get_envelope_wgs84(crs, geometry_ogr, *, buffer_for_curvature=False):
+    """
+    Given a spatial filter's CRS and OGR geometry, returns the envelope of the geometry as a tuple
+    (lng_w, lat_s, lng_e, lat_n), using WGS 84. The geometry itself is not modified.
+    By default, the envelope is that of the transformed vertices of the geometry. If buffer_for_curvature is True,
+    the envelope is calculated in the same way as the envelopes in the feature envelope index, so that it also contains
+    the edges of the geometry, which can become curves when transformed - see transform_minmax_envelope. In this case
+    the envelope can cross the anti-meridian (ie, lng_e < lng_w), and CannotIndex is raised if it can't be calculated.
+    """
+    from osgeo import osr
+
+    try:
+        transform = osr.CoordinateTransformation(crs, make_crs("EPSG:4326"))
+        if buffer_for_curvature:
+            from kart.spatial_filter.index import (
+                get_ogr_envelope,
+                transform_minmax_envelope,
+            )
+
+            return transform_minmax_envelope(
+                get_ogr_envelope(geometry_ogr), transform, buffer_for_curvature=True
+            )
+
+        geom_ogr = geometry_ogr.Clone()
+        geom_ogr.Transform(transform)
+        w, e, s, n = geom_ogr.GetEnvelope()
+        return w, s, e, n
+
+    except RuntimeError as e:
+        raise CrsError(f"Can't reproject spatial filter into EPSG:4326:\n{e}")
+
+
 def _range_overlaps(range1_tuple, range2_tuple):
     (a1, a2) = range1_tuple
     (b1, b2) = range2_tuple
@@ -1,6 +1,9 @@
 import functools
 import logging
 import math
+import multiprocessing
+import queue
+import signal
 import subprocess
 import sys
 import time
@@ -12,7 +15,7 @@ from pysqlite3 import dbapi2 as sqlite
 
 from kart.cli_util import tool_environment
 from kart.crs_util import make_crs, normalise_wkt
-from kart.exceptions import InvalidOperation, SubprocessError
+from kart.exceptions import CrsError, InvalidOperation, SubprocessError
 from kart.geometry import Geometry
 from kart.repo import KartRepoFiles
 from kart.rev_list_objects import rev_list_feature_blobs
@@ -20,6 +23,7 @@ from kart.serialise_util import msg_unpack
 from kart.sqlalchemy import TableSet
 from kart.sqlalchemy.sqlite import sqlite_engine
 from kart.structs import CommitWithReference
+from kart.utils import chunk
 from sqlalchemy import Column, Table
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.types import BLOB
@@ -285,8 +289,20 @@ def _format_commits(repo, commit_ids):
     return " ".join(c[:length] for c in commit_ids)
 
 
+# Number of envelopes that are sorted and written to the index at once.
+INDEXING_BATCH_SIZE = 100_000
+
+# Settings for the SQLite connection that writes the index. The index is built in a single transaction -
+# the rollback journal is left as is, so that if indexing is interrupted, the previous index is left intact.
+INDEXING_PRAGMAS = [
+    "PRAGMA synchronous = OFF;",
+    "PRAGMA cache_size = -512000;",  # 500 MiB
+    "PRAGMA temp_store = MEMORY;",
+]
+
+
 def update_spatial_filter_index(
-    repo, commits, verbosity=1, clear_existing=False, dry_run=False
+    repo, commits, verbosity=1, clear_existing=False, dry_run=False, num_workers=1
 ):
     """
     Index the commits given in commit_spec, and write them to the feature_envelopes.db repo file.
@@ -295,6 +311,7 @@ def update_spatial_filter_index(
     commits - a set of commit IDs to index (ancestors of these are implicitly included).
     verbosity - how much non-essential information to output.
     clear_existing - when true, deletes any pre-existing data before re-indexing.
+    num_workers - the number of worker processes to use to calculate envelopes.
     """
 
     # This is needed to allow just-in-time fetching features that are outside the spatial filter,
@@ -349,44 +366,60 @@ def update_spatial_filter_index(
 
     t0 = time.monotonic()
     i = 0
-    trunc = _truncate_oid(repo)
 
     # Using sqlite directly here instead of sqlalchemy is about 10x faster.
-    # Possibly due to huge number of unbatched queries.
-    # TODO - investigate further.
     db = sqlite.connect(f"file:{db_path}", uri=True)
+    for pragma in INDEXING_PRAGMAS:
+        db.execute(pragma)
+
     with db:
         dbcur = db.cursor()
 
-        for i, (commit_id, path_match_result, feature_blob) in enumerate(
-            feature_blob_iter
-        ):
-            if i and progress_every and i % progress_every == 0:
-                click.echo(f"  {i:,d} features... @{time.monotonic()-t0:.1f}s")
-                L.flush_bulk_warns()
+        def write_envelopes(envelopes):
+            # Sorting by blob_id means rows are inserted in the same order as the table is stored on disk.
+            envelopes.sort()
+            dbcur.executemany(
+                "INSERT OR REPLACE INTO feature_envelopes (blob_id, envelope) VALUES (?, ?);",
+                envelopes,
+            )
 
-            ds_path = path_match_result.group(1)
-            transforms = crs_helper.transforms_for_dataset_at_commit(
-                ds_path,
+        def features_to_index():
+            nonlocal i
+            for i, (
                 commit_id,
+                path_match_result,
+                feature_oid,
+                feature_data,
+            ) in enumerate(feature_blob_iter):
+                if i and progress_every and i % progress_every == 0:
+                    click.echo(f"  {i:,d} features... @{time.monotonic()-t0:.1f}s")
+                    L.flush_bulk_warns()
+                ds_path = path_match_result.group(1)
+                yield commit_id, ds_path, feature_oid, feature_data
+
+        if num_workers > 1:
+            encoded_envelopes = _encoded_envelopes_in_parallel(
+                repo,
+                start_commits,
+                stop_commits,
+                encoder.BITS_PER_VALUE,
+                features_to_index(),
+                num_workers,
             )
-            if not transforms:
-                continue
-            geom = get_geometry(repo, feature_blob)
-            if geom is None or geom.is_empty():
-                continue
-            feature_oid = feature_blob.id.hex
-            feature_desc = f"{commit_id[:trunc]}:{ds_path}:{feature_oid[:trunc]}"
-            envelope = get_envelope_for_indexing(geom, transforms, feature_desc)
-            if envelope is None:
-                continue
-
-            params = (bytes.fromhex(feature_oid), encoder.encode(envelope))
-            dbcur.execute(
-                "INSERT OR REPLACE INTO feature_envelopes (blob_id, envelope) VALUES (?, ?);",
-                params,
+        else:
+            encoded_envelopes = _encoded_envelopes(
+                repo, crs_helper, encoder, features_to_index()
             )
 
+        envelopes = []
+        for blob_id_and_envelope in encoded_envelopes:
+            envelopes.append(blob_id_and_envelope)
+            if len(envelopes) >= INDEXING_BATCH_SIZE:
+                write_envelopes(envelopes)
+                envelopes = []
+
+        write_envelopes(envelopes)
+
         click.echo(f"  {i:,d} features... @{time.monotonic()-t0:.1f}s")
         L.flush_bulk_warns()
 
@@ -399,6 +432,160 @@ def update_spatial_filter_index(
     click.echo(f"Indexed {i} features in {t1-t0:.1f}s")
 
 
+def _encoded_envelopes(repo, crs_helper, encoder, features):
+    """
+    Generator. Given an iterable of features to index, as tuples (commit_id, ds_path, feature_oid, feature_data),
+    yields tuples (blob_id, encoded_envelope) for each feature that can be indexed - both are bytes.
+    """
+    trunc = _truncate_oid(repo)
+
+    def encode_batch(batch):
+        envelopes = get_envelopes_for_indexing([b[1:] for b in batch])
+        blob_ids = [
+            bytes.fromhex(feature_oid)
+            for (feature_oid, *_), envelope in zip(batch, envelopes)
+            if envelope is not None
+        ]
+        encoded = encoder.encode_many(e for e in envelopes if e is not None)
+        size = encoder.BYTES_PER_ENVELOPE
+        for i, blob_id in enumerate(blob_ids):
+            yield blob_id, encoded[i * size : (i + 1) * size]
+
+    batch = []
+    for commit_id, ds_path, feature_oid, feature_data in features:
+        transforms = crs_helper.transforms_for_dataset_at_commit(
+            ds_path,
+            commit_id,
+        )
+        if not transforms:
+            continue
+        geom = get_geometry(repo, feature_data)
+        if geom is None or geom.is_empty():
+            continue
+        feature_desc = f"{commit_id[:trunc]}:{ds_path}:{feature_oid[:trunc]}"
+        batch.append((feature_oid, geom, transforms, feature_desc))
+        if len(batch) >= ENVELOPE_BATCH_SIZE:
+            yield from encode_batch(batch)
+            batch = []
+
+    yield from encode_batch(batch)
+
+
+# Number of features whose envelopes are transformed at once.
+ENVELOPE_BATCH_SIZE = 1000
+
+
+# Number of features sent to an indexing worker at once.
+INDEXING_WORKER_CHUNK_SIZE = 1000
+
+
+def _encoded_envelopes_in_parallel(
+    repo, start_commits, stop_commits, bits_per_value, features, num_workers
+):
+    """
+    Same as _encoded_envelopes, except the envelopes are calculated by a pool of worker processes,
+    each of which has its own CrsHelper. Envelopes are yielded in no particular order.
+    """
+    context = multiprocessing.get_context()
+    task_queue = context.Queue(maxsize=num_workers * 4)
+    result_queue = context.Queue()
+    procs = []
+    for n in range(num_workers):
+        proc = context.Process(
+            target=_index_worker,
+            args=(
+                repo.path,
+                start_commits,
+                stop_commits,
+                bits_per_value,
+                task_queue,
+                result_queue,
+            ),
+            name=f"kart-index-worker-{n}",
+            daemon=True,
+        )
+        proc.start()
+        procs.append(proc)
+
+    def check_procs():
+        # Workers exit normally once they have finished their last task - only a non-zero exit code means failure.
+        for proc in procs:
+            if proc.exitcode not in (None, 0):
+                raise SubprocessError(
+                    f"Indexing worker process failed: exit code {proc.exitcode}",
+                    exit_code=proc.exitcode,
+                )
+
+    def put_task(task):
+        while True:
+            try:
+                task_queue.put(task, timeout=1)
+                return
+            except queue.Full:
+                check_procs()
+
+    try:
+        for task in chunk(features, INDEXING_WORKER_CHUNK_SIZE):
+            put_task(task)
+            # Collect whatever results are ready, so they don't build up while we're still sending tasks.
+            while True:
+                try:
+                    message_type, payload = result_queue.get_nowait()
+                except queue.Empty:
+                    break
+                yield from payload
+
+        for proc in procs:
+            put_task(None)
+
+        procs_remaining = num_workers
+        while procs_remaining:
+            try:
+                message_type, payload = result_queue.get(timeout=1)
+            except queue.Empty:
+                check_procs()
+                if not any(proc.is_alive() for proc in procs):
+                    # Every worker has exited, so every message has been sent - but not every worker sent "done".
+                    raise SubprocessError(
+                        "Indexing worker process exited without finishing"
+                    )
+                continue
+            if message_type == "done":
+                procs_remaining -= 1
+            else:
+                yield from payload
+
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+        # Any tasks still waiting to be sent will never be collected - don't wait for them to be sent at exit.
+        task_queue.cancel_join_thread()
+
+
+def _index_worker(
+    repo_path, start_commits, stop_commits, bits_per_value, task_queue, result_queue
+):
+    """Entry point for each worker process started by _encoded_envelopes_in_parallel."""
+    from kart.repo import KartRepo
+
+    # Don't inherit Kart's handlers for cleaning up the process group - if this worker is stopped, just stop.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    repo = KartRepo(repo_path, validate=False)
+    crs_helper = CrsHelper(repo, start_commits, stop_commits)
+    encoder = EnvelopeEncoder(bits_per_value)
+
+    for task in iter(task_queue.get, None):
+        result_queue.put(
+            ("envelopes", list(_encoded_envelopes(repo, crs_helper, encoder, task)))
+        )
+    L.flush_bulk_warns()
+    result_queue.put(("done", None))
+
+
 def debug_index(repo, arg):
     """
     Use kart spatial-filter index --debug=OBJECT to learn more about how a particular object is being indexed.
@@ -605,6 +792,147 @@ class EnvelopeEncoder:
         normalised = encoded / self.VALUE_MAX_INT
         return normalised * (max_value - min_value) + min_value
 
+    def encode_many(self, envelopes):
+        """
+        Encodes many (w, s, e, n) envelopes at once, in exactly the same way as encode. Returns a single bytes object
+        containing every encoded envelope in turn - the Nth encoded envelope is found at
+        [N * BYTES_PER_ENVELOPE : (N + 1) * BYTES_PER_ENVELOPE].
+        """
+        bits = self.BITS_PER_VALUE
+        max_int = self.VALUE_MAX_INT
+        bytes_per_envelope = self.BYTES_PER_ENVELOPE
+        byte_order = self.BYTE_ORDER
+        floor, ceil = math.floor, math.ceil
+
+        result = bytearray()
+        for w, s, e, n in envelopes:
+            assert -180 <= w <= 180 and -90 <= s <= 90
+            assert -180 <= e <= 180 and -90 <= n <= 90
+            # Same arithmetic as _encode_value, inlined.
+            integer = floor((w - -180) / 360 * max_int)
+            integer = (integer << bits) | floor((s - -90) / 180 * max_int)
+            integer = (integer << bits) | ceil((e - -180) / 360 * max_int)
+            integer = (integer << bits) | ceil((n - -90) / 180 * max_int)
+            result += integer.to_bytes(bytes_per_envelope, byte_order)
+        return bytes(result)
+
+    def decode_many(self, encoded):
+        """Inverse of encode_many - returns a list of (w, s, e, n) envelopes."""
+        bits = self.BITS_PER_VALUE
+        max_int = self.VALUE_MAX_INT
+        bytes_per_envelope = self.BYTES_PER_ENVELOPE
+        byte_order = self.BYTE_ORDER
+        assert len(encoded) % bytes_per_envelope == 0
+
+        result = []
+        for i in range(0, len(encoded), bytes_per_envelope):
+            integer = int.from_bytes(encoded[i : i + bytes_per_envelope], byte_order)
+            # Same arithmetic as _decode_value, inlined.
+            n = (integer & max_int) / max_int * 180 + -90
+            integer >>= bits
+            e = (integer & max_int) / max_int * 360 + -180
+            integer >>= bits
+            s = (integer & max_int) / max_int * 180 + -90
+            integer >>= bits
+            w = integer / max_int * 360 + -180
+            result.append((w, s, e, n))
+        return result
+
+
+class FeatureEnvelopeFilter:
+    """
+    Uses the envelopes in the feature envelope index - written by `kart spatial-filter index` - to skip feature blobs
+    that are known to be outside a spatial filter, without reading or decoding them. Blobs that aren't in the index,
+    or whose envelopes intersect the spatial filter's envelope, are not skipped - the spatial filter must still be
+    applied to the features they contain. Call close() once it is no longer needed, to close the index.
+    """
+
+    # Number of blob IDs looked up in the index at once.
+    LOOKUP_BATCH_SIZE = 500
+
+    @classmethod
+    def for_repo(cls, repo, spatial_filter):
+        """
+        Returns a FeatureEnvelopeFilter for the given spatial filter, or None if it can't be used - that is, if the
+        spatial filter matches everything, or is not an original spatial filter (which has a known envelope in
+        WGS 84), or if the repo has no feature envelope index.
+        """
+        if spatial_filter.match_all or not spatial_filter.is_original:
+            return None
+        try:
+            envelope_wgs84 = spatial_filter.envelope_wgs84()
+        except (CrsError, CannotIndex):
+            return None
+        db_path = repo.gitdir_file(KartRepoFiles.FEATURE_ENVELOPES)
+        if not db_path.exists():
+            return None
+        db = sqlite.connect(str(db_path))
+        try:
+            envelope_length = db.execute(
+                "SELECT length(envelope) FROM feature_envelopes LIMIT 1;"
+            ).fetchone()
+        except sqlite.Error:
+            envelope_length = None
+        if not envelope_length:
+            db.close()
+            return None
+        return cls(db, envelope_length[0], envelope_wgs84)
+
+    def __init__(self, db, envelope_length, envelope_wgs84):
+        self.db = db
+        self.encoder = EnvelopeEncoder(envelope_length * 8 // 4)
+        self.envelope_wgs84 = envelope_wgs84
+        # The number of blobs that have been skipped so far.
+        self.num_skipped = 0
+
+    def close(self):
+        self.db.close()
+
+    def filter_blobs(self, blobs):
+        """Generator. Yields each of the given blobs, in the same order, unless it is known not to match."""
+        for batch in chunk(blobs, self.LOOKUP_BATCH_SIZE):
+            non_matching = self._non_matching_blob_ids([b.id.raw for b in batch])
+            for blob in batch:
+                if blob.id.raw in non_matching:
+                    self.num_skipped += 1
+                else:
+                    yield blob
+
+    def _non_matching_blob_ids(self, blob_ids):
+        params = ",".join("?" * len(blob_ids))
+        rows = self.db.execute(
+            f"SELECT blob_id, envelope FROM feature_envelopes WHERE blob_id IN ({params});",
+            blob_ids,
+        )
+        return {
+            blob_id
+            for blob_id, envelope in rows
+            if not _envelopes_intersect(
+                self.envelope_wgs84, self.encoder.decode(envelope)
+            )
+        }
+
+
+def _envelopes_intersect(filter_envelope, feature_envelope):
+    """
+    Given two (w, s, e, n) envelopes, returns True if they might intersect. Either envelope may cross the
+    anti-meridian, in which case w > e.
+    """
+    fw, fs, fe, fn = filter_envelope
+    w, s, e, n = feature_envelope
+    if s > fn or n < fs:
+        return False
+    return any(
+        w1 <= e2 and e1 >= w2
+        for w1, e1 in _lng_ranges(fw, fe)
+        for w2, e2 in _lng_ranges(w, e)
+    )
+
+
+def _lng_ranges(w, e):
+    # An envelope that crosses the anti-meridian is made up of [w, 180] and [-180, e].
+    return ((w, e),) if w <= e else ((w, 180), (-180, e))
+
 
 def get_envelope_for_indexing(geom, transforms, feature_desc):
     """
@@ -616,19 +944,68 @@ def get_envelope_for_indexing(geom, transforms, feature_desc):
     If the envelope cannot be calculated efficiently or at all, None is returned - a None result can be treated as
     equivalent to [-180, -90, 90, 180].
     """
+    return get_envelopes_for_indexing([(geom, transforms, feature_desc)])[0]
 
-    result = None
 
-    try:
-        minmax_envelope = _transpose_gpkg_or_ogr_envelope(
-            geom.envelope(only_2d=True, calculate_if_missing=True)
+def get_envelopes_for_indexing(features):
+    """
+    Batched version of get_envelope_for_indexing. Given a list of tuples (geom, transforms, feature_desc),
+    returns a list containing the envelope for each - or None, for those that couldn't be indexed.
+    Every envelope that needs a particular transform is transformed at once - see transform_minmax_envelopes.
+    """
+    minmax_envelopes = []
+    for geom, transforms, feature_desc in features:
+        try:
+            minmax_envelope = _transpose_gpkg_or_ogr_envelope(
+                geom.envelope(only_2d=True, calculate_if_missing=True)
+            )
+        except Exception:
+            L.warning("Couldn't index feature %s", feature_desc, exc_info=True)
+            minmax_envelope = None
+        minmax_envelopes.append(minmax_envelope)
+
+    indices_by_transform = {}
+    for i, (geom, transforms, feature_desc) in enumerate(features):
+        if minmax_envelopes[i] is not None:
+            for transform in transforms:
+                indices_by_transform.setdefault(transform, []).append(i)
+
+    # Maps (transform, feature index) to the transformed envelope, or to the exception that was raised.
+    transformed = {}
+    for transform, indices in indices_by_transform.items():
+        results = transform_minmax_envelopes(
+            [minmax_envelopes[i] for i in indices], transform
+        )
+        for i, result in zip(indices, results):
+            transformed[transform, i] = result
+
+    result = []
+    for i, (geom, transforms, feature_desc) in enumerate(features):
+        if minmax_envelopes[i] is None:
+            result.append(None)
+            continue
+        result.append(
+            _union_of_transformed_envelopes(
+                transforms, [transformed[t, i] for t in transforms], feature_desc
+            )
         )
+    return result
 
-        for transform in transforms:
-            try:
-                envelope = transform_minmax_envelope(minmax_envelope, transform)
-            except CannotIndex as e:
-                if isinstance(e, CannotIndexDueToWrongCrs) and len(transforms) > 1:
+
+def _union_of_transformed_envelopes(transforms, transformed_envelopes, feature_desc):
+    """
+    Returns the union of the given envelopes - the results of transforming a single feature's envelope using each of
+    the given transforms - or None if the feature can't be indexed. See get_envelope_for_indexing.
+    """
+    result = None
+
+    try:
+        for transform, envelope in zip(transforms, transformed_envelopes):
+            if isinstance(envelope, CannotIndex):
+                if (
+                    isinstance(envelope, CannotIndexDueToWrongCrs)
+                    and len(transforms) > 1
+                ):
                     L.buffered_bulk_warn(
                         f"Skipped obviously bad transform {transform.desc}",
                         feature_desc,
@@ -636,6 +1013,9 @@ def get_envelope_for_indexing(geom, transforms, feature_desc):
                     continue
                 L.buffered_bulk_warn("Skipped indexing feature", feature_desc)
                 return None
+            elif isinstance(envelope, Exception):
+                L.warning("Couldn't index feature %s", feature_desc, exc_info=envelope)
+                return None
 
             result = union_of_envelopes(result, envelope)
 
@@ -839,6 +1219,87 @@ def transform_minmax_envelope(envelope, transform, buffer_for_curvature=True):
     return (w, s, e, n)
 
 
+def transform_minmax_envelopes(envelopes, transform):
+    """
+    Batched version of transform_minmax_envelope (with buffer_for_curvature=True) - transforms the corners of all
+    the given envelopes with a single call to transform.TransformPoints. Returns a list containing, for each envelope,
+    either the transformed envelope, or the exception that transform_minmax_envelope raised for that envelope.
+    Only envelopes that are small and don't cross the antimeridian are dealt with in bulk - any others are passed
+    to transform_minmax_envelope one at a time, so the results are always the same as from transform_minmax_envelope.
+    """
+    points = []
+    for envelope in envelopes:
+        if envelope[0] == envelope[2] and envelope[1] == envelope[3]:
+            points.append((envelope[0], envelope[1]))
+        else:
+            points.append((envelope[0], envelope[1]))
+            points.append((envelope[2], envelope[1]))
+            points.append((envelope[2], envelope[3]))
+            points.append((envelope[0], envelope[3]))
+
+    try:
+        transformed_points = transform.TransformPoints(points) if points else []
+    except Exception:
+        transformed_points = None
+
+    result = []
+    i = 0
+    for envelope in envelopes:
+        num_points = (
+            1 if envelope[0] == envelope[2] and envelope[1] == envelope[3] else 4
+        )
+        transformed_envelope = None
+        if transformed_points is not None:
+            transformed_envelope = _simple_transformed_envelope(
+                transformed_points[i : i + num_points]
+            )
+        i += num_points
+
+        if transformed_envelope is None:
+            try:
+                transformed_envelope = transform_minmax_envelope(envelope, transform)
+            except Exception as e:
+                transformed_envelope = e
+        result.append(transformed_envelope)
+
+    return result
+
+
+def _simple_transformed_envelope(points):
+    """
+    Given the transformed corners of an envelope (or a single transformed point), returns what
+    transform_minmax_envelope would return for that envelope - or None if the envelope is not simple to deal with,
+    in which case transform_minmax_envelope must be used instead.
+    """
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+    if not all(math.isfinite(v) for v in (min_x, max_x, min_y, max_y)):
+        return None
+    if max(abs(min_y), abs(max_y)) > 90:
+        return None
+
+    if len(points) == 1:
+        x = _wrap_lon(min_x)
+        return (x, min_y, x, min_y)
+
+    width, height = max_x - min_x, max_y - min_y
+    biggest_dimension = max(width, height)
+    if biggest_dimension >= 1.0:
+        # Could cross the antimeridian, or need segmenting to allow for curvature.
+        return None
+
+    envelope = _buffer_minmax_envelope(
+        (min_x, min_y, max_x, max_y), 0.1 * biggest_dimension
+    )
+    return (
+        _wrap_lon(envelope[0]),
+        _clamp_lat(envelope[1]),
+        _wrap_lon(envelope[2]),
+        _clamp_lat(envelope[3]),
+    )
+
+
 def anticlockwise_ring_from_minmax_envelope(envelope, segments_per_side=None):
     """Given an envelope in (min-x, min-y, max-x, max-y) format, builds an anticlockwise ring around it."""
     ring = ogr.Geometry(ogr.wkbLinearRing)
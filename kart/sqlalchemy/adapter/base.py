@@ -24,7 +24,7 @@ class BaseKartAdapter:
     DEFAULT_SUBTYPE_VALUES = {"size": 0}
 
     @classmethod
-    def v2_schema_to_sql_spec(cls, schema, v2_obj=None):
+    def v2_schema_to_sql_spec(cls, schema, v2_obj=None, include_primary_key=True):
         """
         Given a V2 schema object, returns a SQL specification that can be used with CREATE TABLE.
         For example: 'fid INTEGER, geom GEOMETRY(POINT,2136), desc VARCHAR(128), PRIMARY KEY(fid)'
@@ -33,6 +33,7 @@ class BaseKartAdapter:
 
         schema - a kart.schema.Schema object.
         v2_obj - the V2 object (eg a dataset) with this schema - used for looking up CRS definitions (if needed).
+        include_primary_key - if False, the PRIMARY KEY constraint is left out, so that it can be added later.
         """
         has_int_pk = cls._schema_has_int_pk(schema)
         result = [
@@ -40,7 +41,7 @@ class BaseKartAdapter:
             for col in schema
         ]
 
-        if schema.pk_columns:
+        if schema.pk_columns and include_primary_key:
             pk_col_names = ", ".join((cls.quote(col.name) for col in schema.pk_columns))
             result.append(f"PRIMARY KEY({pk_col_names})")
 
@@ -91,8 +91,8 @@ class KartAdapter_GPKG(BaseKartAdapter, Db_GPKG):
     )
 
     @classmethod
-    def v2_schema_to_sql_spec(cls, schema, v2_obj=None):
-        # GPKG requires an integer primary key:
+    def v2_schema_to_sql_spec(cls, schema, v2_obj=None, include_primary_key=True):
+        # GPKG requires an integer primary key - since it is the rowid, it is always included.
         has_int_pk = cls._schema_has_int_pk(schema)
         if has_int_pk:
             prefix_cols = []
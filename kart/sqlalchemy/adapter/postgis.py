@@ -362,6 +362,63 @@ class KartAdapter_Postgis(BaseKartAdapter, Db_Postgis):
             # Don't need to specify type information for other columns at present, since we just pass through the values.
             return None
 
+    @classmethod
+    def copy_text_encoders_for_schema(cls, schema):
+        """
+        Returns a list of functions, one for each column in the given schema, that each encode a value from that column
+        into PostgreSQL's COPY text format - see https://www.postgresql.org/docs/current/sql-copy.html
+        """
+        return [cls._copy_text_encoder_for_column(col) for col in schema]
+
+    @classmethod
+    def _copy_text_encoder_for_column(cls, col):
+        if col.data_type == "geometry":
+            # PostGIS accepts hex-encoded EWKB as the text representation of a geometry.
+            return lambda geom: (
+                geom.to_ewkb().hex() if geom is not None else COPY_TEXT_NULL
+            )
+        elif col.data_type == "blob":
+            # Bytea hex format - \x followed by hex digits - with the backslash escaped.
+            return lambda blob: (
+                "\\\\x" + bytes(blob).hex() if blob is not None else COPY_TEXT_NULL
+            )
+        elif col.data_type == "float":
+            return _copy_text_encode_float
+        elif col.data_type == "timestamp":
+            prewrite = TimestampType(
+                col.extra_type_info.get("timezone")
+            ).python_prewrite
+            return lambda timestamp: _copy_text_encode(prewrite(timestamp))
+        else:
+            return _copy_text_encode
+
+
+# How NULL is represented in COPY text format.
+COPY_TEXT_NULL = "\\N"
+
+_COPY_TEXT_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+_COPY_TEXT_SPECIAL_FLOATS = {
+    float("inf"): "Infinity",
+    float("-inf"): "-Infinity",
+}
+
+
+def _copy_text_encode(value):
+    if value is None:
+        return COPY_TEXT_NULL
+    return str(value).translate(_COPY_TEXT_ESCAPES)
+
+
+def _copy_text_encode_float(value):
+    if value is None:
+        return COPY_TEXT_NULL
+    if value != value:
+        return "NaN"
+    return _COPY_TEXT_SPECIAL_FLOATS.get(value) or repr(value)
+
 
 @aliased_converter_type
 class GeometryType(ConverterType):
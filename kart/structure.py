@@ -234,6 +234,9 @@ class RepoStructure:
             for path, blob in extra_blobs:
                 object_builder.insert(path, blob)
 
+        # Where the old feature count of a table dataset is known, we can find the new one without recounting.
+        new_feature_counts = {}
+
         for ds_path, ds_diff in repo_diff.items():
             schema_delta = ds_diff.recursive_get(["meta", "schema.json"])
             if schema_delta and self.repo.table_dataset_version < 2:
@@ -263,15 +266,32 @@ class RepoStructure:
                 except KeyError:
                     pass
 
-            dataset.apply_diff(
+            feature_count_change = dataset.apply_diff(
                 ds_diff,
                 object_builder,
                 resolve_missing_values_from_ds=resolve_missing_values_from_ds,
             )
             object_builder.flush()
+            if feature_count_change is not None:
+                old_feature_count = dataset.cached_feature_count()
+                if old_feature_count is not None:
+                    new_feature_counts[ds_path] = (
+                        old_feature_count + feature_count_change
+                    )
 
         tree = object_builder.flush()
         L.info(f"Tree sha: {tree.hex}")
+
+        if new_feature_counts:
+            from .annotations.db import annotations_session
+
+            new_datasets = RepoStructure(self.repo, tree).datasets()
+            with annotations_session(self.repo):
+                for ds_path, feature_count in new_feature_counts.items():
+                    new_dataset = new_datasets[ds_path]
+                    new_dataset.store_feature_count(
+                        new_dataset.feature_tree, feature_count
+                    )
         return tree
 
     def check_values_match_schema(self, repo_diff):
@@ -187,6 +187,13 @@ def any_at_all(iterable):
     default=True,
     help="Whether to create a working copy once the import is finished, if no working copy exists yet.",
 )
+@click.option(
+    "--jobs",
+    "num_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use to encode features during the import.",
+)
 @click.option(
     "--num-processes",
     help="Deprecated (no longer used)",
@@ -210,6 +217,7 @@ def import_(
     max_delta_depth,
     do_checkout,
     num_processes,
+    num_workers,
 ):
     """
     Import data into a repository.
@@ -334,7 +342,9 @@ def import_(
     fast_import_tables(
         repo,
         import_sources,
-        settings=FastImportSettings(max_delta_depth=max_delta_depth),
+        settings=FastImportSettings(
+            max_delta_depth=max_delta_depth, num_workers=num_workers
+        ),
         verbosity=ctx.obj.verbosity + 1,
         message=message,
         replace_existing=replace_existing_enum,
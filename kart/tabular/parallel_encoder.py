@@ -0,0 +1,194 @@
+import logging
+import multiprocessing
+import queue
+import signal
+
+from kart.diff_structs import Delta
+from kart.exceptions import SubprocessError
+from kart.schema import Schema
+from kart.utils import chunk
+
+L = logging.getLogger("kart.tabular.parallel_encoder")
+
+
+class ParallelFeatureDiffEncoder:
+    """
+    Checks feature deltas for conflicts and encodes their new values using a pool of worker processes, so that a
+    large feature diff can be applied to a dataset more quickly - see RichTableDataset.encode_feature_deltas.
+    The deltas are sent to the workers in chunks, and the results are yielded in the same order as the deltas,
+    so that a single writer can write them to an ObjectBuilder and get the same result as encoding them serially.
+
+    Use as a context manager, so that the workers are stopped when encoding is finished:
+
+    >>> with ParallelFeatureDiffEncoder(repo, num_workers) as encoder:
+    >>>     for result in encoder.encode_feature_deltas(dataset, feature_diff.values()):
+    >>>         ...
+    """
+
+    # Number of deltas sent to a worker at once.
+    CHUNK_SIZE = 1000
+    # Maximum number of chunks that are being encoded or waiting to be collected at once.
+    MAX_QUEUED_CHUNKS = 64
+
+    def __init__(self, repo, num_workers):
+        self.repo = repo
+        self.num_workers = num_workers
+        self.task_queue = None
+        self.result_queue = None
+        self.procs = []
+        # Set while deltas are being encoded - if encoding is abandoned part way, the workers must be terminated.
+        self.encoding = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start_workers(self):
+        context = multiprocessing.get_context()
+        self.task_queue = context.Queue()
+        self.result_queue = context.Queue()
+        for n in range(self.num_workers):
+            proc = context.Process(
+                target=_parallel_encode_worker,
+                args=(self.repo.path, self.task_queue, self.result_queue),
+                name=f"kart-apply-worker-{n}",
+                daemon=True,
+            )
+            proc.start()
+            self.procs.append(proc)
+
+    def _get_result(self):
+        while True:
+            try:
+                return self.result_queue.get(timeout=1)
+            except queue.Empty:
+                for proc in self.procs:
+                    if not proc.is_alive():
+                        raise SubprocessError(
+                            f"Apply worker process failed: exit code {proc.exitcode}",
+                            exit_code=proc.exitcode,
+                        )
+
+    def encode_feature_deltas(
+        self, dataset, deltas, *, schema=None, resolve_missing_values_from_ds=None
+    ):
+        """
+        Same as dataset.encode_feature_deltas(...), except that the deltas are checked and encoded by the workers.
+        The dataset (and resolve_missing_values_from_ds, if set) must be based on trees that have been written to
+        the repository, since the workers load them from there.
+        """
+        if not self.procs:
+            self._start_workers()
+
+        task_spec = (
+            _dataset_spec(dataset),
+            schema.dumps() if schema is not None else None,
+            _dataset_spec(resolve_missing_values_from_ds),
+        )
+        chunks = enumerate(
+            chunk((_delta_to_tuple(delta) for delta in deltas), self.CHUNK_SIZE)
+        )
+
+        results = {}
+        n_sent = 0
+        n_yielded = 0
+        self.encoding = True
+        while True:
+            while n_sent - n_yielded < self.MAX_QUEUED_CHUNKS:
+                next_chunk = next(chunks, None)
+                if next_chunk is None:
+                    break
+                self.task_queue.put((task_spec, *next_chunk))
+                n_sent += 1
+            if n_yielded == n_sent:
+                break
+            while n_yielded not in results:
+                chunk_index, chunk_results = self._get_result()
+                results[chunk_index] = chunk_results
+            yield from results.pop(n_yielded)
+            n_yielded += 1
+        self.encoding = False
+
+    def close(self):
+        """Stops the workers."""
+        if not self.procs:
+            return
+        if self.encoding:
+            for proc in self.procs:
+                proc.terminate()
+        else:
+            for proc in self.procs:
+                self.task_queue.put(None)
+        for proc in self.procs:
+            proc.join()
+        self.procs = []
+
+
+def _dataset_spec(dataset):
+    if dataset is None:
+        return None
+    return (dataset.__class__, str(dataset.tree.id), dataset.path, dataset.dirname)
+
+
+def _delta_to_tuple(delta):
+    """
+    Converts a delta to a tuple that can be sent to a worker. Lazy values are evaluated, except for the old values of
+    deletes, which are never needed to apply them.
+    """
+    old_value = delta.old_value if delta.type == "update" else None
+    new_value = delta.new_value if delta.new is not None else None
+    return (delta.old_key, old_value, delta.new_key, new_value)
+
+
+def _tuple_to_delta(delta_tuple):
+    old_key, old_value, new_key, new_value = delta_tuple
+    return Delta(
+        (old_key, old_value) if old_key is not None else None,
+        (new_key, new_value) if new_key is not None else None,
+    )
+
+
+def _parallel_encode_worker(repo_path, task_queue, result_queue):
+    """
+    Entry point for each worker process started by ParallelFeatureDiffEncoder.
+    Checks and encodes each chunk of deltas it is given, and sends back the results.
+    """
+    from kart.repo import KartRepo
+
+    # Don't inherit Kart's handlers for cleaning up the process group - if this worker is stopped, just stop.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    repo = KartRepo(repo_path, validate=False)
+
+    def load_dataset(dataset_spec):
+        if dataset_spec is None:
+            return None
+        dataset_class, tree_id, path, dirname = dataset_spec
+        return dataset_class(repo[tree_id], path, repo, dirname=dirname)
+
+    task_spec = None
+    for task in iter(task_queue.get, None):
+        next_task_spec, chunk_index, delta_tuples = task
+        if next_task_spec != task_spec:
+            task_spec = next_task_spec
+            dataset_spec, schema_data, resolve_from_spec = task_spec
+            dataset = load_dataset(dataset_spec)
+            schema = Schema.loads(schema_data) if schema_data is not None else None
+            resolve_missing_values_from_ds = load_dataset(resolve_from_spec)
+
+        deltas = (_tuple_to_delta(t) for t in delta_tuples)
+        result_queue.put(
+            (
+                chunk_index,
+                list(
+                    dataset.encode_feature_deltas(
+                        deltas,
+                        schema=schema,
+                        resolve_missing_values_from_ds=resolve_missing_values_from_ds,
+                    )
+                ),
+            )
+        )
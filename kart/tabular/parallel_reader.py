@@ -0,0 +1,212 @@
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+
+from kart.core import find_blobs_in_tree
+from kart.exceptions import SubprocessError
+
+L = logging.getLogger("kart.tabular.parallel_reader")
+
+
+class ParallelFeatureReader:
+    """
+    Reads and decodes the features of table datasets using a pool of worker processes.
+    The feature tree of each dataset is split into shards - one per top-level subtree of the path-encoder fan-out -
+    and each worker in turn takes the next shard, walks it, decodes its features, and sends them back in chunks.
+    Features are yielded in whatever order the workers finish decoding them, not in tree order.
+
+    Use as a context manager, so that the workers are stopped when reading is finished:
+
+    >>> with ParallelFeatureReader(repo, num_workers) as reader:
+    >>>     for feature in reader.features_with_crs_ids(dataset, spatial_filter):
+    >>>         ...
+    """
+
+    # Number of features sent back from a worker at once.
+    CHUNK_SIZE = 1000
+    # Maximum number of chunks waiting to be collected from the workers.
+    MAX_QUEUED_CHUNKS = 64
+
+    def __init__(self, repo, num_workers):
+        self.repo = repo
+        self.num_workers = num_workers
+        self.task_queue = None
+        self.result_queue = None
+        self.procs = []
+        # Set while features are being read - if reading is abandoned part way, the workers must be terminated.
+        self.reading = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start_workers(self):
+        context = multiprocessing.get_context()
+        self.task_queue = context.Queue()
+        self.result_queue = context.Queue(maxsize=self.MAX_QUEUED_CHUNKS)
+        for n in range(self.num_workers):
+            proc = context.Process(
+                target=_parallel_read_worker,
+                args=(self.repo.path, self.task_queue, self.result_queue),
+                name=f"kart-checkout-worker-{n}",
+                daemon=True,
+            )
+            proc.start()
+            self.procs.append(proc)
+
+    def _get_result(self):
+        while True:
+            try:
+                return self.result_queue.get(timeout=1)
+            except queue.Empty:
+                for proc in self.procs:
+                    if not proc.is_alive():
+                        raise SubprocessError(
+                            f"Checkout worker process failed: exit code {proc.exitcode}",
+                            exit_code=proc.exitcode,
+                        )
+
+    def features_with_crs_ids(self, dataset, spatial_filter, *, log_progress=False):
+        """
+        Same as dataset.features_with_crs_ids(...), except that the features are decoded by the workers, and
+        are not yielded in any particular order. The spatial filter must be the repo's spatial filter, since
+        that is the filter that the workers load and apply.
+        """
+        if log_progress:
+            plog = L.info if log_progress is True else log_progress
+            log_progress = bool(log_progress)
+
+        feature_tree = dataset.feature_tree
+        shards = [obj.name for obj in feature_tree]
+        if not shards:
+            return
+        if not self.procs:
+            self._start_workers()
+
+        dataset_spec = (
+            dataset.__class__,
+            str(dataset.tree.id),
+            dataset.path,
+            dataset.dirname,
+        )
+        for shard in shards:
+            self.task_queue.put((dataset_spec, shard))
+
+        n_read = 0
+        n_matched = 0
+        n_total = dataset.feature_count
+        t0 = time.monotonic()
+        n_next_log = dataset.NUM_FEATURES_PER_PROGRESS_LOG
+        shards_remaining = len(shards)
+        self.reading = True
+        while shards_remaining:
+            message_type, payload = self._get_result()
+            if message_type == "features":
+                n_matched += len(payload)
+                yield from payload
+            else:
+                shards_remaining -= 1
+                n_read += payload
+                if log_progress and (n_read >= n_next_log or not shards_remaining):
+                    n_next_log = n_read + dataset.NUM_FEATURES_PER_PROGRESS_LOG
+                    t = time.monotonic()
+                    plog(
+                        "%.1f%% %d/%d features... @%.1fs (~%d F/s)",
+                        n_read / n_total * 100,
+                        n_read,
+                        n_total,
+                        t - t0,
+                        n_read / (t - t0 or 0.001),
+                    )
+        self.reading = False
+
+        if log_progress and n_matched != n_read:
+            plog(
+                "(of %d features read, wrote %d to the working copy that match the spatial filter)",
+                n_read,
+                n_matched,
+            )
+
+    def close(self):
+        """Stops the workers."""
+        if not self.procs:
+            return
+        if self.reading:
+            for proc in self.procs:
+                proc.terminate()
+        else:
+            for proc in self.procs:
+                self.task_queue.put(None)
+        for proc in self.procs:
+            proc.join()
+        self.procs = []
+
+
+def _parallel_read_worker(repo_path, task_queue, result_queue):
+    """
+    Entry point for each worker process started by ParallelFeatureReader.
+    Decodes the features in each shard it is given, and sends them back in chunks.
+    """
+    from kart.repo import KartRepo
+    from kart.spatial_filter.index import FeatureEnvelopeFilter
+
+    # Don't inherit Kart's handlers for cleaning up the process group - if this worker is stopped, just stop.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    repo = KartRepo(repo_path, validate=False)
+    repo_spatial_filter = repo.spatial_filter
+    chunk_size = ParallelFeatureReader.CHUNK_SIZE
+    envelope_filter = None
+
+    dataset_spec = None
+    for task in iter(task_queue.get, None):
+        next_dataset_spec, shard = task
+        if next_dataset_spec != dataset_spec:
+            dataset_spec = next_dataset_spec
+            dataset_class, tree_id, path, dirname = dataset_spec
+            dataset = dataset_class(repo[tree_id], path, repo, dirname=dirname)
+            spatial_filter = repo_spatial_filter.transform_for_dataset(dataset)
+            if not spatial_filter.match_all and envelope_filter is None:
+                envelope_filter = FeatureEnvelopeFilter.for_repo(
+                    repo, repo_spatial_filter
+                )
+            cols_to_crs_ids = dataset._cols_to_crs_ids()
+            feature_tree = dataset.feature_tree
+
+        shard_obj = feature_tree / shard
+        blobs = (
+            [shard_obj]
+            if shard_obj.type_str == "blob"
+            else find_blobs_in_tree(shard_obj)
+        )
+        n_skipped_before = 0
+        if envelope_filter is not None and not spatial_filter.match_all:
+            n_skipped_before = envelope_filter.num_skipped
+            blobs = envelope_filter.filter_blobs(blobs)
+        # If a spatial filter is active, blobs may be missing because they were filtered out during the clone.
+        features = dataset.get_features_from_blobs(
+            blobs, promised_ok=not spatial_filter.match_all
+        )
+
+        n_read = 0
+        chunk = []
+        for feature in features:
+            n_read += 1
+            if feature is not None and spatial_filter.matches(feature):
+                chunk.append(dataset._add_crs_ids_to_feature(feature, cols_to_crs_ids))
+                if len(chunk) >= chunk_size:
+                    result_queue.put(("features", chunk))
+                    chunk = []
+        if chunk:
+            result_queue.put(("features", chunk))
+        if envelope_filter is not None:
+            n_read += envelope_filter.num_skipped - n_skipped_before
+        result_queue.put(("done", n_read))
+
+    if envelope_filter is not None:
+        envelope_filter.close()
@@ -8,10 +8,10 @@ from kart import crs_util
 from kart.diff_structs import Delta, DeltaDiff, DatasetDiff
 from kart.exceptions import PATCH_DOES_NOT_APPLY, InvalidOperation, NotYetImplemented
 from kart.key_filters import DatasetKeyFilter, FeatureKeyFilter
-from kart.promisor_utils import fetch_promised_blobs, object_is_promised
 from kart.schema import Schema
 from kart.spatial_filter import SpatialFilter
 
+from .parallel_encoder import ParallelFeatureDiffEncoder
 from .table_dataset import TableDataset
 
 
@@ -28,6 +28,9 @@ class RichTableDataset(TableDataset):
 
     RTREE_INDEX_EXTENSIONS = ("kart-idxd", "kart-idxi")
 
+    # Feature diffs smaller than this are applied by this process, even if kart.apply.jobs is set.
+    PARALLEL_APPLY_MIN_FEATURES = 10_000
+
     def features_plus_blobs(self):
         for blob in self.feature_blobs():
             yield self.get_feature(path=blob.name, data=memoryview(blob)), blob
@@ -162,16 +165,33 @@ class RichTableDataset(TableDataset):
                 f"Can't reproject dataset {self.path!r} into target CRS: {e}"
             )
 
-    def diff(self, other, ds_filter=DatasetKeyFilter.MATCH_ALL, reverse=False):
+    def diff(
+        self,
+        other,
+        ds_filter=DatasetKeyFilter.MATCH_ALL,
+        reverse=False,
+        streaming=False,
+    ):
         """
         Generates a Diff from self -> other.
         If reverse is true, generates a diff from other -> self.
+        If streaming is true, the feature deltas are generated as a StreamingDeltaDiff.
         """
         ds_diff = super().diff(other, ds_filter=ds_filter, reverse=reverse)
         feature_filter = ds_filter.get("feature", ds_filter.child_type())
-        ds_diff["feature"] = DeltaDiff(
-            self.diff_feature(other, feature_filter, reverse=reverse)
-        )
+        if streaming:
+            ds_diff["feature"] = self.diff_subtree_streaming(
+                other,
+                "feature",
+                key_filter=feature_filter,
+                key_decoder_method="decode_path_to_1pk",
+                value_decoder_method="get_feature_promise_from_path",
+                reverse=reverse,
+            )
+        else:
+            ds_diff["feature"] = DeltaDiff(
+                self.diff_feature(other, feature_filter, reverse=reverse)
+            )
         return ds_diff
 
     def diff_to_working_copy(
@@ -213,6 +233,7 @@ class RichTableDataset(TableDataset):
         Given a diff that only affects this dataset, write it to the given treebuilder.
         Blobs will be created in the repo, and referenced in the resulting tree, but
         no commit is created - this is the responsibility of the caller.
+        Returns the change in the number of features - see apply_feature_diff.
         """
         # TODO - support multiple primary keys.
         meta_diff = dataset_diff.get("meta")
@@ -229,7 +250,7 @@ class RichTableDataset(TableDataset):
 
         feature_diff = dataset_diff.get("feature")
         if feature_diff:
-            self.apply_feature_diff(
+            return self.apply_feature_diff(
                 feature_diff,
                 object_builder,
                 schema=schema,
@@ -258,7 +279,7 @@ class RichTableDataset(TableDataset):
         """
         Given a delta with no old value, checks for conflicts.
 
-        Returns a boolean indicating whether there was a conflict.
+        Returns a message describing the conflict, or None if there was no conflict.
 
         A conflict occurs if either:
             * a feature was already inserted with the same primary key value.
@@ -268,11 +289,7 @@ class RichTableDataset(TableDataset):
         """
 
         if resolve_missing_values_from_ds is None:
-            click.echo(
-                f"{self.path}: Trying to create feature that already exists: {delta.new_key}",
-                err=True,
-            )
-            return True
+            return f"{self.path}: Trying to create feature that already exists: {delta.new_key}"
         feature_conflict_since_patch = False
         if schema_changed_since_patch:
             # can't use feature OID check here, since schema changes mean that two objects with
@@ -305,12 +322,8 @@ class RichTableDataset(TableDataset):
                     feature_conflict_since_patch = old_feature != current_feature
 
         if feature_conflict_since_patch:
-            click.echo(
-                f"{self.path}: Feature was modified since patch: {delta.new_key}",
-                err=True,
-            )
-
-        return feature_conflict_since_patch
+            return f"{self.path}: Feature was modified since patch: {delta.new_key}"
+        return None
 
     def apply_feature_diff(
         self,
@@ -320,92 +333,171 @@ class RichTableDataset(TableDataset):
         schema=None,
         resolve_missing_values_from_ds=None,
     ):
-        """Applies a feature diff."""
+        """
+        Applies a feature diff.
+        Returns the change in the number of features in this dataset that results from applying it.
+        If the kart.apply.jobs config variable is set, large diffs are checked for conflicts and encoded using that
+        many worker processes - see ParallelFeatureDiffEncoder. Either way, the results are written to the
+        object_builder in the same order as the deltas in the diff.
+        """
+        from kart.repo import KartConfigKeys
+
         if not feature_diff:
-            return
+            return 0
+
+        num_workers = self.repo.get_config_int(KartConfigKeys.KART_APPLY_JOBS, 1)
+        if (
+            num_workers > 1
+            and self.tree is not None
+            and len(feature_diff) >= self.PARALLEL_APPLY_MIN_FEATURES
+        ):
+            with ParallelFeatureDiffEncoder(self.repo, num_workers) as encoder:
+                encoded_deltas = encoder.encode_feature_deltas(
+                    self,
+                    feature_diff.values(),
+                    schema=schema,
+                    resolve_missing_values_from_ds=resolve_missing_values_from_ds,
+                )
+                return self._write_encoded_feature_deltas(
+                    encoded_deltas, object_builder
+                )
+
+        encoded_deltas = self.encode_feature_deltas(
+            feature_diff.values(),
+            schema=schema,
+            resolve_missing_values_from_ds=resolve_missing_values_from_ds,
+        )
+        return self._write_encoded_feature_deltas(encoded_deltas, object_builder)
 
+    def encode_feature_deltas(
+        self, deltas, *, schema=None, resolve_missing_values_from_ds=None
+    ):
+        """
+        Checks each of the given feature deltas for conflicts with this dataset, and encodes its new value (if any) -
+        without writing anything. Yields a tuple (conflict, old_path, new_path_and_data, feature_count_change) for
+        each delta, in the same order:
+        conflict - a message describing why the delta doesn't apply, or None if it does.
+        old_path - the path of the feature to remove, if any.
+        new_path_and_data - the path and data of the feature blob to write, if any.
+        feature_count_change - the change in the number of features that results from applying the delta.
+        """
         schema_changed_since_patch = False
         if resolve_missing_values_from_ds is not None:
             schema_changed_since_patch = (
                 resolve_missing_values_from_ds.schema != self.schema
             )
 
-        with object_builder.chdir(self.inner_path):
-            # Applying diffs works even if there is no tree yet created for the dataset,
-            # as is the case when the dataset is first being created right now.
-            tree = self.inner_tree or ()
-
-            encode_kwargs = {}
-            if schema is not None:
-                encode_kwargs = {"schema": schema}
-
-            has_conflicts = False
-            for delta in feature_diff.values():
-                old_key = delta.old_key
-                new_key = delta.new_key
-                old_path = (
-                    self.encode_1pk_to_path(old_key, relative=True)
-                    if old_key is not None
-                    else None
+        # Applying diffs works even if there is no tree yet created for the dataset,
+        # as is the case when the dataset is first being created right now.
+        tree = self.inner_tree or ()
+
+        encode_kwargs = {}
+        if schema is not None:
+            encode_kwargs = {"schema": schema}
+
+        for delta in deltas:
+            old_key = delta.old_key
+            new_key = delta.new_key
+            old_path = (
+                self.encode_1pk_to_path(old_key, relative=True)
+                if old_key is not None
+                else None
+            )
+            new_path = (
+                self.encode_1pk_to_path(new_key, relative=True)
+                if new_key is not None
+                else None
+            )
+
+            # Conflict detection
+            conflict = None
+            if delta.type == "delete" and old_path not in tree:
+                conflict = (
+                    f"{self.path}: Trying to delete nonexistent feature: {old_key}"
                 )
-                new_path = (
-                    self.encode_1pk_to_path(new_key, relative=True)
-                    if new_key is not None
-                    else None
+            elif delta.type == "insert" and new_path in tree:
+                conflict = self.check_feature_insertion_for_conflicts(
+                    delta,
+                    new_path=new_path,
+                    schema_changed_since_patch=schema_changed_since_patch,
+                    resolve_missing_values_from_ds=resolve_missing_values_from_ds,
                 )
+            elif delta.type == "update" and old_path not in tree:
+                conflict = (
+                    f"{self.path}: Trying to update nonexistent feature: {old_key}"
+                )
+            elif (
+                delta.type == "update" and self.get_feature(old_key) != delta.old_value
+            ):
+                conflict = (
+                    f"{self.path}: Trying to update already-changed feature: {old_key}"
+                )
+            if conflict:
+                yield conflict, None, None, 0
+                continue
 
-                # Conflict detection
-                if delta.type == "delete" and old_path not in tree:
-                    has_conflicts = True
-                    click.echo(
-                        f"{self.path}: Trying to delete nonexistent feature: {old_key}",
-                        err=True,
-                    )
-                    continue
-
-                if delta.type == "insert" and new_path in tree:
-                    if self.check_feature_insertion_for_conflicts(
-                        delta,
-                        new_path=new_path,
-                        schema_changed_since_patch=schema_changed_since_patch,
-                        resolve_missing_values_from_ds=resolve_missing_values_from_ds,
-                    ):
-                        has_conflicts = True
-                        continue
-
-                if delta.type == "update" and old_path not in tree:
-                    has_conflicts = True
-                    click.echo(
-                        f"{self.path}: Trying to update nonexistent feature: {old_key}",
-                        err=True,
-                    )
-                    continue
+            # The feature diff applies - work out what to write:
+            remove_path = None
+            new_path_and_data = None
+            feature_count_change = 0
+            if old_path and old_path != new_path:
+                remove_path = old_path
+                feature_count_change -= 1
+            if delta.new_value:
+                new_path_and_data = self.encode_feature(
+                    delta.new.value, relative=True, **encode_kwargs
+                )
+                if old_path != new_path and new_path not in tree:
+                    feature_count_change += 1
+            yield None, remove_path, new_path_and_data, feature_count_change
 
-                if (
-                    delta.type == "update"
-                    and self.get_feature(old_key) != delta.old_value
-                ):
+    def _write_encoded_feature_deltas(self, encoded_deltas, object_builder):
+        """
+        Writes the output of encode_feature_deltas to the object_builder, unless any of the deltas have conflicts.
+        Returns the change in the number of features.
+        """
+        has_conflicts = False
+        feature_count_change = 0
+        # Each delta's count change is worked out against the original tree, so we also need to track which paths
+        # the deltas themselves remove and write - eg, deleting 5 and renaming 6 to 5 leaves one fewer feature, not two.
+        removed_paths = set()
+        inserted_paths = set()
+        overwritten_paths = set()
+        with object_builder.chdir(self.inner_path):
+            for (
+                conflict,
+                old_path,
+                new_path_and_data,
+                count_change,
+            ) in encoded_deltas:
+                if conflict:
                     has_conflicts = True
-                    click.echo(
-                        f"{self.path}: Trying to update already-changed feature: {old_key}",
-                        err=True,
-                    )
+                    click.echo(conflict, err=True)
                     continue
+                if old_path:
+                    # Don't remove a feature that an earlier delta has already written here.
+                    if old_path not in inserted_paths:
+                        object_builder.remove(old_path)
+                    removed_paths.add(old_path)
+                if new_path_and_data:
+                    new_path = new_path_and_data[0]
+                    object_builder.insert(*new_path_and_data)
+                    inserted_paths.add(new_path)
+                    if old_path != new_path and count_change == (-1 if old_path else 0):
+                        # Counted as writing over a feature already in the original tree.
+                        overwritten_paths.add(new_path)
+                feature_count_change += count_change
+
+        # Writing over a feature that another delta removes adds a feature after all.
+        feature_count_change += len(removed_paths & overwritten_paths)
+
+        if has_conflicts:
+            raise InvalidOperation(
+                "Patch does not apply",
+                exit_code=PATCH_DOES_NOT_APPLY,
+            )
 
-                # Actually write the feature diff:
-                if old_path and old_path != new_path:
-                    object_builder.remove(old_path)
-                if delta.new_value:
-                    path, data = self.encode_feature(
-                        delta.new.value, relative=True, **encode_kwargs
-                    )
-                    object_builder.insert(path, data)
-
-            if has_conflicts:
-                raise InvalidOperation(
-                    "Patch does not apply",
-                    exit_code=PATCH_DOES_NOT_APPLY,
-                )
+        return feature_count_change
 
     def all_features_diff(
         self,
@@ -424,27 +516,3 @@ class RichTableDataset(TableDataset):
             delta.flags = flags
             feature_diff.add_delta(delta)
         return feature_diff
-
-    def fetch_missing_dirty_features(self, working_copy):
-        """Fetch all the promised features in this dataset that are marked as dirty in the working copy."""
-
-        # Attempting this more than once in a single kart invocation will waste time and have no effect.
-        if getattr(self, "fetch_missing_dirty_features_attempted", False):
-            return False
-        self.fetch_missing_dirty_features_attempted = True
-
-        click.echo(f"Fetching missing but required features in {self.path}", err=True)
-        dirty_pks = working_copy.get_dirty_pks(self)
-        if self.schema.pk_columns[0].data_type == "integer":
-            dirty_pks = (int(pk) for pk in dirty_pks)
-        dirty_paths = (self.encode_1pk_to_path(pk, relative=True) for pk in dirty_pks)
-        promised_blob_ids = []
-        for dirty_path in dirty_paths:
-            dirty_blob = None
-            try:
-                dirty_blob = self.inner_tree / dirty_path
-                dirty_blob.size
-            except KeyError as e:
-                if dirty_blob is not None and object_is_promised(e):
-                    promised_blob_ids.append(dirty_blob.oid.hex)
-        fetch_promised_blobs(self.repo, promised_blob_ids)
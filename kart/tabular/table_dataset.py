@@ -3,6 +3,7 @@ import logging
 import time
 
 from kart.base_dataset import BaseDataset
+from kart.promisor_utils import object_is_promised
 from kart.spatial_filter import SpatialFilter
 from kart.working_copy import PartType
 
@@ -136,13 +137,23 @@ class TableDataset(BaseDataset, TableImportSource):
         so that zip(schema.columns, feature.values()) matches each field with its column.
 
         spatial_filter - restricts the features yielded to those that are in a particular geographic area.
+            If the repo has a feature envelope index, features that it shows are outside the spatial filter are
+            skipped without being read - see FeatureEnvelopeFilter.
         log_progress - can be set to True, or to a callable logger method eg L.info, to enable logging.
         """
+        from kart.spatial_filter.index import FeatureEnvelopeFilter
+
         if log_progress:
             plog = L.info if log_progress is True else log_progress
             log_progress = bool(log_progress)
 
+        original_spatial_filter = spatial_filter
         spatial_filter = spatial_filter.transform_for_dataset(self)
+        envelope_filter = None
+        if not spatial_filter.match_all:
+            envelope_filter = FeatureEnvelopeFilter.for_repo(
+                self.repo, original_spatial_filter
+            )
 
         n_read = 0
         n_chunk = 0
@@ -154,35 +165,52 @@ class TableDataset(BaseDataset, TableImportSource):
         if log_progress:
             plog("0.0%% 0/%d features... @0.0s", n_total)
 
-        for blob in self.feature_blobs():
-            n_read += 1
-            n_chunk += 1
-            try:
-                feature = self.get_feature_from_blob(blob)
-            except KeyError as e:
-                if spatial_filter.feature_is_prefiltered(e):
-                    feature = None
-                else:
-                    raise
+        try:
+            feature_blobs = self.feature_blobs()
+            if envelope_filter is not None:
+                feature_blobs = envelope_filter.filter_blobs(feature_blobs)
+
+            def n_skipped():
+                # Blobs skipped by the envelope filter are read, as far as progress is concerned.
+                return envelope_filter.num_skipped if envelope_filter is not None else 0
 
-            if feature is not None and spatial_filter.matches(feature):
-                n_matched += 1
-                yield feature
+            # If a spatial filter is active, blobs may be missing because they were filtered out during the clone.
+            features = self.get_features_from_blobs(
+                feature_blobs, promised_ok=not spatial_filter.match_all
+            )
+            for feature in features:
+                n_read += 1
+                n_chunk += 1
+
+                if feature is not None and spatial_filter.matches(feature):
+                    n_matched += 1
+                    yield feature
 
-            if log_progress and n_chunk == self.NUM_FEATURES_PER_PROGRESS_LOG:
+                if log_progress and n_chunk == self.NUM_FEATURES_PER_PROGRESS_LOG:
+                    t = time.monotonic()
+                    self._log_feature_progress(
+                        plog,
+                        n_read + n_skipped(),
+                        n_chunk,
+                        n_matched,
+                        n_total,
+                        t0,
+                        t0_chunk,
+                        t,
+                    )
+                    t0_chunk = t
+                    n_chunk = 0
+
+            n_read += n_skipped()
+            if log_progress and n_total:
                 t = time.monotonic()
                 self._log_feature_progress(
                     plog, n_read, n_chunk, n_matched, n_total, t0, t0_chunk, t
                 )
-                t0_chunk = t
-                n_chunk = 0
-
-        if log_progress and n_total:
-            t = time.monotonic()
-            self._log_feature_progress(
-                plog, n_read, n_chunk, n_matched, n_total, t0, t0_chunk, t
-            )
-            plog("Overall rate: %d features/s", (n_read / (t - t0 or 0.001)))
+                plog("Overall rate: %d features/s", (n_read / (t - t0 or 0.001)))
+        finally:
+            if envelope_filter is not None:
+                envelope_filter.close()
 
     def _log_feature_progress(
         self, plog, num_read, num_chunk, num_matched, num_total, t0, t0_chunk, t
@@ -243,6 +271,21 @@ class TableDataset(BaseDataset, TableImportSource):
     def get_feature_from_blob(self, feature_blob):
         return self.get_feature(path=feature_blob.name, data=memoryview(feature_blob))
 
+    def get_features_from_blobs(self, feature_blobs, *, promised_ok=False):
+        """
+        Yields a feature dict for each of the given feature blobs, in the same order.
+        If promised_ok is True, yields None for any blob that is promised but not yet fetched, instead of raising.
+        Subclasses may override this to decode many features more efficiently than one at a time.
+        """
+        for blob in feature_blobs:
+            try:
+                yield self.get_feature_from_blob(blob)
+            except KeyError as e:
+                if promised_ok and object_is_promised(e):
+                    yield None
+                else:
+                    raise
+
 
 class IntegrityError(ValueError):
     pass
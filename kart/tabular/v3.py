@@ -1,4 +1,5 @@
 import functools
+import operator
 import os
 import re
 
@@ -11,12 +12,14 @@ from kart.base_dataset import (
     MetaItemVisibility,
 )
 from kart.core import find_blobs_in_tree
+from kart.promisor_utils import object_is_promised
 from kart.exceptions import (
     PATCH_DOES_NOT_APPLY,
     InvalidOperation,
     NotYetImplemented,
 )
 from kart.schema import Legend, Schema
+from kart.spatial_filter import SpatialFilter
 from kart.serialise_util import (
     b64decode_str,
     ensure_bytes,
@@ -26,6 +29,7 @@ from kart.serialise_util import (
     msg_pack,
     msg_unpack,
 )
+from kart.utils import chunk
 from .v3_paths import PathEncoder
 from .rich_table_dataset import RichTableDataset
 
@@ -214,6 +218,124 @@ class TableV3(RichTableDataset):
         raw_dict = self.get_raw_feature_dict(pk_values=pk_values, path=path, data=data)
         return self.schema.feature_from_raw_dict(raw_dict)
 
+    def get_features_from_blobs(
+        self, feature_blobs, *, promised_ok=False, as_tuples=False
+    ):
+        """
+        Yields a feature for each of the given feature blobs, in the same order - just like calling
+        get_feature_from_blob on each in turn, but much faster when decoding many features.
+        Rather than building a raw dict per feature and then reordering it to match the schema, the mapping
+        from each legend's values to the schema's columns is worked out once per legend, and then applied to
+        each feature's values in a single step.
+
+        promised_ok - if True, yields None for any blob that is promised but not yet fetched, instead of raising.
+        as_tuples - if True, yields each feature as a tuple of values in schema column order, instead of a dict.
+        """
+        column_names = [c.name for c in self.schema.columns]
+        row_getters = {}
+
+        for blob in feature_blobs:
+            try:
+                legend_hash, non_pk_values = msg_unpack(memoryview(blob))
+            except KeyError as e:
+                if promised_ok and object_is_promised(e):
+                    yield None
+                    continue
+                raise
+
+            row_getter = row_getters.get(legend_hash)
+            if row_getter is None:
+                row_getter = self._legend_to_schema_row_getter(legend_hash)
+                row_getters[legend_hash] = row_getter
+
+            pk_values = self.decode_path_to_pks(blob.name)
+            row = row_getter((*pk_values, *non_pk_values, None))
+            yield row if as_tuples else dict(zip(column_names, row))
+
+    def _legend_to_schema_row_getter(self, legend_hash):
+        """
+        Returns a callable that takes the values stored using the given legend - pk_values then non_pk_values
+        then a single trailing None - and returns a tuple of the values in schema column order. Columns which
+        aren't in the legend are given the trailing None.
+        """
+        legend = self.get_legend(legend_hash)
+        legend_columns = (*legend.pk_columns, *legend.non_pk_columns)
+        missing_index = len(legend_columns)
+        index_of = {column_id: i for i, column_id in enumerate(legend_columns)}
+        indexes = [index_of.get(c.id, missing_index) for c in self.schema.columns]
+        if len(indexes) == 1:
+            # itemgetter with a single index doesn't return a tuple.
+            index = indexes[0]
+            return lambda values: (values[index],)
+        return operator.itemgetter(*indexes)
+
+    def get_feature_blobs_for_pks(self, pk_values_list):
+        """
+        Given a list of pk values (or lists of pk values), returns a list of the corresponding feature blobs in the same
+        order, with None for any feature that doesn't exist. Much faster than calling get_feature for each in turn -
+        the paths are looked up in sorted order, so that each subtree of the feature tree is only looked up once.
+        The blobs aren't loaded, so a blob that is promised but not yet fetched is returned like any other.
+        """
+        encoder = self.feature_path_encoder
+        paths = [
+            encoder.encode_pks_to_path(self.schema.sanitise_pks(pk_values))
+            for pk_values in pk_values_list
+        ]
+        feature_tree = self.feature_tree
+        result = [None] * len(paths)
+
+        current_parent = current_subtree = None
+        for i in sorted(range(len(paths)), key=paths.__getitem__):
+            parent, _, name = paths[i].rpartition("/")
+            if parent != current_parent:
+                current_parent = parent
+                try:
+                    current_subtree = feature_tree / parent if parent else feature_tree
+                except KeyError:
+                    current_subtree = None
+            if current_subtree is not None:
+                try:
+                    result[i] = current_subtree / name
+                except KeyError:
+                    pass
+        return result
+
+    def get_features(
+        self, row_pks, *, ignore_missing=False, spatial_filter=SpatialFilter.MATCH_ALL
+    ):
+        """
+        Same as TableDataset.get_features, except that if a spatial filter is set and the repo has a feature envelope
+        index, features that the index shows are outside the spatial filter are skipped without being read.
+        """
+        from kart.spatial_filter.index import FeatureEnvelopeFilter
+
+        ds_spatial_filter = spatial_filter.transform_for_dataset(self)
+        envelope_filter = None
+        if not ds_spatial_filter.match_all:
+            envelope_filter = FeatureEnvelopeFilter.for_repo(self.repo, spatial_filter)
+        if envelope_filter is None:
+            yield from super().get_features(
+                row_pks, ignore_missing=ignore_missing, spatial_filter=spatial_filter
+            )
+            return
+
+        try:
+            for pk_chunk in chunk(row_pks, envelope_filter.LOOKUP_BATCH_SIZE):
+                blobs = self.get_feature_blobs_for_pks(pk_chunk)
+                if not ignore_missing:
+                    for pk_values, blob in zip(pk_chunk, blobs):
+                        if blob is None:
+                            raise KeyError(
+                                f"No feature found with primary key {pk_values}"
+                            )
+                blobs = envelope_filter.filter_blobs(b for b in blobs if b is not None)
+                # Blobs may be missing because they were filtered out during the clone.
+                for feature in self.get_features_from_blobs(blobs, promised_ok=True):
+                    if feature is not None and ds_spatial_filter.matches(feature):
+                        yield feature
+        finally:
+            envelope_filter.close()
+
     def feature_blobs(self):
         """
         Returns a generator that yields every feature blob in turn.
@@ -222,6 +344,94 @@ class TableV3(RichTableDataset):
             return
         yield from find_blobs_in_tree(self.inner_tree / self.FEATURE_PATH)
 
+    # Feature counts are cached in the annotations DB, keyed by tree ID. As well as the count for the whole
+    # feature tree, counts are cached for subtrees down to this depth, so that after a small edit, the new
+    # count can be found by recounting only those few subtrees that have changed.
+    FEATURE_COUNT_CACHE_DEPTH = 2
+    # Subtrees with fewer features than this are quicker to recount than to look up.
+    FEATURE_COUNT_CACHE_MIN_COUNT = 1000
+    FEATURE_COUNT_ANNOTATION = "feature-count"
+
+    @property
+    @functools.lru_cache(maxsize=1)
+    def feature_count(self):
+        """The total number of features in this dataset."""
+        feature_tree = self.feature_tree
+        if not feature_tree:
+            return 0
+
+        from kart.annotations.db import annotations_session
+
+        with annotations_session(self.repo):
+            count = self.cached_feature_count()
+            if count is None:
+                count = self._count_blobs_in_trees(
+                    [feature_tree], self.FEATURE_COUNT_CACHE_DEPTH
+                )[0]
+                self.store_feature_count(feature_tree, count)
+        return count
+
+    def cached_feature_count(self):
+        """
+        Returns the number of features in this dataset if it is already known without counting them,
+        or None if it is not.
+        """
+        feature_tree = self.feature_tree
+        if not feature_tree:
+            return 0
+        annotation = self.repo.diff_annotations.get_for_tree(
+            tree=feature_tree, annotation_type=self.FEATURE_COUNT_ANNOTATION
+        )
+        return annotation["count"] if annotation is not None else None
+
+    def store_feature_count(self, feature_tree, count):
+        """Caches the number of features in the given feature tree, so it needn't be counted again."""
+        self.repo.diff_annotations.store_for_tree(
+            tree=feature_tree,
+            annotation_type=self.FEATURE_COUNT_ANNOTATION,
+            data={"count": count},
+        )
+
+    def _count_blobs_in_trees(self, trees, cache_depth):
+        """
+        Returns a list with the number of blobs found (recursively) in each of the given trees.
+        Counts for subtrees are looked up in and stored to the cache, down to the given depth.
+        """
+        if cache_depth <= 0:
+            return [sum(1 for blob in find_blobs_in_tree(tree)) for tree in trees]
+
+        # Gather the immediate children of every tree, so that the cache can be queried for all of them at once.
+        subtrees = []
+        child_ranges = []
+        blob_counts = []
+        for tree in trees:
+            start = len(subtrees)
+            num_blobs = 0
+            for obj in tree:
+                if obj.type_str == "tree":
+                    subtrees.append(obj)
+                else:
+                    num_blobs += 1
+            child_ranges.append((start, len(subtrees)))
+            blob_counts.append(num_blobs)
+        if not subtrees:
+            return blob_counts
+
+        cached = self.repo.diff_annotations.get_many_for_trees(
+            trees=subtrees, annotation_type=self.FEATURE_COUNT_ANNOTATION
+        )
+        uncached = [t for t in subtrees if str(t.id) not in cached]
+        uncached_counts = self._count_blobs_in_trees(uncached, cache_depth - 1)
+        for subtree, count in zip(uncached, uncached_counts):
+            cached[str(subtree.id)] = {"count": count}
+            if count >= self.FEATURE_COUNT_CACHE_MIN_COUNT:
+                self.store_feature_count(subtree, count)
+
+        return [
+            num_blobs + sum(cached[str(t.id)]["count"] for t in subtrees[start:end])
+            for num_blobs, (start, end) in zip(blob_counts, child_ranges)
+        ]
+
     @property
     @functools.lru_cache(maxsize=1)
     def feature_path_encoder(self):
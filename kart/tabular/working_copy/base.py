@@ -1,6 +1,8 @@
 import contextlib
 import functools
+import itertools
 import logging
+import operator
 import time
 
 import click
@@ -15,11 +17,13 @@ from kart.exceptions import (
     NotYetImplemented,
 )
 from kart.key_filters import DatasetKeyFilter, FeatureKeyFilter, RepoKeyFilter
-from kart.promisor_utils import LibgitSubcode
+from kart.promisor_utils import fetch_promised_blobs
+from kart.repo import KartConfigKeys
 from kart.sqlalchemy.upsert import Upsert as upsert
+from kart.tabular.parallel_reader import ParallelFeatureReader
 from kart.tabular.table_dataset import TableDataset
 from kart.schema import DefaultRoundtripContext, Schema
-from kart.utils import chunk
+from kart.utils import chunk, sorted_externally
 from kart.working_copy import WorkingCopyDirty, WorkingCopyPart
 
 from . import TableWorkingCopyStatus, TableWorkingCopyType
@@ -42,6 +46,9 @@ class TableWorkingCopy(WorkingCopyPart):
     self.kart_tables - sqlalchemy Table definitions for kart_state and kart_track tables.
     """
 
+    # The number of dirty rows for which the repo's version of the feature is looked up at once, when diffing.
+    DIRTY_ROWS_BATCH_SIZE = 10_000
+
     @property
     def WORKING_COPY_TYPE_NAME(self):
         """Human readable name of this type of working copy, eg "PostGIS"."""
@@ -604,72 +611,83 @@ class TableWorkingCopy(WorkingCopyPart):
 
         find_renames = self.can_find_renames(meta_diff)
 
-        with self.session() as sess:
-            r = self._execute_dirty_rows_query(sess, dataset, feature_filter, meta_diff)
+        feature_diff = DeltaDiff()
+        insert_count = delete_count = 0
+        promised_rows = []
 
-            feature_diff = DeltaDiff()
-            insert_count = delete_count = 0
-
-            for row in r:
-                track_pk = row[0]  # This is always a str
-                db_obj = {k: row[k] for k in row.keys() if k != ".__track_pk"}
+        def add_delta(db_obj, repo_obj):
+            nonlocal insert_count, delete_count
 
-                if db_obj[pk_field] is None:
-                    db_obj = None
+            if repo_obj == db_obj:
+                # DB was changed and then changed back - eg INSERT then DELETE.
+                # TODO - maybe delete track_pk from tracking table?
+                return
 
-                repo_obj = self._get_dataset_feature_and_fetch_if_needed(
-                    dataset, track_pk
-                )
+            if raise_if_dirty:
+                raise WorkingCopyDirty()
 
-                if repo_obj == db_obj:
-                    # DB was changed and then changed back - eg INSERT then DELETE.
-                    # TODO - maybe delete track_pk from tracking table?
-                    continue
+            if db_obj and not repo_obj:  # INSERT
+                insert_count += 1
+                delta = Delta.insert((db_obj[pk_field], db_obj))
 
-                if raise_if_dirty:
-                    raise WorkingCopyDirty()
+            elif repo_obj and not db_obj:  # DELETE
+                delete_count += 1
+                delta = Delta.delete((repo_obj[pk_field], repo_obj))
 
-                if db_obj and not repo_obj:  # INSERT
-                    insert_count += 1
-                    delta = Delta.insert((db_obj[pk_field], db_obj))
+            else:  # UPDATE
+                pk = db_obj[pk_field]
+                delta = Delta.update((pk, repo_obj), (pk, db_obj))
 
-                elif repo_obj and not db_obj:  # DELETE
-                    delete_count += 1
-                    delta = Delta.delete((repo_obj[pk_field], repo_obj))
+            delta.flags = WORKING_COPY_EDIT
+            feature_diff.add_delta(delta)
 
-                else:  # UPDATE
-                    pk = db_obj[pk_field]
-                    delta = Delta.update((pk, repo_obj), (pk, db_obj))
+        with self.session() as sess:
+            r = self._execute_dirty_rows_query(sess, dataset, feature_filter, meta_diff)
 
-                delta.flags = WORKING_COPY_EDIT
-                feature_diff.add_delta(delta)
+            # Rather than looking up the repo's version of each dirty row in turn, they are looked up in batches.
+            for rows in chunk(r, self.DIRTY_ROWS_BATCH_SIZE):
+                track_pks = [row[0] for row in rows]  # These are always strs
+                db_objs = []
+                for row in rows:
+                    db_obj = {k: row[k] for k in row.keys() if k != ".__track_pk"}
+                    db_objs.append(db_obj if db_obj[pk_field] is not None else None)
+
+                repo_blobs = dataset.get_feature_blobs_for_pks(track_pks)
+                repo_objs = dataset.get_features_from_blobs(
+                    [b for b in repo_blobs if b is not None], promised_ok=True
+                )
+                for track_pk, db_obj, repo_blob in zip(track_pks, db_objs, repo_blobs):
+                    repo_obj = next(repo_objs) if repo_blob is not None else None
+                    if repo_blob is not None and repo_obj is None:
+                        # A feature with this PK exists, but we don't have it locally right now - it will be fetched
+                        # below, along with any others. Note that this means the feature presumably doesn't match
+                        # the user's spatial filter, so it was probably a mistake by the user that they have reused
+                        # the existing feature's PK.
+                        promised_rows.append((track_pk, db_obj, repo_blob.oid.hex))
+                        continue
+                    add_delta(db_obj, repo_obj)
+
+        if promised_rows:
+            click.echo(
+                f"Fetching missing but required features in {dataset.path}", err=True
+            )
+            fetch_promised_blobs(self.repo, [oid for _, _, oid in promised_rows])
+            repo_blobs = dataset.get_feature_blobs_for_pks(
+                [track_pk for track_pk, _, _ in promised_rows]
+            )
+            repo_objs = dataset.get_features_from_blobs(repo_blobs)
+            for (track_pk, db_obj, oid), repo_obj in zip(promised_rows, repo_objs):
+                add_delta(db_obj, repo_obj)
 
-        if find_renames and (insert_count + delete_count) <= 400:
-            self.find_renames(feature_diff, dataset)
+        if find_renames:
+            rename_limit = self.repo.get_config_int(
+                KartConfigKeys.KART_DIFF_RENAMELIMIT
+            )
+            if rename_limit is None or (insert_count + delete_count) <= rename_limit:
+                self.find_renames(feature_diff, dataset)
 
         return feature_diff
 
-    def _get_dataset_feature_and_fetch_if_needed(self, dataset, feature_pk):
-        try:
-            return dataset.get_feature(feature_pk)
-        except KeyError as e:
-            # Couldn't find the feature.
-            subcode = getattr(e, "subcode", 0)
-
-            if subcode == LibgitSubcode.ENOSUCHPATH:
-                # There is no such feature. This is okay: it just means the user has inserted
-                # the feature into the working copy and it has not yet been committed.
-                return None
-            elif subcode == LibgitSubcode.EOBJECTPROMISED:
-                # A feature with this PK exists, but we don't have it locally right now. Fetch it.
-                # Note that this means the feature presumably doesn't match the user's spatial filter,
-                # so it was probably a mistake by the user that they have reused the existing feature's PK.
-                dataset.fetch_missing_dirty_features(self)
-                return dataset.get_feature(feature_pk)
-            else:
-                # Some other error has happened, or no subcode was found. Re-raise the error.
-                raise
-
     @property
     def _tracking_table_requires_cast(self):
         """
@@ -812,30 +830,39 @@ class TableWorkingCopy(WorkingCopyPart):
 
     def find_renames(self, feature_diff, dataset):
         """
-        Matches inserts + deletes into renames on a best effort basis.
-        changes at most one matching insert and delete into an update per blob-hash.
+        Matches inserts + deletes into renames: each deleted feature that is identical to an inserted feature apart
+        from its primary key is paired with that insert, and the pair is replaced with a single update. If several
+        inserted and deleted features are all identical apart from their primary keys, they are paired in PK order.
+        The features are matched by sorting their hashes, rather than by building a dict of them, so that memory use
+        stays bounded even when there are millions of inserts and deletes - see sorted_externally.
         Modifies feature_diff in place.
         """
 
         schema = dataset.schema
-        inserts = {}
-        deletes = {}
-
-        for delta in feature_diff.values():
-            if delta.type == "insert":
-                inserts[schema.hash_feature(delta.new_value, without_pk=True)] = delta
-            elif delta.type == "delete":
-                deletes[schema.hash_feature(delta.old_value, without_pk=True)] = delta
 
-        for h in deletes:
-            if h in inserts:
-                delete_delta = deletes[h]
-                insert_delta = inserts[h]
+        def hashed_keys():
+            for key, delta in feature_diff.items():
+                if delta.type == "insert":
+                    yield schema.hash_feature(delta.new_value, without_pk=True), 1, key
+                elif delta.type == "delete":
+                    yield schema.hash_feature(delta.old_value, without_pk=True), 0, key
 
-                del feature_diff[delete_delta.key]
-                del feature_diff[insert_delta.key]
-                update_delta = delete_delta + insert_delta
-                feature_diff.add_delta(update_delta)
+        renames = []
+        for _, group in itertools.groupby(
+            sorted_externally(hashed_keys()), key=operator.itemgetter(0)
+        ):
+            delete_keys, insert_keys = [], []
+            for _, is_insert, key in group:
+                (insert_keys if is_insert else delete_keys).append(key)
+            renames.extend(zip(delete_keys, insert_keys))
+
+        for delete_key, insert_key in renames:
+            delete_delta = feature_diff[delete_key]
+            insert_delta = feature_diff[insert_key]
+            del feature_diff[delete_key]
+            del feature_diff[insert_key]
+            update_delta = delete_delta + insert_delta
+            feature_diff.add_delta(update_delta)
 
     def update_state_table_tree(self, tree):
         """Write the given tree to the state table."""
@@ -892,18 +919,26 @@ class TableWorkingCopy(WorkingCopyPart):
         else:
             return contextlib.nullcontext()
 
+    # Datasets with fewer features than this are read in-process, since it isn't worth handing them to workers.
+    PARALLEL_CHECKOUT_MIN_FEATURES = 100000
+
     def write_full(self, commit_or_tree, *datasets):
         """
         Writes a full layer into a working-copy table.
         Only writes features that match the repo's spatial filter.
 
         Use for new working-copy checkouts.
+        If the kart.checkout.jobs config variable is set, the features of large datasets are read using that
+        many worker processes - see ParallelFeatureReader.
         """
         L = logging.getLogger(f"{self.__class__.__qualname__}.write_full")
         target_commit, target_tree = peel_to_commit_and_tree(commit_or_tree)
 
+        num_workers = self.repo.get_config_int(KartConfigKeys.KART_CHECKOUT_JOBS, 1)
+        parallel_reader = ParallelFeatureReader(self.repo, num_workers)
+
         self.repo.odb.refresh()
-        with pause_refreshing(self.repo.odb), self.session() as sess:
+        with pause_refreshing(self.repo.odb), self.session() as sess, parallel_reader:
             dataset_count = len(datasets)
             for i, dataset in enumerate(datasets):
                 L.info(
@@ -926,21 +961,31 @@ class TableWorkingCopy(WorkingCopyPart):
                     self._create_spatial_index_pre(sess, dataset)
 
                 L.info("Creating features...")
-                sql = self.insert_into_dataset_cmd(dataset)
                 t0 = time.monotonic()
 
-                CHUNK_SIZE = 10000
-
-                for row_dicts in chunk(
-                    dataset.features_with_crs_ids(
-                        self.repo.spatial_filter, log_progress=L.info
-                    ),
-                    CHUNK_SIZE,
+                if (
+                    num_workers > 1
+                    and dataset.feature_count >= self.PARALLEL_CHECKOUT_MIN_FEATURES
                 ):
-                    sess.execute(sql, row_dicts)
+                    features = parallel_reader.features_with_crs_ids(
+                        dataset, self.repo.spatial_filter, log_progress=L.info
+                    )
+                else:
+                    features = dataset.features_with_crs_ids(
+                        self.repo.spatial_filter, log_progress=L.info
+                    )
+
+                self._insert_features(sess, dataset, features)
+                t1 = time.monotonic()
+                L.info("Created features in %.1fs", t1 - t0)
 
+                # Indexes and triggers are only created once the features are written - it is quicker to build
+                # each index in one pass than to update it (and run the triggers) for every feature written.
+                self._create_primary_key_post(sess, dataset)
                 if dataset.has_geometry:
                     self._create_spatial_index_post(sess, dataset)
+                t2 = time.monotonic()
+                L.info("Created indexes in %.1fs", t2 - t1)
 
                 if not dataset.feature_path_encoder.DISTRIBUTED_FEATURES:
                     # Set up a sequence so that the user doesn't have to supply the next int PK.
@@ -948,13 +993,14 @@ class TableWorkingCopy(WorkingCopyPart):
 
                 self._create_triggers(sess, dataset)
                 self._update_last_write_time(sess, dataset, target_commit)
+                t3 = time.monotonic()
+                L.info("Created triggers in %.1fs", t3 - t2)
 
-                t1 = time.monotonic()
                 L.info(
                     "Wrote dataset %d of %d in %.1fs: %s",
                     i + 1,
                     dataset_count,
-                    t1 - t0,
+                    t3 - t0,
                     dataset.path,
                 )
 
@@ -963,6 +1009,16 @@ class TableWorkingCopy(WorkingCopyPart):
                 sess, self.repo.spatial_filter.hexhash
             )
 
+    def _insert_features(self, sess, dataset, features):
+        """
+        Inserts the given features into the newly created table for the given dataset - used by write_full.
+        This implementation uses executemany - subclasses can override it to use a faster way of bulk-loading rows.
+        """
+        sql = self.insert_into_dataset_cmd(dataset)
+        CHUNK_SIZE = 10000
+        for row_dicts in chunk(features, CHUNK_SIZE):
+            sess.execute(sql, row_dicts)
+
     def _write_meta(self, sess, dataset):
         """
         Write any non-feature data relating to dataset that is stored _outside_ the dataset table itself.
@@ -980,6 +1036,14 @@ class TableWorkingCopy(WorkingCopyPart):
         """
         raise NotImplementedError
 
+    def _create_primary_key_post(self, sess, dataset):
+        """
+        Called by write_full once the bulk of features have been written. Working copies that leave the primary key
+        constraint out of the table in _create_table_for_dataset (so that its index isn't updated for every feature
+        written) must add it here.
+        """
+        pass
+
     def _create_spatial_index_pre(self, sess, dataset):
         """
         Creates a spatial index for the table for the given dataset.
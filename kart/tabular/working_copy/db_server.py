@@ -162,6 +162,65 @@ class DatabaseServer_WorkingCopy(TableWorkingCopy):
 
         return result
 
+    # Limits on the multi-row INSERT statements used to bulk-load features in write_full - see _insert_features.
+    # If MULTI_ROW_INSERT_MAX_ROWS is None, features are inserted using executemany instead.
+    MULTI_ROW_INSERT_MAX_ROWS = None
+    # Maximum number of bind parameters per statement, or None for no limit.
+    MULTI_ROW_INSERT_MAX_PARAMS = None
+    # Approximate maximum size of the row data in a statement, or None for no limit.
+    MULTI_ROW_INSERT_MAX_BYTES = None
+
+    def _insert_features(self, sess, dataset, features):
+        # Sending many rows per INSERT statement is much faster than executemany, which makes one round-trip per row.
+        dialect = self.engine.dialect
+        if (
+            not self.MULTI_ROW_INSERT_MAX_ROWS
+            or not dialect.supports_multivalues_insert
+        ):
+            super()._insert_features(sess, dataset, features)
+            return
+
+        table = self._table_def_for_dataset(dataset)
+        max_rows = self.MULTI_ROW_INSERT_MAX_ROWS
+        if self.MULTI_ROW_INSERT_MAX_PARAMS:
+            # Some column types use more than one bind parameter per row, so compile a row to find out how many.
+            empty_row = {col.name: None for col in table.columns}
+            compiled = table.insert().values([empty_row]).compile(dialect=dialect)
+            params_per_row = len(
+                compiled.positiontup if compiled.positional else compiled.params
+            )
+            max_rows = min(max_rows, self.MULTI_ROW_INSERT_MAX_PARAMS // params_per_row)
+
+        for rows in self._multi_row_insert_batches(features, max(max_rows, 1)):
+            sess.execute(table.insert().values(rows))
+
+    def _multi_row_insert_batches(self, features, max_rows):
+        """
+        Generator. Yields lists of features, each list no longer than max_rows, and no bigger in total than
+        MULTI_ROW_INSERT_MAX_BYTES (approximately) unless it only contains a single feature.
+        """
+        max_bytes = self.MULTI_ROW_INSERT_MAX_BYTES
+        batch = []
+        batch_bytes = 0
+        for feature in features:
+            if max_bytes:
+                row_bytes = sum(
+                    len(v) if isinstance(v, (str, bytes)) else 8
+                    for v in feature.values()
+                )
+                if batch and batch_bytes + row_bytes > max_bytes:
+                    yield batch
+                    batch = []
+                    batch_bytes = 0
+                batch_bytes += row_bytes
+            batch.append(feature)
+            if len(batch) >= max_rows:
+                yield batch
+                batch = []
+                batch_bytes = 0
+        if batch:
+            yield batch
+
     def create_and_initialise(self):
         with self.session() as sess:
             self.create_schema(sess)
@@ -439,11 +439,11 @@ class WorkingCopy_GPKG(TableWorkingCopy):
         table = GpkgTables.gpkg_metadata
         sess.execute(sa.delete(table).where(table.c.id.in_(ids)))
 
-    def _create_spatial_index_pre(self, sess, dataset):
-        # Implementing only _create_spatial_index_pre:
-        # gpkgAddSpatialIndex has to be called before writing any features,
-        # since it only adds on-write triggers to update the index - it doesn't
-        # add any pre-existing features to the index.
+    def _create_spatial_index_post(self, sess, dataset):
+        # Only implemented as _create_spatial_index_post:
+        # gpkgAddSpatialIndex only adds on-write triggers to update the index - it doesn't add any pre-existing
+        # features to the index - so the features that have already been written are added to it here, all at once.
+        # This is much quicker than having the triggers update the index as each feature is written.
 
         # Generally, there shouldn't be an existing spatial index at this stage.
         # But if there is, we should clean it up and start over.
@@ -460,6 +460,17 @@ class WorkingCopy_GPKG(TableWorkingCopy):
             "SELECT gpkgAddSpatialIndex(:table, :geom);",
             {"table": dataset.table_name, "geom": geom_col},
         )
+        # This matches what the insert trigger created by gpkgAddSpatialIndex would do for each feature.
+        rtree_table = f"rtree_{dataset.table_name}_{geom_col}"
+        geom = self.quote(geom_col)
+        sess.execute(
+            f"""
+            INSERT INTO {self.quote(rtree_table)}
+            SELECT rowid, ST_MinX({geom}), ST_MaxX({geom}), ST_MinY({geom}), ST_MaxY({geom})
+            FROM {self.table_identifier(dataset)}
+            WHERE {geom} NOT NULL AND NOT ST_IsEmpty({geom});
+            """
+        )
 
         L.info("Created spatial index in %.1fs", time.monotonic() - t0)
 
@@ -40,6 +40,10 @@ class WorkingCopy_MySql(DatabaseServer_WorkingCopy):
     URI_FORMAT = "//HOST[:PORT]/DBNAME"
     INVALID_PATH_MESSAGE = "URI path must have one part - the database name"
 
+    # Statements must fit within the server's max_allowed_packet, which can be as small as 4MB.
+    MULTI_ROW_INSERT_MAX_ROWS = 1000
+    MULTI_ROW_INSERT_MAX_BYTES = 1024 * 1024
+
     def __init__(self, repo, location):
         """
         uri: connection string of the form mysql://[user[:password]@][netloc][:port][/dbname][?param1=value1&...]
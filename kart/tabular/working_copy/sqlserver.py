@@ -29,6 +29,11 @@ class WorkingCopy_SqlServer(DatabaseServer_WorkingCopy):
     WORKING_COPY_TYPE_NAME = "SQL Server"
     URI_SCHEME = "mssql"
 
+    # SQL Server allows at most 1000 rows in a VALUES clause, and 2100 parameters in a statement
+    # (a few of which can be used up by the driver).
+    MULTI_ROW_INSERT_MAX_ROWS = 1000
+    MULTI_ROW_INSERT_MAX_PARAMS = 2000
+
     def __init__(self, repo, location):
         """
         uri: connection string of the form mssql://[user[:password]@][netloc][:port][/dbname/schema][?param1=value1&...]
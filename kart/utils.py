@@ -1,5 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import functools
+import heapq
 import itertools
+import pickle
+import tempfile
 
 
 def ungenerator(cast_function):
@@ -34,3 +38,65 @@ def chunk(iterable, size):
         if not chunk:
             return
         yield chunk
+
+
+def sorted_externally(iterable, *, key=None, run_size=100_000):
+    """
+    Generator. Yields the items from iterable in the same order as sorted(iterable, key=key), but without holding more
+    than <run_size> of them in memory at once: the items are sorted in runs of <run_size>, and if there is more than one
+    run, each run is written to a temporary file and then all the runs are merged. Items must be picklable.
+    """
+    it = iter(iterable)
+    runs = []
+    try:
+        while True:
+            run = sorted(itertools.islice(it, run_size), key=key)
+            if not runs and len(run) < run_size:
+                # Everything fits in a single run - no need for any temporary files.
+                yield from run
+                return
+            if not run:
+                break
+            run_file = tempfile.TemporaryFile()
+            for batch in chunk(run, 1000):
+                pickle.dump(batch, run_file, pickle.HIGHEST_PROTOCOL)
+            run_file.seek(0)
+            runs.append(run_file)
+            del run
+
+        yield from heapq.merge(*(_unpickle_run(f) for f in runs), key=key)
+    finally:
+        for run_file in runs:
+            run_file.close()
+
+
+def _unpickle_run(run_file):
+    while True:
+        try:
+            batch = pickle.load(run_file)
+        except EOFError:
+            return
+        yield from batch
+
+
+def map_in_threads(func, items, num_workers, *, ordered=True):
+    """
+    Calls func on each of the given items using up to num_workers threads, and yields (item, result) pairs.
+    If ordered is False, each pair is yielded as soon as it is ready, rather than in the same order as items.
+    Only suitable if func spends most of its time not holding the GIL - eg, running PDAL, hashing, or copying files.
+    """
+    if num_workers == 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=num_workers)
+    futures = {executor.submit(func, item): item for item in items}
+    try:
+        for future in futures if ordered else as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If we're stopping early, don't start on any more items.
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
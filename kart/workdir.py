@@ -3,14 +3,18 @@ import click
 import logging
 from enum import Enum, auto
 import functools
+import json
+import os
 from pathlib import Path
 import shutil
 import subprocess
 import sys
+import time
 
 import pygit2
 import sqlalchemy as sa
-from sqlalchemy import Column, Text
+from sqlalchemy import Column, Integer, Text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.schema import CreateTable
@@ -25,13 +29,19 @@ from kart.exceptions import (
     NO_WORKING_COPY,
     translate_subprocess_exit_code,
 )
-from kart.lfs_util import get_local_path_from_lfs_hash
+from kart.lfs_util import (
+    copy_file_from_local_lfs_cache,
+    get_hash_and_size_of_file,
+    get_local_path_from_lfs_hash,
+)
 from kart.lfs_commands import fetch_lfs_blobs_for_pointer_files
 from kart.key_filters import RepoKeyFilter
+from kart.point_cloud.metadata_util import extract_pc_tile_metadata
 from kart.point_cloud.v1 import PointCloudV1
 from kart.point_cloud.tilename_util import remove_tile_extension, get_tile_path_pattern
 from kart.sqlalchemy.sqlite import sqlite_engine
 from kart.sqlalchemy.upsert import Upsert as upsert
+from kart.utils import chunk, map_in_threads
 from kart.working_copy import WorkingCopyPart
 
 
@@ -58,6 +68,27 @@ class KartState(Base):
     value = Column("value", Text, nullable=False)
 
 
+class TileInfoCache(Base):
+    """
+    kart_tile_info_cache table for the workdir that is maintained in .kart/workdir-state.db.
+    Stores what was learned by inspecting dirty tiles - their metadata, SHA256 and size - along with their stat
+    information, so that a dirty tile only needs to be inspected again if it has been modified since last time.
+    """
+
+    __tablename__ = "kart_tile_info_cache"
+    path = Column(Text, nullable=False, primary_key=True)
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    inode = Column(Integer, nullable=False)
+    oid = Column(Text, nullable=False)
+    tile_metadata = Column("metadata", Text, nullable=False)
+
+
+# Files modified this recently aren't added to the TileInfoCache - they could be modified again without their mtime
+# changing, if the filesystem's timestamps aren't precise enough.
+RACY_MTIME_NS = 2 * 1_000_000_000
+
+
 class FileSystemWorkingCopy(WorkingCopyPart):
     """
     A working copy on the filesystem - also referred to as the "workdir" for brevity.
@@ -140,6 +171,7 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         sm = sessionmaker(bind=engine)
         with sm() as s:
             s.execute(CreateTable(KartState.__table__, if_not_exists=True))
+            s.execute(CreateTable(TileInfoCache.__table__, if_not_exists=True))
 
     def delete(self):
         """Deletes the index file and state table, and attempts to clean up any datasets in the workdir itself."""
@@ -208,6 +240,108 @@ class FileSystemWorkingCopy(WorkingCopyPart):
             )
         return r.rowcount
 
+    def get_tile_infos(self, paths):
+        """
+        Given a list of paths to tiles in the workdir, returns a dict {path: (tile_metadata, oid, size)} - the tile's
+        metadata as returned by extract_pc_tile_metadata, and its SHA256 hash and size.
+        This is only needed for dirty tiles, since the workdir-index already keeps track of which tiles are unchanged.
+        Tiles are inspected several at a time, and the results are stored in the kart_tile_info_cache table, so that
+        tiles aren't inspected again until they are modified again - eg, `kart commit` reuses the results of the
+        `kart diff` that preceded it.
+        """
+        from kart.repo import KartConfigKeys
+
+        if not paths:
+            return {}
+
+        info_cache = TileInfoCache.__table__
+        rel_paths = {p: Path(p).relative_to(self.path).as_posix() for p in paths}
+        stat_keys = {p: _stat_key(p) for p in paths}
+        result = {}
+
+        with self.state_session() as sess:
+            # The table won't exist yet if the working copy was created by an older version of Kart.
+            if self._create_tile_info_cache(sess):
+                for batch in chunk(paths, 500):
+                    rows = sess.execute(
+                        sa.select([info_cache]).where(
+                            info_cache.c.path.in_([rel_paths[p] for p in batch])
+                        )
+                    )
+                    rows_by_path = {row.path: row for row in rows}
+                    for p in batch:
+                        row = rows_by_path.get(rel_paths[p])
+                        if row and (row.size, row.mtime_ns, row.inode) == stat_keys[p]:
+                            result[p] = json.loads(row.metadata), row.oid, row.size
+
+        # Inspect the tiles outside of any transaction, so as not to hold workdir-state.db open while doing so.
+        paths_to_inspect = [p for p in paths if p not in result]
+        num_workers = self.repo.get_config_int(
+            KartConfigKeys.KART_DIFF_JOBS, os.cpu_count() or 1
+        )
+        now_ns = time.time_ns()
+        new_rows = []
+        for p, tile_info in map_in_threads(
+            _inspect_tile, paths_to_inspect, num_workers
+        ):
+            result[p] = tile_info
+            tile_metadata, oid, size = tile_info
+            _, mtime_ns, inode = stat_keys[p]
+            # Don't cache the result if the tile was modified while it was being inspected, or could be modified
+            # again without its mtime changing.
+            if _stat_key(p) != stat_keys[p] or now_ns - mtime_ns < RACY_MTIME_NS:
+                continue
+            new_rows.append(
+                {
+                    "path": rel_paths[p],
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "inode": inode,
+                    "oid": oid,
+                    "metadata": json.dumps(tile_metadata),
+                }
+            )
+
+        if new_rows:
+            with self.state_session() as sess:
+                try:
+                    if self._create_tile_info_cache(sess):
+                        sess.execute(upsert(info_cache), new_rows)
+                except OperationalError as e:
+                    # This can happen if the table already existed, since creating it wouldn't have written anything.
+                    if "readonly database" in str(e):
+                        L.info("Can't cache tile info; workdir-state.db is read-only")
+                        sess.rollback()
+                    else:
+                        raise
+
+        return result
+
+    def _create_tile_info_cache(self, sess):
+        """
+        Creates the kart_tile_info_cache table if it doesn't already exist.
+        Returns False if it doesn't exist and can't be created, since workdir-state.db is read-only.
+        """
+        try:
+            sess.execute(CreateTable(TileInfoCache.__table__, if_not_exists=True))
+            return True
+        except OperationalError as e:
+            # ignore errors from readonly databases - the tile info cache is only an optimisation.
+            if "readonly database" in str(e):
+                L.info("Can't create tile info cache; workdir-state.db is read-only")
+                sess.rollback()
+                return False
+            raise
+
+    def _clear_tile_info_cache(self, file_paths):
+        """Removes the given paths from the kart_tile_info_cache table, since they are no longer dirty."""
+        info_cache = TileInfoCache.__table__
+        with self.state_session() as sess:
+            if not self._create_tile_info_cache(sess):
+                return
+            for batch in chunk(file_paths, 500):
+                sess.execute(info_cache.delete().where(info_cache.c.path.in_(batch)))
+
     def is_dirty(self):
         """
         Returns True if there are uncommitted changes in the working copy,
@@ -437,7 +571,9 @@ class FileSystemWorkingCopy(WorkingCopyPart):
                         f"Couldn't find tile {tilename} locally - skipping...", err=True
                     )
                     continue
-                shutil.copy(lfs_path, wc_tiles_dir / tilename)
+                copy_file_from_local_lfs_cache(
+                    self.repo, lfs_path, wc_tiles_dir / tilename
+                )
 
         if not track_changes_as_dirty:
             self._reset_workdir_index_for_datasets(datasets)
@@ -539,7 +675,9 @@ class FileSystemWorkingCopy(WorkingCopyPart):
                         f"Couldn't find tile {tilename} locally - skipping...", err=True
                     )
                     continue
-                shutil.copy(lfs_path, ds_tiles_dir / tilename)
+                copy_file_from_local_lfs_cache(
+                    self.repo, lfs_path, ds_tiles_dir / tilename
+                )
                 if not do_update_all:
                     reset_index_files.append(f"{ds_path}/{tilename}")
 
@@ -632,6 +770,8 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         except subprocess.CalledProcessError as e:
             sys.exit(translate_subprocess_exit_code(e.returncode))
 
+        self._clear_tile_info_cache(file_paths)
+
     def _hard_reset_after_commit_for_converted_tiles(self, datasets, committed_diff):
         """
         Look for tiles that were automatically modified as part of the commit operation
@@ -673,7 +813,7 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         if not lfs_path.is_file():
             click.echo(f"Couldn't find tile {tilename} locally - skipping...", err=True)
         else:
-            shutil.copy(lfs_path, ds_tiles_dir / tilename)
+            copy_file_from_local_lfs_cache(self.repo, lfs_path, ds_tiles_dir / tilename)
 
     def soft_reset_after_commit(
         self,
@@ -723,26 +863,20 @@ class FileSystemWorkingCopy(WorkingCopyPart):
 
         return [p.replace("\\", "/") for p in output_lines]
 
-    def dirty_paths_by_dataset_path(self, dirty_paths=None):
+    def dataset_path_index(self):
+        """Returns a DatasetPathIndex of the paths of all the datasets at this working copy's tree."""
+        return DatasetPathIndex(self.repo.datasets(self.get_tree_id()).paths())
+
+    def dirty_paths_by_dataset_path(self, dirty_paths=None, dataset_path_index=None):
         """Returns all the deltas from self.raw_diff_from_index() but grouped by dataset path."""
         if dirty_paths is None:
             dirty_paths = self.dirty_paths()
-
-        all_ds_paths = list(self.repo.datasets(self.get_tree_id()).paths())
-
-        def find_ds_path(file_path):
-            for ds_path in all_ds_paths:
-                if (
-                    len(file_path) > len(ds_path)
-                    and file_path.startswith(ds_path)
-                    and file_path[len(ds_path)] == "/"
-                ):
-                    return ds_path
-            return None
+        if dataset_path_index is None:
+            dataset_path_index = self.dataset_path_index()
 
         dirty_paths_by_dataset_path = {}
         for p in dirty_paths:
-            ds_path = find_ds_path(p)
+            ds_path = dataset_path_index.find_dataset_path(p)
             dirty_paths_by_dataset_path.setdefault(ds_path, []).append(p)
 
         return dirty_paths_by_dataset_path
@@ -756,6 +890,42 @@ class FileSystemWorkingCopy(WorkingCopyPart):
         return WorkdirDiffCache(self)
 
 
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _inspect_tile(path):
+    tile_metadata = extract_pc_tile_metadata(path)
+    oid, size = get_hash_and_size_of_file(path)
+    return tile_metadata, oid, size
+
+
+class DatasetPathIndex:
+    """
+    Finds which dataset a file in the workdir belongs to. Rather than comparing each file path with every dataset path,
+    each of the file's parent directories is looked up in a set of dataset paths - so finding the dataset for a file
+    takes time proportional to the depth of the file, not to the number of datasets.
+    """
+
+    def __init__(self, ds_paths):
+        self.ds_paths = set(ds_paths)
+        # No need to look at parent directories that are deeper than the deepest dataset.
+        self.max_depth = max((p.count("/") + 1 for p in self.ds_paths), default=0)
+
+    def find_dataset_path(self, file_path):
+        """Returns the path of the dataset that contains the given file, or None if it is not inside any dataset."""
+        sep_index = file_path.find("/")
+        depth = 1
+        while sep_index > 0 and depth <= self.max_depth:
+            parent_path = file_path[:sep_index]
+            if parent_path in self.ds_paths:
+                return parent_path
+            sep_index = file_path.find("/", sep_index + 1)
+            depth += 1
+        return None
+
+
 class WorkdirDiffCache:
     """
     When we do use the index to diff the workdir, we get a diff for the entire workdir.
@@ -775,11 +945,17 @@ class WorkdirDiffCache:
     def dirty_paths(self):
         return self.delegate.dirty_paths()
 
+    @functools.lru_cache(maxsize=1)
+    def dataset_path_index(self):
+        return self.delegate.dataset_path_index()
+
     @functools.lru_cache(maxsize=1)
     def dirty_paths_by_dataset_path(self):
-        # Make sure self.dirty_paths gets cached too:
+        # Make sure self.dirty_paths and self.dataset_path_index get cached too:
         dirty_paths = self.dirty_paths()
-        return self.delegate.dirty_paths_by_dataset_path(dirty_paths)
+        return self.delegate.dirty_paths_by_dataset_path(
+            dirty_paths, self.dataset_path_index()
+        )
 
     def dirty_paths_for_dataset(self, dataset):
         if isinstance(dataset, str):
@@ -787,3 +963,6 @@ class WorkdirDiffCache:
         else:
             path = dataset.path
         return self.dirty_paths_by_dataset_path().get(path, ())
+
+    def get_tile_infos(self, paths):
+        return self.delegate.get_tile_infos(paths)
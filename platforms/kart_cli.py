@@ -1,4 +1,8 @@
+import multiprocessing
+
 import kart.cli
 
 if __name__ == "__main__":
+    # Required for worker processes to start in frozen (PyInstaller) builds.
+    multiprocessing.freeze_support()
     kart.cli.entrypoint()
@@ -32,7 +32,9 @@ class MemoryTree:
     def __truediv__(self, path):
         path = path.strip("/")
         if path in self.all_blobs:
-            return MemoryBlob(self.all_blobs[path])
+            blob = MemoryBlob(self.all_blobs[path])
+            blob.name = path.rsplit("/", 1)[-1]
+            return blob
 
         dir_path = path + "/"
         dir_path_len = len(dir_path)
@@ -47,7 +49,7 @@ class MemoryTree:
 
 
 class MemoryBlob(bytes):
-    """Test-only implementation of pygit2.Blob. Supports self.data and memoryview(self)."""
+    """Test-only implementation of pygit2.Blob. Supports self.name, self.data and memoryview(self)."""
 
     @property
     def data(self):
@@ -1,4 +1,10 @@
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
 import subprocess
+import threading
+
 import pytest
 
 
@@ -28,3 +34,71 @@ def requires_git_lfs():
     pytest.helpers.feature_assert_or_skip(
         "Git LFS installed", "KART_EXPECT_GIT_LFS", has_git_lfs, ci_require=False
     )
+
+
+class _LfsServerHandler(BaseHTTPRequestHandler):
+    """Implements just enough of the LFS batch API for downloading objects."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        base_url = f"http://{self.headers['Host']}"
+        objects = []
+        for obj in request["objects"]:
+            oid = obj["oid"]
+            if oid in self.server.lfs_objects:
+                href = f"{base_url}/objects/{oid}"
+                objects.append({**obj, "actions": {"download": {"href": href}}})
+            else:
+                objects.append({**obj, "error": {"code": 404, "message": "Not found"}})
+        self._send(200, json.dumps({"objects": objects}).encode())
+
+    def do_GET(self):
+        oid = self.path.rsplit("/", maxsplit=1)[-1]
+        if self.server.dropped_connections.get(oid):
+            # Close the connection without responding.
+            self.server.dropped_connections[oid] -= 1
+            self.close_connection = True
+            return
+        self.server.requested_oids.append(oid)
+        self._send(200, self.server.lfs_objects[oid])
+
+    def _send(self, status, data):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture()
+def lfs_server(monkeypatch):
+    """
+    A local stand-in for an LFS server. Usage:
+    >>> with lfs_server({oid: data, ...}) as server:
+    ...     # Point a remote at server.url
+    Set server.dropped_connections[oid] to the number of times a request for that object should be dropped.
+    """
+    for key in list(os.environ):
+        if key.lower().endswith("_proxy"):
+            monkeypatch.delenv(key)
+
+    @contextlib.contextmanager
+    def _lfs_server(lfs_objects):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _LfsServerHandler)
+        server.lfs_objects = lfs_objects
+        server.requested_oids = []
+        server.dropped_connections = {}
+        server.url = f"http://127.0.0.1:{server.server_address[1]}"
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return _lfs_server
@@ -9,7 +9,8 @@ from kart.exceptions import (
     UNCOMMITTED_CHANGES,
     NO_CHANGES,
 )
-from kart.repo import KartRepo
+from kart.lfs_util import get_local_path_from_lfs_hash
+from kart.repo import KartConfigKeys, KartRepo
 from .fixtures import requires_pdal, requires_git_lfs  # noqa
 
 DUMMY_REPO = "git@example.com/example.git"
@@ -119,8 +120,15 @@ def test_import_single_las(
 
 
 @pytest.mark.slow
+@pytest.mark.parametrize("num_workers", [1, 4])
 def test_import_several_laz(
-    tmp_path, chdir, cli_runner, data_archive_readonly, requires_pdal, requires_git_lfs
+    num_workers,
+    tmp_path,
+    chdir,
+    cli_runner,
+    data_archive_readonly,
+    requires_pdal,
+    requires_git_lfs,
 ):
     # Using postgres here because it has the best type preservation
     with data_archive_readonly("point-cloud/laz-auckland.tgz") as auckland:
@@ -135,6 +143,7 @@ def test_import_several_laz(
                     "point-cloud-import",
                     *glob(f"{auckland}/auckland_*.laz"),
                     "--dataset-path=auckland",
+                    f"--jobs={num_workers}",
                 ]
             )
             assert r.exit_code == 0, r.stderr
@@ -241,6 +250,36 @@ def test_import_single_laz_no_convert(
             ]
 
 
+def test_import_with_lfs_hardlinks(
+    tmp_path, chdir, cli_runner, data_archive_readonly, requires_pdal, requires_git_lfs
+):
+    # Even with kart.lfs.hardlinks set, import sources aren't hard-linked into the LFS cache - they could be modified
+    # in place later, which would corrupt the LFS cache.
+    with data_archive_readonly("point-cloud/laz-auckland.tgz") as auckland:
+        repo_path = tmp_path / "point-cloud-repo"
+        r = cli_runner.invoke(["init", repo_path])
+        assert r.exit_code == 0
+
+        repo = KartRepo(repo_path)
+        repo.config[KartConfigKeys.KART_LFS_HARDLINKS] = True
+        with chdir(repo_path):
+            r = cli_runner.invoke(
+                [
+                    "point-cloud-import",
+                    f"{auckland}/auckland_0_0.laz",
+                    "--dataset-path=auckland",
+                    "--preserve-format",
+                ]
+            )
+            assert r.exit_code == 0, r.stderr
+
+        lfs_path = get_local_path_from_lfs_hash(
+            repo, "6b980ce4d7f4978afd3b01e39670e2071a792fba441aca45be69be81cb48b08c"
+        )
+        assert lfs_path.is_file()
+        assert not lfs_path.samefile(auckland / "auckland_0_0.laz")
+
+
 def test_import_replace_existing(
     cli_runner,
     data_archive,
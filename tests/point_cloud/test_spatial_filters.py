@@ -1,8 +1,9 @@
 import shutil
 
-from .fixtures import requires_pdal  # noqa
+from .fixtures import lfs_server, requires_pdal  # noqa
 
 from kart.geometry import ring_as_wkt
+from kart.lfs_util import get_hash_and_size_of_file
 from kart.repo import KartRepo
 
 CRS = "EPSG:4326"
@@ -156,6 +157,36 @@ def test_reclone_pc_with_larger_spatial_filter(
         )
 
 
+def test_lfs_fetch_with_spatial_filter(
+    data_archive, cli_runner, monkeypatch, lfs_server
+):
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        lfs_objects_path = repo_path / ".kart" / "lfs" / "objects"
+        lfs_objects = {p.name: p.read_bytes() for p in lfs_objects_path.glob("*/*/*")}
+        south_east_oids = set()
+        for name in SOUTH_EAST_TILES:
+            oid, size = get_hash_and_size_of_file(repo_path / "auckland" / name)
+            south_east_oids.add(oid.split(":")[-1])
+        # Delete everything in the local LFS cache.
+        shutil.rmtree(repo_path / ".kart" / "lfs")
+
+        repo.config["kart.spatialfilter.geometry"] = SOUTH_EAST_TRIANGLE
+        repo.config["kart.spatialfilter.crs"] = CRS
+
+        with lfs_server(lfs_objects) as server:
+            repo.remotes.set_url("origin", f"{server.url}/auckland")
+
+            # Only the tiles that match the spatial filter are fetched.
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == 0, r.stderr
+            assert set(server.requested_oids) == south_east_oids
+            assert len(server.requested_oids) == len(SOUTH_EAST_TILES)
+            assert _count_files_in_lfs_cache(repo) == len(SOUTH_EAST_TILES)
+
+
 def test_spatial_filtered_diff(
     data_archive, cli_runner, tmp_path, monkeypatch, requires_pdal
 ):
@@ -1,14 +1,30 @@
+import os
+import platform
 import re
 import shutil
+import sqlite3
+import ssl
+import stat
 import subprocess
+import time
 
 import pygit2
+import pytest
 
 from kart.cli_util import tool_environment
-from kart.exceptions import WORKING_COPY_OR_IMPORT_CONFLICT
-from kart.repo import KartRepo
+from kart.exceptions import (
+    CONNECTION_ERROR,
+    NOT_FOUND,
+    WORKING_COPY_OR_IMPORT_CONFLICT,
+)
+from kart.lfs_commands.batch_download import get_lfs_http_endpoint, get_ssl_context
+from kart.lfs_util import get_hash_and_size_of_file, get_local_path_from_lfs_hash
+from kart.repo import KartConfigKeys, KartRepo
+from kart.point_cloud.las_header import read_las_header_info
 from kart.point_cloud.metadata_util import extract_pc_tile_metadata
-from .fixtures import requires_pdal  # noqa
+from kart import workdir
+from kart.workdir import DatasetPathIndex
+from .fixtures import lfs_server, requires_pdal  # noqa
 
 
 def test_working_copy_edit(cli_runner, data_archive, monkeypatch, requires_pdal):
@@ -176,6 +192,153 @@ def test_working_copy_restore_reset(
         assert file_count(tiles_path) == 12
 
 
+def test_working_copy_lfs_hardlinks(cli_runner, data_archive, monkeypatch):
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        repo.config[KartConfigKeys.KART_LFS_HARDLINKS] = True
+
+        tiles_path = repo_path / "auckland"
+        for tile in tiles_path.glob("auckland_0_*.copc.laz"):
+            tile.unlink()
+
+        r = cli_runner.invoke(["reset", "--discard-changes"])
+        assert r.exit_code == 0, r.stderr
+
+        r = cli_runner.invoke(["status"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout.splitlines()[-1] == "Nothing to commit, working copy clean"
+
+        for tile in tiles_path.glob("auckland_*.copc.laz"):
+            oid, size = get_hash_and_size_of_file(tile)
+            lfs_path = get_local_path_from_lfs_hash(repo, oid)
+            # The restored tiles are hard-linked to the LFS cache, the others are untouched.
+            assert tile.samefile(lfs_path) == tile.name.startswith("auckland_0_")
+
+
+def test_working_copy_tile_info_cache(
+    cli_runner, data_archive, monkeypatch, requires_pdal
+):
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+
+    inspected_tiles = []
+    orig_inspect_tile = workdir._inspect_tile
+
+    def _inspect_tile(path):
+        inspected_tiles.append(path.name)
+        return orig_inspect_tile(path)
+
+    monkeypatch.setattr(workdir, "_inspect_tile", _inspect_tile)
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        repo.config[KartConfigKeys.KART_DIFF_JOBS] = 4
+        tiles_path = repo_path / "auckland"
+        # Tiles that were modified very recently aren't cached, since they could be modified again unnoticed.
+        an_hour_ago = time.time() - 3600
+        for src, dest in (("0_0", "1_1"), ("0_1", "1_2")):
+            dest_path = tiles_path / f"auckland_{dest}.copc.laz"
+            shutil.copy(tiles_path / f"auckland_{src}.copc.laz", dest_path)
+            os.utime(dest_path, (an_hour_ago, an_hour_ago))
+
+        def get_cached_paths():
+            with sqlite3.connect(repo.gitdir_file("workdir-state.db")) as db:
+                return sorted(
+                    row[0]
+                    for row in db.execute("SELECT path FROM kart_tile_info_cache;")
+                )
+
+        r = cli_runner.invoke(["diff", "-o", "json"])
+        assert r.exit_code == 0, r.stderr
+        first_diff = r.stdout
+        assert sorted(inspected_tiles) == [
+            "auckland_1_1.copc.laz",
+            "auckland_1_2.copc.laz",
+        ]
+        assert get_cached_paths() == [
+            "auckland/auckland_1_1.copc.laz",
+            "auckland/auckland_1_2.copc.laz",
+        ]
+
+        # The modified tiles aren't inspected again, since they haven't changed since last time.
+        inspected_tiles.clear()
+        r = cli_runner.invoke(["diff", "-o", "json"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout == first_diff
+        assert inspected_tiles == []
+
+        # But they are if they do change.
+        modified_tile = tiles_path / "auckland_1_1.copc.laz"
+        shutil.copy(tiles_path / "auckland_0_2.copc.laz", modified_tile)
+        os.utime(modified_tile, (an_hour_ago, an_hour_ago + 1))
+        r = cli_runner.invoke(["diff", "-o", "json"])
+        assert r.exit_code == 0, r.stderr
+        assert r.stdout != first_diff
+        assert inspected_tiles == ["auckland_1_1.copc.laz"]
+
+        # Committing reuses what the diff found, and then the tiles are no longer dirty.
+        inspected_tiles.clear()
+        r = cli_runner.invoke(["commit", "-m", "edit tiles"])
+        assert r.exit_code == 0, r.stderr
+        assert inspected_tiles == []
+        assert get_cached_paths() == []
+
+
+def test_working_copy_tile_info_cache_readonly(
+    cli_runner, data_archive, monkeypatch, requires_pdal
+):
+    if platform.system() == "Windows":
+        pytest.skip("does not run on windows")
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        state_path = repo.gitdir_file("workdir-state.db")
+        tiles_path = repo_path / "auckland"
+        an_hour_ago = time.time() - 3600
+        dest_path = tiles_path / "auckland_1_1.copc.laz"
+        shutil.copy(tiles_path / "auckland_0_0.copc.laz", dest_path)
+        os.utime(dest_path, (an_hour_ago, an_hour_ago))
+
+        def get_cached_rows():
+            with sqlite3.connect(state_path) as db:
+                try:
+                    return list(
+                        db.execute("SELECT path, mtime_ns FROM kart_tile_info_cache;")
+                    )
+                except sqlite3.OperationalError:
+                    return None
+
+        r = cli_runner.invoke(["diff", "-o", "json"])
+        assert r.exit_code == 0, r.stderr
+        first_diff = r.stdout
+        assert len(get_cached_rows()) == 1
+
+        # A read-only workdir-state.db is used as is, whether or not the cache table already exists.
+        for drop_table in (False, True):
+            shutil.copy(tiles_path / "auckland_0_1.copc.laz", dest_path)
+            os.utime(dest_path, (an_hour_ago, an_hour_ago + int(drop_table) + 1))
+            if drop_table:
+                with sqlite3.connect(state_path) as db:
+                    db.execute("DROP TABLE kart_tile_info_cache;")
+            cached_rows = get_cached_rows()
+
+            mode = state_path.stat().st_mode
+            state_path.chmod(mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+            try:
+                r = cli_runner.invoke(["diff", "-o", "json"])
+                assert r.exit_code == 0, r.stderr
+                assert r.stdout != first_diff
+                r = cli_runner.invoke(["status"])
+                assert r.exit_code == 0, r.stderr
+            finally:
+                state_path.chmod(mode)
+
+            # Nothing new was cached.
+            assert get_cached_rows() == cached_rows
+
+
 def test_working_copy_meta_edit(
     cli_runner, data_archive, data_archive_readonly, monkeypatch, requires_pdal
 ):
@@ -946,6 +1109,24 @@ def test_working_copy_commit_and_convert_to_copc(
             assert converted_tile_metadata["tile"]["pointCount"] == 4231
 
 
+def test_extract_metadata_from_header(data_archive, monkeypatch, requires_pdal):
+    # COPC tiles are read directly from the tile's header, without using PDAL -
+    # the result should be the same as if PDAL had been used.
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        tile_paths = sorted((repo_path / "auckland").glob("*.copc.laz"))
+        assert len(tile_paths) == 16
+        assert all(read_las_header_info(p) is not None for p in tile_paths)
+
+        native_metadata = [extract_pc_tile_metadata(p) for p in tile_paths]
+
+        monkeypatch.setattr(
+            "kart.point_cloud.metadata_util.read_las_header_info", lambda p: None
+        )
+        pdal_metadata = [extract_pc_tile_metadata(p) for p in tile_paths]
+
+        assert native_metadata == pdal_metadata
+
+
 def test_working_copy_mtime_updated(
     cli_runner, data_archive, monkeypatch, requires_pdal
 ):
@@ -1004,6 +1185,20 @@ def test_working_copy_mtime_updated(
             assert pygit2.hashfile(laz_file) not in repo.odb
 
 
+def test_dataset_path_index():
+    index = DatasetPathIndex(["auckland", "nz/north/auckland", "nz/south"])
+    assert index.find_dataset_path("auckland/auckland_0_0.copc.laz") == "auckland"
+    assert (
+        index.find_dataset_path("nz/north/auckland/auckland_0_0.copc.laz")
+        == "nz/north/auckland"
+    )
+    assert index.find_dataset_path("nz/south/a/b/c.laz") == "nz/south"
+    assert index.find_dataset_path("nz/north/other.laz") is None
+    assert index.find_dataset_path("auckland") is None
+    assert index.find_dataset_path("auckland2/tile.laz") is None
+    assert index.find_dataset_path("README.md") is None
+
+
 def test_lfs_fetch(cli_runner, data_archive, monkeypatch):
     monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
     with data_archive("point-cloud/auckland.tgz") as repo_path:
@@ -1032,3 +1227,107 @@ def test_lfs_fetch(cli_runner, data_archive, monkeypatch):
             "d380a98414ab209f36c7fba4734b02f67de519756e341837217716c5b4768339 (f866ac0ecf4326931d10aaa16140e2240eeada90)",
             "ec80af6cae31be5318f9380cd953b25469bd8ecda25086deca2b831bbb89168a (c76e89f23f512214063d31e7a9c85657f0cf8fb6)",
         ]
+
+
+def test_lfs_fetch_from_http_server(cli_runner, data_archive, monkeypatch, lfs_server):
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        lfs_objects_path = repo_path / ".kart" / "lfs" / "objects"
+        lfs_objects = {p.name: p.read_bytes() for p in lfs_objects_path.glob("*/*/*")}
+        assert len(lfs_objects) == 16
+        # Delete everything in the local LFS cache.
+        shutil.rmtree(repo_path / ".kart" / "lfs")
+
+        with lfs_server(lfs_objects) as server:
+            repo = KartRepo(repo_path)
+            repo.remotes.set_url("origin", f"{server.url}/auckland")
+
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == 0, r.stderr
+            assert "Fetching LFS tiles: 16/16" in r.stdout
+            assert sorted(server.requested_oids) == sorted(lfs_objects)
+
+            for oid, data in lfs_objects.items():
+                assert get_local_path_from_lfs_hash(repo, oid).read_bytes() == data
+
+            # Nothing left to fetch:
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == 0, r.stderr
+            assert len(server.requested_oids) == 16
+
+            # Downloads that don't match their hash are not stored.
+            shutil.rmtree(repo_path / ".kart" / "lfs")
+            corrupt_oid = sorted(lfs_objects)[0]
+            lfs_objects[corrupt_oid] = b"corrupt"
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == CONNECTION_ERROR
+            assert f"Error fetching LFS object {corrupt_oid}" in r.stderr
+            assert not get_local_path_from_lfs_hash(repo, corrupt_oid).exists()
+
+            # Objects that the server doesn't have don't stop the others from being fetched.
+            shutil.rmtree(repo_path / ".kart" / "lfs")
+            missing_oid = corrupt_oid
+            del lfs_objects[missing_oid]
+            server.requested_oids.clear()
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == NOT_FOUND
+            assert f"Error fetching LFS object {missing_oid}: Not found" in r.stderr
+            assert sorted(server.requested_oids) == sorted(lfs_objects)
+            for oid, data in lfs_objects.items():
+                assert get_local_path_from_lfs_hash(repo, oid).read_bytes() == data
+
+
+def test_lfs_fetch_with_dropped_connection(
+    cli_runner, data_archive, monkeypatch, lfs_server
+):
+    monkeypatch.setenv("X_KART_POINT_CLOUDS", "1")
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        lfs_objects_path = repo_path / ".kart" / "lfs" / "objects"
+        lfs_objects = {p.name: p.read_bytes() for p in lfs_objects_path.glob("*/*/*")}
+        shutil.rmtree(repo_path / ".kart" / "lfs")
+        dropped_oid = sorted(lfs_objects)[0]
+
+        with lfs_server(lfs_objects) as server:
+            repo = KartRepo(repo_path)
+            repo.remotes.set_url("origin", f"{server.url}/auckland")
+
+            # A request whose connection is dropped is retried once.
+            server.dropped_connections[dropped_oid] = 1
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == 0, r.stderr
+            assert sorted(server.requested_oids) == sorted(lfs_objects)
+
+            # If that fails too, the error names the URL.
+            shutil.rmtree(repo_path / ".kart" / "lfs")
+            server.dropped_connections[dropped_oid] = 2
+            r = cli_runner.invoke(["lfs+", "fetch", "HEAD"])
+            assert r.exit_code == CONNECTION_ERROR
+            assert (
+                f"Error connecting to {server.url}/objects/{dropped_oid}: "
+                "Remote end closed connection without response"
+            ) in r.stderr
+            assert not get_local_path_from_lfs_hash(repo, dropped_oid).exists()
+
+
+def test_lfs_http_config(data_archive, monkeypatch):
+    for key in list(os.environ):
+        if key.lower().endswith("_proxy") or key.startswith("GIT_SSL_"):
+            monkeypatch.delenv(key)
+
+    with data_archive("point-cloud/auckland.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        repo.remotes.set_url("origin", "https://example.com/auckland")
+        endpoint = "https://example.com/auckland.git/info/lfs"
+        assert get_lfs_http_endpoint(repo, "origin") == endpoint
+
+        assert get_ssl_context(repo).verify_mode == ssl.CERT_REQUIRED
+        repo.config["http.sslVerify"] = False
+        assert get_ssl_context(repo).verify_mode == ssl.CERT_NONE
+
+        # Git-LFS is used if there is any HTTP config that we don't support.
+        repo.config["http.extraHeader"] = "Authorization: Bearer abc"
+        assert get_lfs_http_endpoint(repo, "origin") is None
+        del repo.config["http.extraHeader"]
+        assert get_lfs_http_endpoint(repo, "origin") == endpoint
+        repo.config["http.https://example.com.sslVerify"] = False
+        assert get_lfs_http_endpoint(repo, "origin") is None
@@ -7,6 +7,10 @@ from pathlib import Path
 
 import pytest
 
+from kart.diff_structs import DatasetDiff, Delta, DeltaDiff, RepoDiff
+from kart.repo import KartRepo
+from kart.tabular.v3 import TableV3
+
 
 H = pytest.helpers.helpers()
 
@@ -151,3 +155,61 @@ def test_diff_feature_count_with_readonly_repo_dir(data_archive, cli_runner, cap
                 in messages
             )
             assert "Can't store annotation; annotations.db is read-only" in messages
+
+
+def test_feature_count_is_cached(data_working_copy, cli_runner, edit_points):
+    with data_working_copy("points") as (repo_dir, wc_path):
+        repo = KartRepo(repo_dir)
+        dataset = repo.datasets()[H.POINTS.LAYER]
+        assert dataset.feature_count == H.POINTS.ROWCOUNT
+        assert dataset.cached_feature_count() == H.POINTS.ROWCOUNT
+
+        with repo.working_copy.tabular.session() as sess:
+            edit_points(sess)
+        r = cli_runner.invoke(["commit", "-m", "test-commit"])
+        assert r.exit_code == 0, r.stderr
+
+        # The new count was cached when the commit was created, without recounting.
+        dataset = KartRepo(repo_dir).datasets()[H.POINTS.LAYER]
+        assert dataset.cached_feature_count() == H.POINTS.ROWCOUNT - 4
+        assert dataset.feature_count == sum(1 for blob in dataset.feature_blobs())
+
+
+def test_feature_count_is_cached_for_rename_onto_deleted_feature(data_archive):
+    with data_archive("points") as repo_dir:
+        repo = KartRepo(repo_dir)
+        dataset = repo.datasets()[H.POINTS.LAYER]
+        assert dataset.feature_count == H.POINTS.ROWCOUNT
+
+        # Delete feature 5, and rename feature 6 to 5.
+        old_5 = dataset.get_feature([5])
+        old_6 = dataset.get_feature([6])
+        feature_diff = DeltaDiff(
+            [
+                Delta((6, old_6), (5, {**old_6, "fid": 5})),
+                Delta((5, old_5), None),
+            ]
+        )
+        repo_diff = RepoDiff({H.POINTS.LAYER: DatasetDiff({"feature": feature_diff})})
+        tree = repo.structure().create_tree_from_diff(repo_diff)
+
+        dataset = repo.datasets(tree)[H.POINTS.LAYER]
+        assert dataset.get_feature([5]) == {**old_6, "fid": 5}
+        assert dataset.cached_feature_count() == H.POINTS.ROWCOUNT - 1
+        assert dataset.feature_count == sum(1 for blob in dataset.feature_blobs())
+
+
+def test_feature_count_reuses_cached_subtree_counts(data_archive, caplog, monkeypatch):
+    monkeypatch.setattr(TableV3, "FEATURE_COUNT_CACHE_MIN_COUNT", 1)
+    with data_archive("points") as repo_dir:
+        repo = KartRepo(repo_dir)
+        assert repo.datasets("HEAD^")[H.POINTS.LAYER].feature_count == 2143
+
+        caplog.set_level(logging.DEBUG)
+        dataset = repo.datasets("HEAD")[H.POINTS.LAYER]
+        assert dataset.cached_feature_count() is None
+        caplog.clear()
+        assert dataset.feature_count == H.POINTS.ROWCOUNT
+        # Only the subtrees changed by HEAD needed to be recounted.
+        messages = [r.message for r in caplog.records]
+        assert any(m.startswith("retrieved: feature-count") for m in messages)
@@ -6,6 +6,7 @@ from pathlib import Path
 import pytest
 from kart.exceptions import NO_TABLE, PATCH_DOES_NOT_APPLY
 from kart.repo import KartRepo
+from kart.tabular.rich_table_dataset import RichTableDataset
 
 
 H = pytest.helpers.helpers()
@@ -81,6 +82,32 @@ def test_apply_twice(data_archive, cli_runner):
         assert "Patch does not apply" in r.stderr
 
 
+def test_apply_using_worker_processes(data_archive, cli_runner, monkeypatch):
+    monkeypatch.setattr(RichTableDataset, "PARALLEL_APPLY_MIN_FEATURES", 1)
+    patch_path = patches / "points-1U-1D-1I.kartpatch"
+    with data_archive("points") as repo_dir:
+        KartRepo(repo_dir).config["kart.apply.jobs"] = 2
+
+        r = cli_runner.invoke(["apply", str(patch_path)])
+        assert r.exit_code == 0, r.stderr
+
+        r = cli_runner.invoke(["create-patch", "HEAD"])
+        assert r.exit_code == 0, r.stderr
+        patch = json.loads(r.stdout)
+        original_patch = json.load(patch_path.open("r", encoding="utf-8"))
+        assert patch["kart.diff/v1+hexwkb"] == original_patch["kart.diff/v1+hexwkb"]
+
+        # Conflicts are reported in the same order as the deltas in the patch.
+        r = cli_runner.invoke(["apply", str(patch_path)])
+        assert r.exit_code == PATCH_DOES_NOT_APPLY
+        assert r.stderr.splitlines()[:3] == [
+            "nz_pa_points_topo_150k: Trying to create feature that already exists: 9999",
+            "nz_pa_points_topo_150k: Trying to delete nonexistent feature: 1241",
+            "nz_pa_points_topo_150k: Trying to update already-changed feature: 1795",
+        ]
+        assert "Patch does not apply" in r.stderr
+
+
 def test_apply_with_no_working_copy(data_archive, cli_runner):
     patch_filename = "updates-only.kartpatch"
     message = "Change the Coromandel"
@@ -7,7 +7,7 @@ import html5lib
 import pytest
 
 import kart
-from kart.diff_structs import Delta, DeltaDiff
+from kart.diff_structs import Delta, DeltaDiff, StreamingDeltaDiff
 from kart.json_diff_writers import JsonLinesDiffWriter
 from kart.geometry import hex_wkb_to_ogr
 from kart.repo import KartRepo
@@ -1850,6 +1850,84 @@ def test_diff_streaming(data_archive_readonly):
             assert new.get_feature_calls == expected_calls
 
 
+@pytest.mark.parametrize("reverse", [False, True])
+def test_diff_streaming_sorted(reverse, data_archive_readonly, monkeypatch):
+    # A streaming diff should yield the same deltas in the same order as a regular diff,
+    # even when it has to be sorted in several runs.
+    monkeypatch.setattr(StreamingDeltaDiff, "SORT_RUN_SIZE", 2)
+    with data_archive_readonly("points") as repo_path:
+        repo = KartRepo(repo_path)
+        old = repo.datasets("HEAD^")[H.POINTS.LAYER]
+        new = repo.datasets("HEAD")[H.POINTS.LAYER]
+
+        feature_diff = old.diff(new, reverse=reverse)["feature"]
+        streaming_diff = old.diff(new, reverse=reverse, streaming=True)["feature"]
+        assert isinstance(streaming_diff, StreamingDeltaDiff)
+        assert bool(streaming_diff)
+        assert len(streaming_diff) == len(feature_diff)
+
+        def _summarise(items):
+            return [(k, d.type, d.old_value, d.new_value) for k, d in items]
+
+        assert _summarise(streaming_diff.sorted_items()) == _summarise(
+            feature_diff.sorted_items()
+        )
+
+
+def test_diff_wc_many_renames(data_working_copy, cli_runner):
+    # Renames are detected however many features were renamed, unless kart.diff.renamelimit is set.
+    with data_working_copy("points") as (repo_path, wc):
+        repo = KartRepo(repo_path)
+        with repo.working_copy.tabular.session() as sess:
+            r = sess.execute(f"UPDATE {H.POINTS.LAYER} SET fid = fid + 100000;")
+            assert r.rowcount == H.POINTS.ROWCOUNT
+
+        r = cli_runner.invoke(["diff", "--exit-code", "-o", "json"])
+        assert r.exit_code == 1, r
+        odata = json.loads(r.stdout)["kart.diff/v1+hexwkb"]
+        features = odata[H.POINTS.LAYER]["feature"]
+        assert len(features) == H.POINTS.ROWCOUNT
+        assert all(f["+"]["fid"] == f["-"]["fid"] + 100000 for f in features)
+
+        repo.config["kart.diff.renamelimit"] = 400
+        r = cli_runner.invoke(["diff", "--exit-code", "-o", "json"])
+        assert r.exit_code == 1, r
+        odata = json.loads(r.stdout)["kart.diff/v1+hexwkb"]
+        features = odata[H.POINTS.LAYER]["feature"]
+        assert len(features) == H.POINTS.ROWCOUNT * 2
+        assert not any("-" in f and "+" in f for f in features)
+
+
+def test_diff_output_cache(data_archive, cli_runner):
+    with data_archive("points") as repo_path:
+        repo = KartRepo(repo_path)
+        repo.config["kart.diffcache.size"] = "1m"
+        cache_path = repo.gitdir_path / "diff-cache"
+
+        r = cli_runner.invoke(["show", "--output-format=json-lines"])
+        assert r.exit_code == 0, r.stderr
+        assert len(list(cache_path.iterdir())) == 1
+        uncached_output = r.stdout
+
+        r = cli_runner.invoke(["show", "--output-format=json-lines"])
+        assert r.exit_code == 0, r.stderr
+        assert len(list(cache_path.iterdir())) == 1
+        assert r.stdout == uncached_output
+
+        for i in range(2):
+            r = cli_runner.invoke(
+                ["diff", "--output-format=json-lines", "--exit-code", "HEAD^...HEAD"]
+            )
+            assert r.exit_code == 1, r.stderr
+            assert len(list(cache_path.iterdir())) == 2
+
+        # Entries are evicted once the cache is full.
+        repo.config["kart.diffcache.size"] = 1
+        r = cli_runner.invoke(["show", "--output-format=json-lines", "HEAD^"])
+        assert r.exit_code == 0, r.stderr
+        assert len(list(cache_path.iterdir())) == 0
+
+
 @pytest.mark.parametrize(
     "output_format", [o for o in SHOW_OUTPUT_FORMATS if o not in {"html", "quiet"}]
 )
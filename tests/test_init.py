@@ -713,6 +713,39 @@ def test_init_import(
             cli_runner.invoke(["show", "-o", "json"])
 
 
+@pytest.mark.slow
+def test_init_import_parallel(data_archive_readonly, tmp_path, cli_runner, monkeypatch):
+    from kart.fast_import import ParallelFeatureWriter
+
+    # Small chunks, so that every worker encodes some of the features of each dataset.
+    monkeypatch.setattr(ParallelFeatureWriter, "CHUNK_SIZE", 100)
+
+    with data_archive_readonly("gpkg-points") as data:
+        head_trees = []
+        for jobs in (1, 3):
+            repo_path = tmp_path / f"repo-{jobs}"
+            r = cli_runner.invoke(
+                [
+                    "init",
+                    "--import",
+                    data / "nz-pa-points-topo-150k.gpkg",
+                    "--no-checkout",
+                    f"--jobs={jobs}",
+                    str(repo_path),
+                ]
+            )
+            assert r.exit_code == 0, r.stderr
+
+            repo = KartRepo(repo_path)
+            assert not any(
+                ref.startswith("refs/kart-import/") for ref in repo.references
+            )
+            head_trees.append(repo.head_tree)
+
+        # Importing in parallel produces exactly the same tree.
+        assert head_trees[0].id == head_trees[1].id
+
+
 def test_init_import_commit_headers(
     data_archive,
     tmp_path,
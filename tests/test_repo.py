@@ -1,5 +1,6 @@
 import subprocess
 
+from kart.object_builder import ObjectBuilder
 from kart.repo import KartRepo, LOCKED_GIT_INDEX_CONTENTS
 
 
@@ -57,3 +58,29 @@ def test_git_disabled(tmp_path, cli_runner, chdir):
 
     # git-gc shouldn't create an index where there wasn't one already.
     assert not (repo_path / ".kart" / "unlocked_index").exists()
+
+
+def test_object_builder(tmp_path):
+    repo_path = tmp_path / "test_repo"
+    repo_path.mkdir()
+    repo = KartRepo.init_repository(repo_path, bare=True)
+    object_builder = ObjectBuilder(repo, None)
+    object_builder.insert("a/b/one", b"1")
+    object_builder.insert("a/b/two", b"2")
+    object_builder.insert("a/three", bytearray(b"3"))
+    tree = object_builder.flush()
+    assert object_builder.root_dict == {}
+
+    assert (tree / "a/b/one").data == b"1"
+    assert (tree / "a/three").data == b"3"
+
+    with object_builder.chdir("a"):
+        object_builder.remove("b/one")
+        object_builder.insert("b/two", b"two")
+        object_builder.insert("four", tree / "a/b/two")
+    tree = object_builder.flush()
+
+    assert [e.name for e in tree / "a/b"] == ["two"]
+    assert (tree / "a/b/two").data == b"two"
+    assert (tree / "a/four").data == b"2"
+    assert (tree / "a/three").data == b"3"
@@ -4,8 +4,10 @@ import subprocess
 import tempfile
 
 import pytest
+from osgeo import osr
 
 from kart.cli_util import tool_environment
+from kart.crs_util import make_crs
 from kart.exceptions import (
     INVALID_ARGUMENT,
     NO_SPATIAL_FILTER,
@@ -15,6 +17,9 @@ from kart.exceptions import (
 from kart.geometry import ring_as_wkt, bbox_as_wkt_polygon
 from kart.promisor_utils import FetchPromisedBlobsProcess, LibgitSubcode
 from kart.repo import KartRepo
+from kart.spatial_filter import OriginalSpatialFilter, ResolvedSpatialFilterSpec
+from kart.spatial_filter.index import _envelopes_intersect
+from kart.rev_list_objects import rev_list_feature_blobs
 
 H = pytest.helpers.helpers()
 
@@ -435,6 +440,28 @@ def test_spatially_filtered_partial_clone(data_archive, cli_runner):
             assert _get_key_error(ds, 1443053).subcode == LibgitSubcode.EOBJECTPROMISED
 
 
+def test_rev_list_feature_blobs_in_partial_clone(data_archive, cli_runner):
+    # Listing the feature blobs in a spatially filtered clone shouldn't fetch the promised blobs - rev-list leaves
+    # them out, so git cat-file is never asked for them.
+    with data_archive("polygons-with-feature-envelopes") as repo1_path:
+        repo1_url = f"file://{repo1_path.resolve()}"
+
+        with data_archive("polygons-spatial-filtered") as repo2_path:
+            repo2 = KartRepo(repo2_path)
+            repo2.config["remote.origin.url"] = repo1_url
+            ds = repo2.datasets()[H.POLYGONS.LAYER]
+            assert local_features(ds) == 52
+
+            blob_ids = [
+                blob_id
+                for commit_id, match, blob_id, data in rev_list_feature_blobs(
+                    repo2, ["HEAD"], []
+                )
+            ]
+            assert len(blob_ids) == 52
+            assert local_features(ds) == 52
+
+
 def test_spatially_filtered_fetch_promised(
     data_archive, cli_runner, insert, monkeypatch, git_supports_spatial_filter
 ):
@@ -767,6 +794,70 @@ def test_spatial_filtered_workingcopy(
             assert H.row_count(sess, table) == matching_features[archive]
 
 
+def test_spatial_filtered_workingcopy_with_envelope_index(
+    data_archive, cli_runner, monkeypatch
+):
+    # Features that the feature envelope index shows are outside the spatial filter are skipped without being read.
+    from kart.tabular.v3 import TableV3
+
+    num_decoded = 0
+    orig_get_features_from_blobs = TableV3.get_features_from_blobs
+
+    def get_features_from_blobs(self, feature_blobs, **kwargs):
+        nonlocal num_decoded
+        for feature in orig_get_features_from_blobs(self, feature_blobs, **kwargs):
+            num_decoded += 1
+            yield feature
+
+    monkeypatch.setattr(TableV3, "get_features_from_blobs", get_features_from_blobs)
+
+    with data_archive("points.tgz") as repo_path:
+        repo = KartRepo(repo_path)
+        H.clear_working_copy()
+
+        r = cli_runner.invoke(["spatial-filter", "index"])
+        assert r.exit_code == 0, r.stderr
+
+        repo.config["kart.spatialfilter.geometry"] = SPATIAL_FILTER_GEOMETRY["points"]
+        repo.config["kart.spatialfilter.crs"] = SPATIAL_FILTER_CRS["points"]
+
+        r = cli_runner.invoke(["checkout"])
+        assert r.exit_code == 0, r
+
+        with repo.working_copy.tabular.session() as sess:
+            assert H.row_count(sess, H.POINTS.LAYER) == 302
+        assert 302 <= num_decoded < H.POINTS.ROWCOUNT
+
+
+@pytest.mark.parametrize(
+    "filter_key", ["points", "polygons", "polygons-with-reprojection"]
+)
+def test_spatial_filter_envelope_wgs84(filter_key):
+    # The envelope used with the feature envelope index contains the envelope used for partial clones.
+    crs_spec = SPATIAL_FILTER_CRS[filter_key]
+    geometry_spec = SPATIAL_FILTER_GEOMETRY[filter_key]
+    w, s, e, n = OriginalSpatialFilter(crs_spec, geometry_spec).envelope_wgs84()
+    w_, s_, e_, n_ = ResolvedSpatialFilterSpec(crs_spec, geometry_spec).envelope_wgs84()
+    assert w <= w_ and s <= s_ and e >= e_ and n >= n_
+
+
+def test_spatial_filter_envelope_wgs84_contains_curved_edges():
+    # A large spatial filter in a projected CRS - its straight southern edge is a curve in WGS 84, which bulges south
+    # of its vertices near the central meridian. Features there must not be skipped using the feature envelope index.
+    crs_spec = "EPSG:2193"
+    geometry_spec = bbox_as_wkt_polygon(1000000, 2200000, 4800000, 6200000)
+    transform = osr.CoordinateTransformation(make_crs(crs_spec), make_crs("EPSG:4326"))
+    lng, lat, _ = transform.TransformPoint(1600000, 4801000)
+
+    vertices_envelope = ResolvedSpatialFilterSpec(
+        crs_spec, geometry_spec
+    ).envelope_wgs84()
+    assert lat < vertices_envelope[1]
+
+    envelope = OriginalSpatialFilter(crs_spec, geometry_spec).envelope_wgs84()
+    assert _envelopes_intersect(envelope, (lng, lat, lng, lat))
+
+
 def test_reset_wc_with_spatial_filter(data_archive, cli_runner):
     # This spatial filter matches 2 of the 5 possible changes between main^ and main.
 
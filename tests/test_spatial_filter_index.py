@@ -1,16 +1,21 @@
 import binascii
 from dataclasses import dataclass
+import multiprocessing
+import time
+
 import pytest
 
 from osgeo import osr
 
 from kart.crs_util import make_crs
 from kart.sqlalchemy.sqlite import sqlite_engine
+from kart.spatial_filter import index as spatial_filter_index
 from kart.spatial_filter.index import (
     CannotIndex,
     EnvelopeEncoder,
     anticlockwise_ring_from_minmax_envelope,
     transform_minmax_envelope,
+    transform_minmax_envelopes,
     union_of_envelopes,
     get_ogr_envelope,
 )
@@ -223,6 +228,30 @@ def test_roundtrip_envelope(envelope, expected_encoded_hex):
     _check_envelope(roundtripped, envelope)
 
 
+@pytest.mark.parametrize("bits_per_value", [16, 20, 32])
+def test_roundtrip_many_envelopes(bits_per_value):
+    # Encoding and decoding in bulk should give exactly the same results as one envelope at a time.
+    envelopes = [
+        (0, 0, 0, 0),
+        (-180, -90, 180, 90),
+        (90, -20, -90, 20),
+        (-45.830, 65.173, -43.232, 65.745),
+        (174.958, -37.198, 174.992, -37.190),
+        (178.723, 0.148, -175.234, 2.538),
+    ]
+    encoder = EnvelopeEncoder(bits_per_value)
+    encoded = encoder.encode_many(envelopes)
+    assert encoded == b"".join(encoder.encode(e) for e in envelopes)
+
+    roundtripped = encoder.decode_many(encoded)
+    size = encoder.BYTES_PER_ENVELOPE
+    assert roundtripped == [
+        encoder.decode(encoded[i : i + size]) for i in range(0, len(encoded), size)
+    ]
+    assert encoder.encode_many([]) == b""
+    assert encoder.decode_many(b"") == []
+
+
 def test_index_points_all(data_archive, cli_runner):
     # Indexing --all should give the same results every time.
     # For points, every point should have only one long S2 cell token.
@@ -234,6 +263,51 @@ def test_index_points_all(data_archive, cli_runner):
         _check_index(s, EXPECTED_POINTS_INDEX)
 
 
+def test_index_points_in_batches(data_archive, cli_runner, monkeypatch):
+    # Writing the index in many small batches should give the same results as writing it all at once.
+    monkeypatch.setattr(spatial_filter_index, "INDEXING_BATCH_SIZE", 100)
+    with data_archive("points.tgz") as repo_path:
+        r = cli_runner.invoke(["spatial-filter", "index"])
+        assert r.exit_code == 0, r.stderr
+        s = _get_index_summary(repo_path)
+        assert s.features == 2148
+        _check_index(s, EXPECTED_POINTS_INDEX)
+
+
+def test_index_points_parallel(data_archive, cli_runner, monkeypatch):
+    # Indexing using several worker processes should give the same results as indexing in a single process.
+    monkeypatch.setattr(spatial_filter_index, "INDEXING_WORKER_CHUNK_SIZE", 100)
+    with data_archive("points.tgz") as repo_path:
+        r = cli_runner.invoke(["spatial-filter", "index", "--jobs=3"])
+        assert r.exit_code == 0, r.stderr
+        s = _get_index_summary(repo_path)
+        assert s.features == 2148
+        _check_index(s, EXPECTED_POINTS_INDEX)
+
+
+def test_index_points_parallel_with_slow_worker(data_archive, cli_runner, monkeypatch):
+    # Workers that finish while another worker is still busy shouldn't be treated as having failed.
+    monkeypatch.setattr(spatial_filter_index, "INDEXING_WORKER_CHUNK_SIZE", 100)
+    slow_task_taken = multiprocessing.Value("b", 0)
+    orig_encoded_envelopes = spatial_filter_index._encoded_envelopes
+
+    def encoded_envelopes(*args):
+        with slow_task_taken.get_lock():
+            is_slow_task = not slow_task_taken.value
+            slow_task_taken.value = 1
+        if is_slow_task:
+            time.sleep(3)
+        return orig_encoded_envelopes(*args)
+
+    monkeypatch.setattr(spatial_filter_index, "_encoded_envelopes", encoded_envelopes)
+    with data_archive("points.tgz") as repo_path:
+        r = cli_runner.invoke(["spatial-filter", "index", "--jobs=3"])
+        assert r.exit_code == 0, r.stderr
+        s = _get_index_summary(repo_path)
+        assert s.features == 2148
+        _check_index(s, EXPECTED_POINTS_INDEX)
+
+
 def test_index_points_commit_by_commit(data_archive, cli_runner):
     # Indexing one commit at a time should get the same results as indexing --all.
     with data_archive("points.tgz") as repo_path:
@@ -530,6 +604,37 @@ def test_transform_minmax_envelope_buffer_for_curvature():
     _check_envelope(transformed_with_buffer, correct_envelope, abs=0.2)
 
 
+def test_transform_minmax_envelopes():
+    # Transforming envelopes in bulk should give exactly the same results as transforming them one at a time.
+    envelopes = [
+        (1, 2, 3, 4),
+        (1, 2, 1, 2),
+        (1.1, 2.2, 1.3, 2.4),
+        (177, -10, 184, 10),
+        (179.9, 0, 180.1, 0.1),
+        (185, 85, 185, 85),
+        (-179, -10, 179, 10),
+        (1347679, 5456907, 2021026, 6117225),
+        (1347679, 5456907, 1347679, 5456907),
+        (1347679, 5456907, 1348679, 5457907),
+        (2567196, 5736624, 2567196, 5736624),
+        (0, 1_000_000, 15_000_000, 1_100_000),
+    ]
+    for transform in (IDENTITY_TRANSFORM, NZTM_TRANSFORM):
+        expected = []
+        for envelope in envelopes:
+            try:
+                expected.append(transform_minmax_envelope(envelope, transform))
+            except CannotIndex as e:
+                expected.append(type(e))
+
+        actual = [
+            type(result) if isinstance(result, CannotIndex) else result
+            for result in transform_minmax_envelopes(envelopes, transform)
+        ]
+        assert actual == expected
+
+
 @pytest.mark.parametrize(
     "env1,env2,expected_result",
     [
@@ -205,6 +205,42 @@ def test_feature_roundtrip(gen_uuid):
     assert tuple(roundtripped_feature.values()) == feature_tuple
 
 
+def test_get_feature_blobs_for_pks(gen_uuid):
+    schema = Schema(
+        [
+            ColumnSchema(gen_uuid(), "id", "integer", 0, size=64),
+            ColumnSchema(gen_uuid(), "name", "text", None),
+        ]
+    )
+    empty_dataset = TableV3.new_dataset_for_writing(DATASET_PATH, schema, MemoryRepo())
+    schema_path, schema_data = empty_dataset.encode_schema(schema)
+    legend_path, legend_data = empty_dataset.encode_legend(schema.legend)
+    all_blobs = {schema_path: schema_data, legend_path: legend_data}
+
+    # Features must be encoded using the same path structure that the dataset will use to find them.
+    tableV3 = TableV3(MemoryTree(all_blobs) / DATASET_PATH, DATASET_PATH, MemoryRepo())
+    for i in range(100):
+        feature_path, feature_data = tableV3.encode_feature((i, f"f{i}"), schema)
+        all_blobs[feature_path] = feature_data
+
+    tableV3 = TableV3(MemoryTree(all_blobs) / DATASET_PATH, DATASET_PATH, MemoryRepo())
+    # PKs can be given as strings, as they are stored in the working copy's tracking table.
+    pks = [50, "7", 100, 0, 99, -1, 50]
+    blobs = tableV3.get_feature_blobs_for_pks(pks)
+    assert [b is not None for b in blobs] == [
+        True,
+        True,
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+    assert list(tableV3.get_features_from_blobs([b for b in blobs if b])) == [
+        tableV3.get_feature(pk) for pk in (50, 7, 0, 99, 50)
+    ]
+
+
 def test_schema_change_roundtrip(gen_uuid):
     old_schema = Schema(
         [
@@ -271,3 +307,11 @@ def test_schema_change_roundtrip(gen_uuid):
     }
     # We guarantee that the dict iterates in row-order.
     assert tuple(roundtripped.values()) == (7, None, "Bloggs", "Joe", None)
+
+    # Decoding many features at once gives the same result.
+    feature_blobs = [tree / feature_path] * 3
+    assert list(tableV3.get_features_from_blobs(feature_blobs)) == [roundtripped] * 3
+    assert (
+        list(tableV3.get_features_from_blobs(feature_blobs, as_tuples=True))
+        == [(7, None, "Bloggs", "Joe", None)] * 3
+    )
@@ -8,6 +8,7 @@ import sqlalchemy
 from kart.exceptions import INVALID_ARGUMENT, INVALID_OPERATION, UNCOMMITTED_CHANGES
 from kart.repo import KartRepo
 from kart.sqlalchemy.adapter.gpkg import KartAdapter_GPKG
+from kart.tabular.parallel_reader import ParallelFeatureReader
 from kart.tabular.working_copy.base import TableWorkingCopy
 from test_working_copy import compute_approximated_types
 
@@ -57,6 +58,25 @@ def test_checkout_workingcopy(
         assert expected_col_spec in table_spec
 
 
+def test_checkout_workingcopy_parallel(data_archive, cli_runner, monkeypatch):
+    monkeypatch.setattr(TableWorkingCopy, "PARALLEL_CHECKOUT_MIN_FEATURES", 0)
+    monkeypatch.setattr(ParallelFeatureReader, "CHUNK_SIZE", 100)
+    with data_archive("points") as repo_path:
+        H.clear_working_copy()
+        repo = KartRepo(repo_path)
+        repo.config["kart.checkout.jobs"] = 3
+
+        r = cli_runner.invoke(["checkout"])
+        assert r.exit_code == 0, r.stderr
+
+        r = cli_runner.invoke(["diff", "--exit-code"])
+        assert r.exit_code == 0, r.stdout
+        r = cli_runner.invoke(["fsck"])
+        assert r.exit_code == 0, r.stdout
+        with repo.working_copy.tabular.session() as sess:
+            assert H.row_count(sess, H.POINTS.LAYER) == H.POINTS.ROWCOUNT
+
+
 def test_checkout_detached(data_working_copy, cli_runner):
     """Checkout a working copy to edit"""
     with data_working_copy("points") as (repo_dir, wc):